@@ -0,0 +1,319 @@
+"""
+JSON HTTP API сервисного центра (интеграция с колл-центром, мобильные клиенты специалистов)
+
+Работает поверх хранилища storage.py (SQLite через database.py или PostgreSQL):
+каждый поток waitress получает свои соединения из пула. Авторизация - токен из POST /api/login
+в заголовке "Authorization: Bearer <токен>", права - auth.ROLE_PERMISSIONS.
+
+Запуск:
+    SC_API_SECRET=... python api.py            - waitress на порту SC_API_PORT (8080)
+
+Методы:
+    POST  /api/login                           {username, password} -> {token, user}
+    GET   /api/requests                        ?status=&assigned_to=&equipment_type=&date_from=
+                                               &date_to=&search=&cursor=&limit=
+    GET   /api/requests/search                 ?q=&limit= (ранжированный полнотекстовый поиск)
+    POST  /api/requests                        {equipment_type, equipment_model,
+                                                problem_description, user_name, user_phone}
+    GET   /api/requests/<id>
+    POST  /api/requests/<id>/status            {status}
+    POST  /api/requests/<id>/assign            {technician_id} (null - снять назначение)
+    GET   /api/requests/<id>/comments
+    POST  /api/requests/<id>/comments          {text, is_technical, parts_ordered}
+    GET   /api/requests/<id>/history
+"""
+import os
+import secrets
+from datetime import date, datetime
+from functools import wraps
+
+from flask import Flask, g, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+import auth
+import database
+import records
+import storage
+
+API_HOST = os.environ.get('SC_API_HOST', '0.0.0.0')
+API_PORT = int(os.environ.get('SC_API_PORT', 8080))
+# Потоков waitress (у каждого свои соединения с базой)
+API_THREADS = int(os.environ.get('SC_API_THREADS', 16))
+# Время жизни токена, секунд
+API_TOKEN_MAX_AGE = 12 * 3600
+API_MAX_PAGE_SIZE = 200
+
+_secret = os.environ.get('SC_API_SECRET')
+if not _secret:
+    # Без заданного ключа токены действуют только до перезапуска процесса
+    print("SC_API_SECRET не задан: используется случайный ключ")
+    _secret = secrets.token_hex(32)
+_serializer = URLSafeTimedSerializer(_secret, salt='service-center-api')
+
+# SQLite (database.py) или PostgreSQL - по SC_DATABASE_URL
+store = storage.get_storage()
+
+
+class _JSONProvider(DefaultJSONProvider):
+    """Записи records.py как объекты, даты в ISO-формате и кириллица без экранирования"""
+    ensure_ascii = False
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, records.Record):
+            return o.to_dict()
+        if isinstance(o, (date, datetime)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+
+app = Flask(__name__)
+app.json = _JSONProvider(app)
+
+
+class ApiError(Exception):
+    """Ошибка запроса, возвращаемая клиенту с HTTP-статусом"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@app.errorhandler(ApiError)
+def _handle_api_error(e):
+    return jsonify({'error': e.message}), e.status
+
+
+@app.errorhandler(404)
+def _handle_not_found(e):
+    return jsonify({'error': 'Не найдено'}), 404
+
+
+@app.errorhandler(405)
+def _handle_method_not_allowed(e):
+    return jsonify({'error': 'Метод не поддерживается'}), 405
+
+
+@app.errorhandler(500)
+def _handle_server_error(e):
+    return jsonify({'error': 'Внутренняя ошибка сервера'}), 500
+
+
+def _public_user(user):
+    return {key: user.get(key) for key in ('id', 'username', 'role', 'full_name', 'phone')}
+
+
+def require_auth(action=None):
+    """
+    Декоратор метода API: проверка токена и, если указано, права на действие
+
+    Args:
+        action: Ключ auth.ROLE_PERMISSIONS или None (достаточно входа)
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            header = request.headers.get('Authorization', '')
+            if not header.startswith('Bearer '):
+                raise ApiError(401, 'Требуется авторизация')
+            try:
+                user_id = _serializer.loads(header[7:], max_age=API_TOKEN_MAX_AGE)['id']
+            except SignatureExpired:
+                raise ApiError(401, 'Срок действия токена истек')
+            except (BadSignature, KeyError, TypeError):
+                raise ApiError(401, 'Недействительный токен')
+            # Пользователь читается из базы при каждом запросе, мимо кэша справочников:
+            # удаление или смена роли действуют сразу
+            user = store.get_user_by_id(user_id, cached=False)
+            if user is None:
+                raise ApiError(401, 'Пользователь не найден')
+            if action is not None and not auth.has_permission(user, action):
+                raise ApiError(403, 'Недостаточно прав')
+            g.user = user
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _json_body():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ApiError(400, 'Ожидается JSON-объект')
+    return data
+
+
+def _int_arg(name, default=None, maximum=None):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(400, f'Параметр {name} должен быть числом')
+    if value < 1:
+        raise ApiError(400, f'Параметр {name} должен быть положительным')
+    return min(value, maximum) if maximum else value
+
+
+def _encode_cursor(cursor):
+    if cursor is None:
+        return None
+    created_at, request_id = cursor
+    created_at = created_at.isoformat() if isinstance(created_at, date) else created_at
+    return f'{created_at}_{request_id}'
+
+
+def _decode_cursor(value):
+    if not value:
+        return None
+    try:
+        created_at, request_id = value.rsplit('_', 1)
+        return created_at, int(request_id)
+    except ValueError:
+        raise ApiError(400, 'Некорректный курсор')
+
+
+def _request_filters():
+    """Фильтры списка заявок из параметров запроса; заказчик видит только свои заявки"""
+    statuses = request.args.getlist('status')
+    for status in statuses:
+        if status not in database.REQUEST_STATUSES:
+            raise ApiError(400, f'Недопустимый статус: {status}')
+    filters = {
+        'status': statuses or None,
+        'assigned_to': _int_arg('assigned_to'),
+        'equipment_type': request.args.get('equipment_type') or None,
+        'date_from': request.args.get('date_from') or None,
+        'date_to': request.args.get('date_to') or None,
+    }
+    if g.user['role'] == 'Заказчик':
+        filters['customer_name'] = g.user['full_name']
+    return filters
+
+
+def _get_visible_request(request_id):
+    """Заявка, доступная текущему пользователю (иначе 404)"""
+    item = store.get_request_by_id(request_id)
+    if item is None or (g.user['role'] == 'Заказчик' and item['user_name'] != g.user['full_name']):
+        raise ApiError(404, 'Заявка не найдена')
+    return item
+
+
+@app.post('/api/login')
+def login():
+    data = _json_body()
+    user = store.verify_login(data.get('username', ''), data.get('password', ''))
+    if user is None:
+        raise ApiError(401, 'Неверный логин или пароль')
+    token = _serializer.dumps({'id': user['id']})
+    return jsonify({'token': token, 'expires_in': API_TOKEN_MAX_AGE, 'user': _public_user(user)})
+
+
+@app.get('/api/requests')
+@require_auth()
+def list_requests():
+    limit = _int_arg('limit', database.REQUESTS_PAGE_SIZE, API_MAX_PAGE_SIZE)
+    filters = _request_filters()
+    filters['search_term'] = request.args.get('search') or None
+    page = store.get_requests_page(_decode_cursor(request.args.get('cursor')), limit, **filters)
+    return jsonify({'items': page['items'], 'next_cursor': _encode_cursor(page['next_cursor'])})
+
+
+@app.get('/api/requests/search')
+@require_auth()
+def search_requests():
+    term = (request.args.get('q') or '').strip()
+    if not term:
+        raise ApiError(400, 'Не задана строка поиска (q)')
+    limit = _int_arg('limit', database.REQUESTS_PAGE_SIZE, API_MAX_PAGE_SIZE)
+    return jsonify({'items': store.search_requests_ranked(term, limit, **_request_filters())})
+
+
+@app.post('/api/requests')
+@require_auth('create_request')
+def create_request():
+    data = _json_body()
+    if g.user['role'] == 'Заказчик':
+        # ФИО и телефон заказчика берутся из профиля, как в форме приложения
+        data['user_name'] = g.user['full_name']
+        data['user_phone'] = g.user.get('phone') or data.get('user_phone')
+    fields = ['equipment_type', 'equipment_model', 'problem_description', 'user_name', 'user_phone']
+    missing = [field for field in fields if not str(data.get(field) or '').strip()]
+    if missing:
+        raise ApiError(400, f"Не заполнены поля: {', '.join(missing)}")
+    request_id = store.create_request({field: str(data[field]).strip() for field in fields})
+    if request_id is None:
+        raise ApiError(500, 'Не удалось создать заявку')
+    return jsonify(store.get_request_by_id(request_id)), 201
+
+
+@app.get('/api/requests/<int:request_id>')
+@require_auth()
+def get_request(request_id):
+    return jsonify(_get_visible_request(request_id))
+
+
+@app.post('/api/requests/<int:request_id>/status')
+@require_auth('update_status')
+def update_status(request_id):
+    new_status = _json_body().get('status')
+    if new_status not in database.REQUEST_STATUSES:
+        raise ApiError(400, f"Допустимые статусы: {', '.join(database.REQUEST_STATUSES)}")
+    item = _get_visible_request(request_id)
+    if g.user['role'] == 'Специалист' and item['assigned_to'] != g.user['id']:
+        # Специалист меняет статус только назначенных ему заявок
+        raise ApiError(403, 'Заявка назначена другому специалисту')
+    if item['status'] != new_status:
+        if not store.update_request_status(request_id, new_status, g.user['id']):
+            raise ApiError(500, 'Не удалось обновить статус')
+        item = store.get_request_by_id(request_id)
+    return jsonify(item)
+
+
+@app.post('/api/requests/<int:request_id>/assign')
+@require_auth('assign_technician')
+def assign(request_id):
+    technician_id = _json_body().get('technician_id')
+    if technician_id is not None:
+        if not isinstance(technician_id, int) or store.get_technician_by_id(technician_id) is None:
+            raise ApiError(400, 'Специалист не найден')
+    _get_visible_request(request_id)
+    if not store.assign_technician(request_id, technician_id):
+        raise ApiError(500, 'Не удалось назначить специалиста')
+    return jsonify(store.get_request_by_id(request_id))
+
+
+@app.get('/api/requests/<int:request_id>/comments')
+@require_auth()
+def list_comments(request_id):
+    _get_visible_request(request_id)
+    return jsonify({'items': store.get_comments(request_id)})
+
+
+@app.post('/api/requests/<int:request_id>/comments')
+@require_auth('add_comment')
+def add_comment(request_id):
+    data = _json_body()
+    text = str(data.get('text') or '').strip()
+    if not text:
+        raise ApiError(400, 'Пустой комментарий')
+    _get_visible_request(request_id)
+    if not store.add_comment(request_id, g.user['id'], text, bool(data.get('is_technical')),
+                                data.get('parts_ordered') or None):
+        raise ApiError(500, 'Не удалось добавить комментарий')
+    return jsonify({'items': store.get_comments(request_id)}), 201
+
+
+@app.get('/api/requests/<int:request_id>/history')
+@require_auth()
+def status_history(request_id):
+    _get_visible_request(request_id)
+    return jsonify({'items': store.get_status_history(request_id)})
+
+
+if __name__ == '__main__':
+    from waitress import serve
+
+    serve(app, host=API_HOST, port=API_PORT, threads=API_THREADS)
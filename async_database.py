@@ -0,0 +1,149 @@
+"""
+Асинхронный доступ к базе данных для фронтендов на asyncio (API, рассылка уведомлений)
+
+Функции database.py выполняются на отдельном ограниченном пуле потоков; у каждого
+потока пула свои соединения (пул соединений database.py привязан к потоку),
+а запросы те же самые - асинхронные обертки создаются из функций database.py:
+
+    import async_database as adb
+    request = await adb.get_request_by_id(42)
+    page = await adb.get_requests_page(status=['Новая заявка'], timeout=5)
+    await adb.run(some_function_using_get_db_connection, arg)
+
+При отмене задачи или истечении timeout выполняющийся запрос прерывается
+(sqlite3.Connection.interrupt), незавершенная транзакция откатывается.
+"""
+import asyncio
+import functools
+import inspect
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+
+# Размер пула потоков (одновременно выполняемых обращений к базе)
+ASYNC_DB_WORKERS = int(os.environ.get('SC_ASYNC_DB_WORKERS', 4))
+# Ограничение времени выполнения по умолчанию, секунд (None - без ограничения)
+ASYNC_DB_TIMEOUT = 30
+
+# Функции database.py, у которых нет асинхронной обертки
+_NOT_WRAPPED = {'get_db_connection', 'close_connections', 'reset_connections', 'hash_password'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class _Job:
+    """Обращение к базе, выполняемое потоком пула; нужно для прерывания"""
+    __slots__ = ('lock', 'handles', 'cancelled')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.handles = None
+        self.cancelled = False
+
+    def interrupt(self):
+        with self.lock:
+            self.cancelled = True
+            if self.handles is None:
+                return
+            for handle in list(self.handles.values()):
+                handle.conn.interrupt()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=ASYNC_DB_WORKERS, thread_name_prefix='db-async')
+        return _executor
+
+
+def _run_job(job, func, args, kwargs):
+    with job.lock:
+        if job.cancelled:
+            return None
+        # Словарь соединений потока: interrupt() из другого потока прерывает их запросы
+        job.handles = database._thread_handles()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        with job.lock:
+            job.handles = None
+
+
+async def run(func, *args, timeout=ASYNC_DB_TIMEOUT, **kwargs):
+    """
+    Выполнение синхронной функции доступа к базе в пуле потоков
+
+    Args:
+        func: Функция (обычно из database.py)
+        *args, **kwargs: Ее аргументы
+        timeout: Ограничение времени, секунд (None - без ограничения)
+
+    Returns:
+        Результат func
+
+    Raises:
+        asyncio.TimeoutError: Время истекло, запрос прерван
+        asyncio.CancelledError: Задача отменена, запрос прерван
+    """
+    loop = asyncio.get_running_loop()
+    job = _Job()
+    future = loop.run_in_executor(_get_executor(), _run_job, job, func, args, kwargs)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        job.interrupt()
+        raise
+
+
+async def iter_requests(batch_size=database.EXPORT_BATCH_SIZE, timeout=ASYNC_DB_TIMEOUT, **filters):
+    """
+    Асинхронное чтение заявок по фильтрам порциями (keyset-пагинация
+    get_requests_page: курсор не держится открытым между порциями)
+
+    Yields:
+        dict: Заявка с ФИО ответственного (assigned_name)
+    """
+    after = None
+    while True:
+        page = await run(database.get_requests_page, after, batch_size, timeout=timeout, **filters)
+        for item in page['items']:
+            yield item
+        after = page['next_cursor']
+        if after is None:
+            break
+
+
+def _wrap(func):
+    @functools.wraps(func)
+    async def wrapper(*args, timeout=ASYNC_DB_TIMEOUT, **kwargs):
+        return await run(func, *args, timeout=timeout, **kwargs)
+    return wrapper
+
+
+def __getattr__(name):
+    """Асинхронная обертка публичной функции database.py (создается при первом обращении)"""
+    func = getattr(database, name, None)
+    # Генераторы и контекстные менеджеры (@contextmanager: __wrapped__ - генератор)
+    # работают с соединением потока, который их вызвал, - в пул их не передать
+    if (name.startswith('_') or name in _NOT_WRAPPED or not inspect.isfunction(func)
+            or func.__module__ != database.__name__
+            or inspect.isgeneratorfunction(inspect.unwrap(func))):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    wrapper = globals()[name] = _wrap(func)
+    return wrapper
+
+
+def shutdown(wait=True):
+    """
+    Остановка пула потоков (при завершении приложения).
+    Следующее обращение создаст новый пул.
+    """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=True)
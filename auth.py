@@ -1,6 +1,8 @@
 import sqlite3
 import hashlib
 import streamlit as st
+import database
+import storage
 
 def hash_password(password):
     """
@@ -26,12 +28,11 @@ def verify_login(username, password):
         dict or None: Данные пользователя или None если неверные данные
     """
     try:
-        conn = sqlite3.connect('service_center.db')
-        conn.row_factory = sqlite3.Row 
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
-        user = cursor.fetchone()
+        with database.get_db_connection(readonly=True) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
+            user = cursor.fetchone()
         
         if user:
             password_hash = hash_password(password)
@@ -46,9 +47,6 @@ def verify_login(username, password):
     except Exception as e:
         print(f"Неожиданная ошибка при проверке логина: {e}")
         return None
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 def init_session_state():
     """
@@ -182,7 +180,8 @@ def show_login_form():
         
         # Проверка учетных данных
         with st.spinner("Проверка учетных данных..."):
-            user_data = verify_login(username, password)
+            # Через хранилище: SQLite (verify_login выше) или PostgreSQL
+            user_data = storage.get_storage().verify_login(username, password)
         
         if user_data:
             login_user(user_data)
@@ -215,6 +214,27 @@ def get_role_display_name(role_code):
     """
     return role_code
 
+# Роли, которым разрешены действия с заявками (общие для интерфейса и API)
+ROLE_PERMISSIONS = {
+    'create_request': ['Заказчик', 'Оператор', 'Менеджер', 'Администратор'],
+    'update_status': ['Администратор', 'Менеджер', 'Специалист'],
+    'assign_technician': ['Администратор', 'Менеджер'],
+    'add_comment': ['Администратор', 'Менеджер', 'Специалист'],
+}
+
+def has_permission(user, action):
+    """
+    Проверка права пользователя на действие
+    
+    Args:
+        user: dict с данными пользователя (нужна роль)
+        action: Ключ ROLE_PERMISSIONS
+        
+    Returns:
+        bool: True если роль пользователя допускает действие
+    """
+    return user is not None and user.get('role') in ROLE_PERMISSIONS.get(action, [])
+
 def create_user(username, password, role, full_name, phone=None):
     """
     Создание нового пользователя (для администраторов).
@@ -230,9 +250,6 @@ def create_user(username, password, role, full_name, phone=None):
         bool: True если пользователь создан, False при ошибке
     """
     try:
-        conn = sqlite3.connect('service_center.db')
-        cursor = conn.cursor()
-        
         # Хешируем пароль
         password_hash = hash_password(password)
         
@@ -240,12 +257,16 @@ def create_user(username, password, role, full_name, phone=None):
         allowed_roles = ['Администратор', 'Менеджер', 'Специалист', 'Оператор', 'Заказчик']
         if role not in allowed_roles:
             raise ValueError(f"Недопустимая роль. Допустимые роли: {', '.join(allowed_roles)}")
-        cursor.execute('''
-        INSERT INTO users (username, password_hash, role, full_name, phone)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (username, password_hash, role, full_name, phone))
         
-        conn.commit()
+        with database.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            INSERT INTO users (username, password_hash, role, full_name, phone)
+            VALUES (?, ?, ?, ?, ?)
+            ''', (username, password_hash, role, full_name, phone))
+            
+            conn.commit()
+        database.invalidate_reference_cache()
         return True
         
     except sqlite3.IntegrityError:
@@ -254,9 +275,6 @@ def create_user(username, password, role, full_name, phone=None):
     except Exception as e:
         print(f"Ошибка при создании пользователя: {e}")
         return False
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 if __name__ == "__main__":
     """
@@ -0,0 +1,510 @@
+"""
+Нагрузочные замеры базы данных сервисного центра на синтетических данных
+
+Генерация тестовой базы (воспроизводимо при одинаковом --seed):
+    python benchmark.py generate --db bench.db --requests 1000000 --comments 5000000 --history 3000000
+
+Замер всех сценариев и сохранение результата:
+    python benchmark.py run --db bench.db --out results.json
+
+Сравнение с сохраненным эталоном (код возврата 1 при регрессии):
+    python benchmark.py run --db bench.db --out results.json --baseline baseline.json
+    python benchmark.py compare baseline.json results.json
+
+Сценарии покрывают публичные функции database.py, работающие с БД, и загрузку
+данных каждой страницы main.py. Пишущие сценарии меняют тестовую базу, поэтому
+выполняются после читающих; запускать их на рабочей базе нельзя.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from array import array
+from itertools import accumulate
+from datetime import date, datetime, timedelta
+
+import database
+import migrations
+
+BASE_TABLES = ['users', 'requests', 'comments', 'status_history']
+GENERATE_CHUNK_SIZE = 50000
+
+EQUIPMENT = {
+    'Кондиционер': ['Samsung AR09', 'LG P07EP', 'Ballu BSD-07HN1', 'Haier HSU-09', 'Daikin FTXB25C'],
+    'Сплит-система': ['Mitsubishi MSZ-LN25', 'Electrolux EACS-07', 'Hisense AS-09', 'Gree GWH09'],
+    'Увлажнитель воздуха': ['Boneco U200', 'Xiaomi Humidifier 2', 'Polaris PUH 5304'],
+    'Очиститель воздуха': ['Philips AC0820', 'Tefal PT3030', 'Xiaomi Mi Air 3H'],
+    'Тепловая пушка': ['Ballu BKX-5', 'Ресанта ТЭПК-2000', 'Timberk TIH R2'],
+    'Вентилятор': ['Scarlett SC-SF111', 'Vitek VT-1949', 'Polaris PSF 40'],
+    'Обогреватель': ['Electrolux EIH/AG2', 'Timberk TEC.PF8', 'Scarlett SC-FH53'],
+    'Осушитель воздуха': ['Ballu BDH-15L', 'Electrolux EDH-12L'],
+}
+PROBLEMS = [
+    'Не включается', 'Не охлаждает', 'Сильный шум при работе', 'Течет вода из внутреннего блока',
+    'Неприятный запах', 'Не реагирует на пульт', 'Выключается через несколько минут',
+    'Ошибка E1 на дисплее', 'Не греет', 'Вибрирует корпус',
+]
+COMMENTS = [
+    'Проведена диагностика', 'Заказаны запчасти', 'Ожидаем поставку комплектующих',
+    'Клиент уведомлен о готовности', 'Требуется замена компрессора',
+    'Сложный случай, нужна консультация', 'Выполнена чистка фильтров', 'Заменен датчик температуры',
+    'Повторная проверка после ремонта', 'Сложная неисправность платы управления',
+]
+PARTS = ['Компрессор', 'Плата управления', 'Датчик температуры', 'Вентилятор', 'Фильтр', 'Конденсатор']
+SURNAMES = ['Иванов', 'Петров', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Соколов', 'Михайлов',
+            'Новиков', 'Федоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семенов', 'Егоров']
+FIRST_NAMES = ['Иван', 'Петр', 'Сергей', 'Андрей', 'Дмитрий', 'Алексей', 'Михаил', 'Николай',
+               'Анна', 'Мария', 'Елена', 'Ольга', 'Наталья', 'Татьяна', 'Ирина', 'Светлана']
+PATRONYMICS = ['Иванович', 'Петрович', 'Сергеевич', 'Андреевич', 'Дмитриевич', 'Алексеевич']
+
+# Доли статусов среди заявок: большая часть истории - выполненные
+STATUS_WEIGHTS = {'Новая заявка': 0.1, 'В процессе ремонта': 0.2, 'Готово к выдаче': 0.1, 'Выполнено': 0.6}
+STATUS_FLOW = database.REQUEST_STATUSES
+
+
+def _zipf_weights(count, skew):
+    """
+    Накопленные веса распределения Ципфа (первые значения встречаются заметно чаще)
+    для random.choices(cum_weights=...)
+    """
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+def _person_name(rnd):
+    return f"{rnd.choice(SURNAMES)} {rnd.choice(FIRST_NAMES)} {rnd.choice(PATRONYMICS)}"
+
+
+def generate(db_path, requests=100000, comments=500000, history=300000, technicians=50,
+             customers=20000, days=730, skew=1.1, seed=42):
+    """
+    Заполнение новой базы синтетическими данными
+
+    Args:
+        db_path: Путь к создаваемой базе (существующий файл перезаписывается)
+        requests, comments, history: Количество заявок, комментариев и записей истории статусов
+        technicians, customers: Количество специалистов и заказчиков
+        days: Глубина истории заявок в днях
+        skew: Показатель Ципфа для типов оборудования, заказчиков и специалистов
+        seed: Зерно генератора случайных чисел
+
+    Returns:
+        dict: Фактические объемы и время генерации
+    """
+    rnd = random.Random(seed)
+    started = time.perf_counter()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    # Базовые таблицы; поисковый индекс и статистика (миграции 3+) строятся
+    # после загрузки, чтобы триггеры не срабатывали на каждой строке
+    migrations.migrate(conn, target=2)
+
+    password_hash = database.hash_password('bench')
+    staff = [('admin', 'Администратор', 'Главный Администратор'),
+             ('manager', 'Менеджер', 'Менеджер Отдела'),
+             ('quality', 'Менеджер по качеству', 'Менеджер Качества'),
+             ('operator', 'Оператор', 'Оператор Call-центра')]
+    staff += [(f'tech{i}', 'Специалист', _person_name(rnd)) for i in range(technicians)]
+    conn.executemany('''
+    INSERT INTO users (username, password_hash, role, full_name, phone) VALUES (?, ?, ?, ?, ?)
+    ''', [(login, password_hash, role, name, f'+7999{i:07d}') for i, (login, role, name) in enumerate(staff)])
+    technician_ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE role = 'Специалист' ORDER BY id")]
+    staff_ids = [row[0] for row in conn.execute('SELECT id FROM users ORDER BY id')]
+
+    customer_list = [(_person_name(rnd), f'+79{rnd.randrange(10 ** 9):09d}') for _ in range(customers)]
+    customer_weights = _zipf_weights(customers, skew)
+    technician_weights = _zipf_weights(len(technician_ids), skew)
+    equipment_types = list(EQUIPMENT)
+    equipment_weights = _zipf_weights(len(equipment_types), skew)
+    statuses = list(STATUS_WEIGHTS)
+    status_weights = list(accumulate(STATUS_WEIGHTS.values()))
+
+    today = date.today()
+    first_day = (today - timedelta(days=days)).toordinal()
+    created_days = array('l')
+    counters = {}
+
+    def request_rows():
+        for _ in range(requests):
+            created = date.fromordinal(first_day + rnd.randrange(days + 1))
+            created_days.append(created.toordinal())
+            counters[created.year] = counters.get(created.year, 0) + 1
+            equipment_type = rnd.choices(equipment_types, cum_weights=equipment_weights)[0]
+            name, phone = rnd.choices(customer_list, cum_weights=customer_weights)[0]
+            status = rnd.choices(statuses, cum_weights=status_weights)[0]
+            assigned_to = assigned_at = completed_at = None
+            if status != 'Новая заявка' or rnd.random() < 0.3:
+                assigned_to = rnd.choices(technician_ids, cum_weights=technician_weights)[0]
+                assigned_at = min(created + timedelta(days=rnd.randrange(4)), today)
+            if status == 'Выполнено':
+                completed_at = min(created + timedelta(days=rnd.randrange(31)), today)
+            yield (f'REQ-{created.year}-{counters[created.year]:04d}', created.isoformat(),
+                   equipment_type, rnd.choice(EQUIPMENT[equipment_type]), rnd.choice(PROBLEMS),
+                   name, phone, status, assigned_to,
+                   assigned_at and assigned_at.isoformat(), completed_at and completed_at.isoformat())
+
+    def comment_rows():
+        for _ in range(comments):
+            request_id = rnd.randrange(requests) + 1
+            created = date.fromordinal(min(created_days[request_id - 1] + rnd.randrange(20), today.toordinal()))
+            parts = rnd.choice(PARTS) if rnd.random() < 0.1 else None
+            yield (request_id, rnd.choice(technician_ids), rnd.choice(COMMENTS),
+                   int(rnd.random() < 0.2), parts, created.isoformat())
+
+    def history_rows():
+        for _ in range(history):
+            request_id = rnd.randrange(requests) + 1
+            step = rnd.randrange(len(STATUS_FLOW) - 1)
+            changed = date.fromordinal(min(created_days[request_id - 1] + step * 2, today.toordinal()))
+            yield (request_id, STATUS_FLOW[step], STATUS_FLOW[step + 1], rnd.choice(staff_ids),
+                   changed.isoformat())
+
+    inserts = [
+        (request_rows(), '''
+        INSERT INTO requests (request_number, created_at, equipment_type, equipment_model,
+            problem_description, user_name, user_phone, status, assigned_to, assigned_at, completed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''),
+        (comment_rows(), '''
+        INSERT INTO comments (request_id, user_id, comment_text, is_technical_note, parts_ordered, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)'''),
+        (history_rows(), '''
+        INSERT INTO status_history (request_id, old_status, new_status, changed_by, changed_at)
+        VALUES (?, ?, ?, ?, ?)'''),
+    ]
+    for rows, sql in inserts:
+        while True:
+            chunk = [row for _, row in zip(range(GENERATE_CHUNK_SIZE), rows)]
+            if not chunk:
+                break
+            conn.executemany(sql, chunk)
+            conn.commit()
+    conn.close()
+
+    # Остальные миграции применяет пишущее соединение database.py
+    database.DB_PATH = db_path
+    database.reset_connections()
+    with database.get_db_connection() as conn:
+        conn.execute('ANALYZE')
+        conn.commit()
+    database.close_connections()
+
+    return {
+        'requests': requests, 'comments': comments, 'history': history,
+        'technicians': technicians, 'customers': customers, 'days': days,
+        'skew': skew, 'seed': seed, 'elapsed': time.perf_counter() - started,
+    }
+
+
+def _sample_parameters():
+    """Параметры сценариев, взятые из тестовой базы"""
+    with database.get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+        SELECT user_name FROM requests GROUP BY user_name ORDER BY COUNT(*) DESC LIMIT 1
+        ''')
+        customer = cursor.fetchone()[0]
+        cursor.execute('''
+        SELECT assigned_to FROM requests WHERE assigned_to IS NOT NULL
+        GROUP BY assigned_to ORDER BY COUNT(*) DESC LIMIT 2
+        ''')
+        technicians = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT id FROM users WHERE role = 'Администратор' LIMIT 1")
+        admin_id = cursor.fetchone()[0]
+        cursor.execute('SELECT MAX(id) FROM requests')
+        max_id = cursor.fetchone()[0]
+        cursor.execute('''
+        SELECT request_id FROM comments GROUP BY request_id ORDER BY COUNT(*) DESC LIMIT 1
+        ''')
+        busy_request = cursor.fetchone()[0]
+        cursor.execute('SELECT equipment_model FROM requests WHERE id = ?', (busy_request,))
+        model = cursor.fetchone()[0]
+    return {
+        'customer': customer,
+        'technician': technicians[0],
+        'other_technician': technicians[-1],
+        'admin': admin_id,
+        'request': busy_request,
+        'request_ids': list(range(max(1, max_id - 199), max_id + 1, 2)),
+        'search': model.split()[0],
+        'search_customer': customer.split()[0],
+    }
+
+
+def _build_cases(p):
+    """
+    Сценарии замеров: (имя, функция, количество повторов или None для значения по умолчанию).
+    Не замеряются функции без обращения к БД (hash_password, build_requests_filter и т.п.).
+    """
+    new_request = {'equipment_type': 'Кондиционер', 'equipment_model': 'Bench 1',
+                   'problem_description': 'Замер производительности', 'user_name': 'Замер Замеров',
+                   'user_phone': '+79990000000'}
+    bulk_rows = [dict(new_request) for _ in range(1000)]
+    user_seq = iter(range(10 ** 9))
+
+    def user_cycle():
+        login = f'bench_user_{next(user_seq)}'
+        database.create_user_db({'username': login, 'password': 'x', 'role': 'Оператор',
+                                 'full_name': 'Замер', 'phone': ''})
+        user = next(u for u in database.get_all_users() if u['username'] == login)
+        database.update_user_db(user['id'], {'role': 'Оператор', 'full_name': 'Замер 2', 'phone': ''})
+        database.delete_user_db(user['id'])
+
+    def uncached(loader):
+        def run():
+            database.invalidate_reference_cache()
+            return loader()
+        return run
+
+    def first_page(**filters):
+        return database.get_requests_page(**filters)['items']
+
+    def page_requests():
+        database.get_technicians()
+        database.count_requests()
+        return first_page(projection='list')
+
+    def page_requests_search():
+        database.count_requests(search_term=p['search'])
+        return database.search_requests_ranked(p['search'], projection='list')
+
+    def page_customer_requests():
+        database.count_requests_by_status(customer_name=p['customer'])
+        return first_page(customer_name=p['customer'])
+
+    def page_request_detail():
+        database.get_request_by_id(p['request'])
+        database.get_status_history(p['request'])
+        return database.get_comments(p['request'])
+
+    reads = [
+        ('get_all_requests', database.get_all_requests, 1),
+        ('find_requests(status)', lambda: database.find_requests(status='Новая заявка'), 1),
+        ('get_requests_page', first_page, None),
+        ('get_requests_page(list)', lambda: first_page(projection='list'), None),
+        ('get_requests_page(status)', lambda: first_page(status='В процессе ремонта'), None),
+        ('get_requests_page(customer)', lambda: first_page(customer_name=p['customer']), None),
+        ('get_requests_page(technician)', lambda: first_page(assigned_to=p['technician']), None),
+        ('count_requests', database.count_requests, None),
+        ('count_requests(status)', lambda: database.count_requests(status='Выполнено'), None),
+        ('count_requests_by_status', database.count_requests_by_status, None),
+        ('search_requests', lambda: database.search_requests(p['search_customer']), 1),
+        ('search_requests_ranked', lambda: database.search_requests_ranked(p['search']), None),
+        ('get_requests_by_customer', lambda: database.get_requests_by_customer(p['customer']), None),
+        ('get_request_by_id', lambda: database.get_request_by_id(p['request']), None),
+        ('get_comments', lambda: database.get_comments(p['request']), None),
+        ('get_status_history', lambda: database.get_status_history(p['request']), None),
+        ('get_statistics', database.get_statistics, None),
+        ('get_technicians', database.get_technicians, None),
+        ('get_technicians(без кэша)', uncached(database.get_technicians), None),
+        ('get_all_users', database.get_all_users, None),
+        ('get_all_users(без кэша)', uncached(database.get_all_users), None),
+        ('get_user_by_id', lambda: database.get_user_by_id(p['admin']), None),
+        ('get_technician_by_id', lambda: database.get_technician_by_id(p['technician']), None),
+        ('get_technician_tasks', lambda: database.get_technician_tasks(p['technician']), None),
+        ('count_active_assignments', lambda: database.count_active_assignments(p['technician']), None),
+        ('get_request_ids_with_technical_notes',
+         lambda: database.get_request_ids_with_technical_notes('сложн'), 1),
+        ('get_requests_needing_help', database.get_requests_needing_help, 1),
+        ('get_problem_requests', database.get_problem_requests, 1),
+        ('get_quality_summary', database.get_quality_summary, None),
+        ('check_statistics', database.check_statistics, 1),
+        # Загрузка данных страниц main.py
+        ('page:requests', page_requests, None),
+        ('page:requests(поиск)', page_requests_search, None),
+        ('page:customer_requests', page_customer_requests, None),
+        ('page:request_detail', page_request_detail, None),
+        ('page:my_tasks', lambda: database.get_technician_tasks(p['technician']), None),
+        ('page:statistics', database.get_statistics, None),
+        ('page:users', database.get_all_users, None),
+        ('page:quality_analytics', lambda: database.get_quality_summary(days_overdue=3), None),
+        ('page:problem_requests', lambda: database.get_problem_requests(days_overdue=3, waiting_days=5), 1),
+        ('page:assign_specialists', lambda: database.get_requests_needing_help(3, 'сложн'), 1),
+        ('page:extend_deadlines',
+         lambda: database.find_requests(status=['В процессе ремонта', 'Готово к выдаче'],
+                                        projection='summary'), 1),
+    ]
+    writes = [
+        ('create_request', lambda: database.create_request(new_request), None),
+        ('insert_requests_bulk(1000)', lambda: database.insert_requests_bulk(bulk_rows), None),
+        ('update_request_status',
+         lambda: database.update_request_status(p['request'], 'В процессе ремонта', p['admin']), None),
+        ('assign_technician', lambda: database.assign_technician(p['request'], p['technician']), None),
+        ('bulk_update_status(100)',
+         lambda: database.bulk_update_status(p['request_ids'], 'Готово к выдаче', p['admin']), None),
+        ('bulk_assign_technician(100)',
+         lambda: database.bulk_assign_technician(p['request_ids'], p['technician']), None),
+        ('reassign_technician_requests',
+         lambda: database.reassign_technician_requests(p['technician'], p['other_technician']), 1),
+        ('add_comment', lambda: database.add_comment(p['request'], p['admin'], 'Замер', False), None),
+        ('create/update/delete_user_db', user_cycle, None),
+        ('rebuild_statistics', database.rebuild_statistics, 1),
+        ('rebuild_search_index', database.rebuild_search_index, 1),
+    ]
+    return reads + writes
+
+
+def _measure(func, repeat):
+    """Прогрев и repeat замеров функции, время в мс"""
+    result = func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'runs': repeat,
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'max_ms': round(timings[-1], 3),
+        'rows': len(result) if isinstance(result, (list, dict)) else None,
+    }
+
+
+def run(db_path, repeat=5, only=None):
+    """
+    Выполнение сценариев на тестовой базе
+
+    Args:
+        db_path: Путь к тестовой базе
+        repeat: Количество замеров сценария (после одного прогрева)
+        only: Подстрока имени для выбора сценариев
+
+    Returns:
+        dict: {'meta': {...}, 'results': {имя: {runs, min_ms, median_ms, p95_ms, max_ms, rows}}}
+    """
+    database.DB_PATH = db_path
+    database.reset_connections()
+    with database.get_db_connection(readonly=True) as conn:
+        volumes = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                   for table in BASE_TABLES}
+
+    results = {}
+    for name, func, case_repeat in _build_cases(_sample_parameters()):
+        if only and only not in name:
+            continue
+        results[name] = _measure(func, case_repeat or repeat)
+        print(f"{name:<45} {results[name]['median_ms']:>10.2f} мс")
+    database.close_connections()
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'volumes': volumes,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.2, min_delta_ms=1.0):
+    """
+    Сравнение медиан с эталоном
+
+    Args:
+        baseline, current: Результаты run()
+        threshold: Допустимый относительный рост медианы (0.2 = 20%)
+        min_delta_ms: Изменения меньше этого порога не считаются регрессией
+
+    Returns:
+        List of dicts: name, baseline_ms, current_ms, ratio, regression
+    """
+    report = []
+    for name, item in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = item['median_ms'] / base['median_ms'] if base['median_ms'] else float('inf')
+        regression = (ratio > 1 + threshold and
+                      item['median_ms'] - base['median_ms'] > min_delta_ms)
+        report.append({'name': name, 'baseline_ms': base['median_ms'],
+                       'current_ms': item['median_ms'], 'ratio': ratio, 'regression': regression})
+    return report
+
+
+def _print_comparison(report):
+    regressions = 0
+    for item in report:
+        mark = 'РЕГРЕССИЯ' if item['regression'] else ''
+        regressions += item['regression']
+        print(f"{item['name']:<45} {item['baseline_ms']:>10.2f} -> {item['current_ms']:>10.2f} мс "
+              f"(x{item['ratio']:.2f}) {mark}")
+    print(f"Регрессий: {regressions}")
+    return 1 if regressions else 0
+
+
+def _load_json(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности базы данных")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('generate', help='Создать тестовую базу с синтетическими данными')
+    p.add_argument('--db', default='bench.db', help='Путь к тестовой базе')
+    p.add_argument('--requests', type=int, default=100000)
+    p.add_argument('--comments', type=int, default=500000)
+    p.add_argument('--history', type=int, default=300000)
+    p.add_argument('--technicians', type=int, default=50)
+    p.add_argument('--customers', type=int, default=20000)
+    p.add_argument('--days', type=int, default=730, help='Глубина истории заявок, дней')
+    p.add_argument('--skew', type=float, default=1.1, help='Показатель Ципфа для перекоса распределений')
+    p.add_argument('--seed', type=int, default=42)
+
+    p = subparsers.add_parser('run', help='Выполнить замеры')
+    p.add_argument('--db', default='bench.db', help='Путь к тестовой базе')
+    p.add_argument('--repeat', type=int, default=5, help='Замеров на сценарий')
+    p.add_argument('--only', help='Выполнить только сценарии, содержащие подстроку')
+    p.add_argument('--out', help='Файл для сохранения результата в JSON')
+    p.add_argument('--baseline', help='Эталонный результат для сравнения')
+    p.add_argument('--threshold', type=float, default=0.2, help='Допустимый рост медианы')
+
+    p = subparsers.add_parser('compare', help='Сравнить результат с эталоном')
+    p.add_argument('baseline')
+    p.add_argument('current')
+    p.add_argument('--threshold', type=float, default=0.2, help='Допустимый рост медианы')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        if os.path.abspath(args.db) == os.path.abspath(database.DB_PATH):
+            print("Генерация перезаписывает базу: укажите тестовую базу, а не рабочую")
+            return 1
+        info = generate(args.db, args.requests, args.comments, args.history, args.technicians,
+                        args.customers, args.days, args.skew, args.seed)
+        print(f"База {args.db} создана за {info['elapsed']:.1f} с: заявок {info['requests']}, "
+              f"комментариев {info['comments']}, записей истории {info['history']}")
+        return 0
+
+    if args.command == 'run':
+        if os.path.abspath(args.db) == os.path.abspath(database.DB_PATH):
+            print("Пишущие сценарии меняют данные: укажите тестовую базу, а не рабочую")
+            return 1
+        result = run(args.db, args.repeat, args.only)
+        if args.out:
+            with open(args.out, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+        if args.baseline:
+            return _print_comparison(compare(_load_json(args.baseline), result, args.threshold))
+        return 0
+
+    return _print_comparison(compare(_load_json(args.baseline), _load_json(args.current),
+                                     args.threshold))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
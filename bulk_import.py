@@ -0,0 +1,202 @@
+"""
+Пакетный импорт заявок из CSV/Parquet (выгрузки колл-центра и партнерских центров)
+
+Файл читается порциями, каждая порция проверяется и вставляется одной транзакцией
+через database.insert_requests_bulk. Если транзакция порции не прошла, порция
+повторяется построчно, чтобы отчет указал конкретные строки с ошибками.
+"""
+import os
+import sqlite3
+import time
+from datetime import date
+
+import database
+
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+# Поля заявки, которые можно загрузить из файла
+REQUIRED_FIELDS = ['equipment_type', 'equipment_model', 'problem_description', 'user_name', 'user_phone']
+OPTIONAL_FIELDS = ['status', 'created_at', 'assigned_at', 'completed_at']
+DATE_FIELDS = ['created_at', 'assigned_at', 'completed_at']
+
+# Значения, которые в выгрузках означают пустое поле
+NULL_VALUES = {'', 'null', 'NULL', 'None', 'nan', 'NaN'}
+
+# Написания статусов во внешних системах
+STATUS_ALIASES = {
+    'Готова к выдаче': 'Готово к выдаче',
+}
+
+
+def detect_format(filename):
+    """
+    Определение формата файла по расширению
+
+    Args:
+        filename: Имя файла
+
+    Returns:
+        str: 'csv' или 'parquet'
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in ('.parquet', '.pq'):
+        return 'parquet'
+    return 'csv'
+
+
+def read_csv_batches(source, delimiter=';', batch_size=IMPORT_BATCH_SIZE, encoding='utf-8'):
+    """
+    Потоковое чтение CSV порциями
+
+    Args:
+        source: Путь к файлу или файловый объект
+        delimiter: Разделитель колонок
+        batch_size: Количество строк в порции
+        encoding: Кодировка файла
+
+    Yields:
+        list: Порция строк в виде dict
+    """
+    import pandas as pd
+
+    reader = pd.read_csv(source, sep=delimiter, dtype=str, keep_default_na=False,
+                         chunksize=batch_size, encoding=encoding)
+    for chunk in reader:
+        yield chunk.to_dict('records')
+
+
+def read_parquet_batches(source, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Потоковое чтение Parquet по row group'ам
+
+    Args:
+        source: Путь к файлу или файловый объект
+        batch_size: Количество строк в порции
+
+    Yields:
+        list: Порция строк в виде dict
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(source)
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield batch.to_pylist()
+
+
+def _clean_value(value):
+    """Приведение значения из файла к строке или None"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, date):
+        return value.isoformat()[:10]
+    value = str(value).strip()
+    if value in NULL_VALUES:
+        return None
+    return value
+
+
+def validate_row(raw, column_map=None):
+    """
+    Проверка и нормализация строки импорта
+
+    Args:
+        raw: Строка файла в виде dict
+        column_map: Соответствие {колонка файла: поле заявки}
+
+    Returns:
+        tuple: (dict заявки или None, текст ошибки или None)
+    """
+    if column_map:
+        raw = {column_map.get(key, key): value for key, value in raw.items()}
+
+    row = {}
+    for field in REQUIRED_FIELDS + OPTIONAL_FIELDS:
+        row[field] = _clean_value(raw.get(field))
+
+    missing = [field for field in REQUIRED_FIELDS if not row[field]]
+    if missing:
+        return None, f"не заполнены поля: {', '.join(missing)}"
+
+    if row['status']:
+        row['status'] = STATUS_ALIASES.get(row['status'], row['status'])
+        if row['status'] not in database.REQUEST_STATUSES:
+            return None, f"неизвестный статус: {row['status']}"
+
+    for field in DATE_FIELDS:
+        if row[field]:
+            try:
+                row[field] = date.fromisoformat(row[field][:10])
+            except ValueError:
+                return None, f"некорректная дата в поле {field}: {row[field]}"
+
+    if row['status'] == 'Выполнено' and not row['completed_at']:
+        row['completed_at'] = row['created_at']
+
+    return row, None
+
+
+def import_requests(source, file_format=None, column_map=None, delimiter=';',
+                    batch_size=IMPORT_BATCH_SIZE, encoding='utf-8', progress=None):
+    """
+    Импорт заявок из файла
+
+    Args:
+        source: Путь к файлу или файловый объект (например, из st.file_uploader)
+        file_format: 'csv' или 'parquet'; по умолчанию определяется по имени файла
+        column_map: Соответствие {колонка файла: поле заявки}
+        delimiter: Разделитель колонок CSV
+        batch_size: Количество строк в одной транзакции
+        encoding: Кодировка CSV
+        progress: Необязательный callback(обработано_строк) после каждой порции
+
+    Returns:
+        dict: Отчет {total, imported, failed, errors, elapsed}; errors - список
+              {'row': номер строки файла, 'error': текст}
+    """
+    if file_format is None:
+        file_format = detect_format(getattr(source, 'name', str(source)))
+
+    if file_format == 'parquet':
+        batches = read_parquet_batches(source, batch_size)
+    else:
+        batches = read_csv_batches(source, delimiter, batch_size, encoding)
+
+    report = {'total': 0, 'imported': 0, 'failed': 0, 'errors': [], 'elapsed': 0.0}
+    started = time.perf_counter()
+
+    def add_error(line, message):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': line, 'error': message})
+
+    for batch in batches:
+        valid = []
+        for raw in batch:
+            report['total'] += 1
+            # Нумерация строк как в файле: первая строка - заголовок
+            line = report['total'] + 1
+            row, error = validate_row(raw, column_map)
+            if error:
+                add_error(line, error)
+            else:
+                valid.append((line, row))
+
+        if valid:
+            try:
+                report['imported'] += database.insert_requests_bulk([row for _, row in valid])
+            except sqlite3.Error:
+                # Повтор построчно, чтобы найти строки, которые не принимает база
+                for line, row in valid:
+                    try:
+                        report['imported'] += database.insert_requests_bulk([row])
+                    except sqlite3.Error as e:
+                        add_error(line, str(e))
+
+        if progress:
+            progress(report['total'])
+
+    report['elapsed'] = time.perf_counter() - started
+    return report
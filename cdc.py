@@ -0,0 +1,320 @@
+"""
+Журнал изменений (change data capture): инкрементальные копии и синхронизация
+
+Триггеры (миграция 7) пишут каждое изменение users, requests, comments и
+status_history в change_log с монотонно растущим seq. Здесь - выгрузка
+изменений после контрольной точки потребителя в файл (JSON Lines, gzip),
+применение таких файлов к копии базы и прямая синхронизация со вторичной базой.
+
+Восстановление: полная копия (manage.py backup) + файлы изменений по порядку:
+    python manage.py changes-export --name hourly
+    python manage.py changes-apply restored.db backups/changes-*.jsonl.gz
+
+Хеши паролей в журнал не попадают: пользователи, созданные после полной копии,
+восстанавливаются без пароля (вход заблокирован до смены пароля администратором).
+
+Журнал хранится CHANGE_LOG_RETENTION_DAYS дней, даже если потребители его не забрали
+(очистка - после каждой резервной копии и manage.py changes-prune). Потребителю,
+отставшему больше срока хранения, нужна новая полная копия.
+"""
+import gzip
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import dump_db
+from migrations import CDC_TABLES, raise_request_sequences
+
+CHANGES_PREFIX = 'changes'
+CHANGES_SUFFIX = '.jsonl.gz'
+APPLIED_CHECKPOINT = 'applied'
+# Служебная контрольная точка: наибольший seq, удаленный из журнала
+PRUNED_CHECKPOINT = 'pruned'
+FETCH_BATCH_SIZE = 5000
+# Срок хранения журнала изменений, дней (0 - только до получения всеми потребителями)
+CHANGE_LOG_RETENTION_DAYS = int(os.environ.get('SC_CHANGE_LOG_RETENTION_DAYS', 7))
+# Значения столбцов, которых нет в журнале, для новых строк базы-приемника.
+# Хеш '!' не совпадает ни с одним паролем
+INSERT_DEFAULTS = {
+    'users': {'password_hash': '!'},
+}
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def get_checkpoint(conn, name):
+    """
+    Последний seq, переданный потребителю name
+
+    Returns:
+        int или None, если потребитель еще не получал изменений
+    """
+    row = conn.execute('SELECT last_seq FROM cdc_checkpoints WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_checkpoint(conn, name, seq):
+    conn.execute('''
+    INSERT INTO cdc_checkpoints (name, last_seq, updated_at) VALUES (?, ?, datetime('now'))
+    ON CONFLICT (name) DO UPDATE SET last_seq = excluded.last_seq, updated_at = excluded.updated_at
+    ''', (name, seq))
+
+
+def _applied_seq(conn):
+    """
+    Последний seq источника, отраженный в базе-приемнике. Для свежей полной копии
+    это счетчик AUTOINCREMENT журнала на момент копирования (он сохраняется
+    и после очистки журнала).
+    """
+    applied = get_checkpoint(conn, APPLIED_CHECKPOINT)
+    if applied is None:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+        applied = row[0] if row else 0
+    return applied
+
+
+def _check_not_pruned(conn, since_seq):
+    """
+    Raises:
+        ValueError: Изменения после since_seq уже частично удалены из журнала
+    """
+    pruned = get_checkpoint(conn, PRUNED_CHECKPOINT) or 0
+    if since_seq < pruned:
+        raise ValueError(f"Изменения {since_seq + 1}..{pruned} уже удалены из журнала: "
+                         f"нужна новая полная копия")
+
+
+def _iter_changes(conn, since_seq, until_seq):
+    cursor = conn.execute('''
+    SELECT seq, table_name, op, row_id, data, changed_at
+    FROM change_log WHERE seq > ? AND seq <= ?
+    ORDER BY seq
+    ''', (since_seq, until_seq))
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            yield {
+                'seq': row['seq'],
+                'table': row['table_name'],
+                'op': row['op'],
+                'id': row['row_id'],
+                'data': json.loads(row['data']) if row['data'] is not None else None,
+                'at': row['changed_at'],
+            }
+
+
+def export_changes(database_path, name, output_dir=None):
+    """
+    Выгрузка изменений после контрольной точки потребителя в файл
+
+    Args:
+        database_path: Путь к базе-источнику
+        name: Имя потребителя (своя контрольная точка у каждого)
+        output_dir: Каталог для файлов изменений (по умолчанию каталог резервных копий базы)
+
+    Returns:
+        dict: path (None, если изменений нет), from_seq, to_seq, count
+
+    Raises:
+        ValueError: Потребитель отстал больше срока хранения журнала
+    """
+    conn = _connect(database_path)
+    try:
+        since = get_checkpoint(conn, name)
+        if since is None:
+            # Новый потребитель начинает с полной копии: журнал - с первой сохраненной записи
+            since = get_checkpoint(conn, PRUNED_CHECKPOINT) or 0
+        _check_not_pruned(conn, since)
+        until = conn.execute('SELECT coalesce(MAX(seq), 0) FROM change_log').fetchone()[0]
+        if until <= since:
+            return {'path': None, 'from_seq': since, 'to_seq': since, 'count': 0}
+
+        output_dir = output_dir or dump_db.backup_dir_for(database_path)
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, f'{CHANGES_PREFIX}-{name}-{since + 1:012d}-{until:012d}{CHANGES_SUFFIX}')
+        count = 0
+        with gzip.open(path + '.partial', 'wt', encoding='utf-8') as f:
+            header = {'from_seq': since, 'to_seq': until, 'source': os.path.basename(database_path),
+                      'created': datetime.now().isoformat(timespec='seconds')}
+            f.write(json.dumps(header, ensure_ascii=False) + '\n')
+            for change in _iter_changes(conn, since, until):
+                f.write(json.dumps(change, ensure_ascii=False) + '\n')
+                count += 1
+        os.replace(path + '.partial', path)
+        dump_db.write_checksum(path)
+
+        # Контрольная точка сдвигается только после того, как файл записан
+        _set_checkpoint(conn, name, until)
+        conn.commit()
+        return {'path': path, 'from_seq': since, 'to_seq': until, 'count': count}
+    finally:
+        conn.close()
+
+
+def _apply_change(cursor, change):
+    table = change['table']
+    columns = CDC_TABLES.get(table)
+    if columns is None:
+        raise ValueError(f"Неизвестная таблица в журнале изменений: {table}")
+    if change['op'] == 'D':
+        cursor.execute(f'DELETE FROM {table} WHERE id = ?', (change['id'],))
+        return
+    data = change['data']
+    defaults = INSERT_DEFAULTS.get(table, {})
+    values = [data.get(column) for column in columns] + list(defaults.values())
+    insert_columns = columns + list(defaults)
+    updates = ', '.join(f'{column} = excluded.{column}' for column in columns if column != 'id')
+    # UPSERT, а не INSERT OR REPLACE: REPLACE не запускает триггеры удаления
+    # (поисковый индекс и статистика разошлись бы с данными)
+    cursor.execute(f'''
+    INSERT INTO {table} ({', '.join(insert_columns)}) VALUES ({', '.join('?' * len(insert_columns))})
+    ON CONFLICT (id) DO UPDATE SET {updates}
+    ''', values)
+
+
+def _apply_stream(conn, changes):
+    """
+    Применение изменений с seq больше контрольной точки 'applied' одной транзакцией.
+    Записи журнала, созданные триггерами самой базы-приемника, удаляются.
+    """
+    applied = _applied_seq(conn)
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        local_seq = conn.execute('SELECT coalesce(MAX(seq), 0) FROM change_log').fetchone()[0]
+        cursor = conn.cursor()
+        count = 0
+        last = applied
+        for change in changes:
+            if change['seq'] <= last:
+                continue
+            _apply_change(cursor, change)
+            last = change['seq']
+            count += 1
+        # request_sequences в журнал не пишется: номера, пришедшие с заявками,
+        # не должны выделяться повторно
+        raise_request_sequences(cursor)
+        cursor.execute('DELETE FROM change_log WHERE seq > ?', (local_seq,))
+        _set_checkpoint(conn, APPLIED_CHECKPOINT, last)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {'applied': count, 'last_seq': last}
+
+
+def _read_changes_file(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        yield header
+        for line in f:
+            yield json.loads(line)
+
+
+def apply_changes(target_path, paths):
+    """
+    Применение файлов изменений к копии базы (по возрастанию seq)
+
+    Args:
+        target_path: База-приемник, восстановленная из полной копии
+        paths: Файлы изменений
+
+    Returns:
+        dict: applied - применено изменений, last_seq - последний примененный seq
+
+    Raises:
+        ValueError: Контрольная сумма не совпадает или между файлами пропущены изменения
+    """
+    files = []
+    for path in paths:
+        if not dump_db.verify_backup(path):
+            raise ValueError(f"Контрольная сумма не совпадает: {path}")
+        stream = _read_changes_file(path)
+        files.append((next(stream), path))
+    files.sort(key=lambda item: item[0]['from_seq'])
+
+    conn = _connect(target_path)
+    try:
+        total = 0
+        last = None
+        for header, path in files:
+            current = _applied_seq(conn)
+            if header['to_seq'] <= current:
+                continue
+            if header['from_seq'] > current:
+                raise ValueError(f"Пропущены изменения {current + 1}..{header['from_seq']} перед {path}")
+            stream = _read_changes_file(path)
+            next(stream)
+            result = _apply_stream(conn, stream)
+            total += result['applied']
+            last = result['last_seq']
+        return {'applied': total, 'last_seq': last}
+    finally:
+        conn.close()
+
+
+def sync_database(source_path, target_path, name):
+    """
+    Прямая передача изменений во вторичную базу (создается из полной копии источника)
+
+    Returns:
+        dict: applied, last_seq
+
+    Raises:
+        ValueError: Вторичная база отстала больше срока хранения журнала
+    """
+    source = _connect(source_path)
+    target = _connect(target_path)
+    try:
+        since = _applied_seq(target)
+        _check_not_pruned(source, since)
+        until = source.execute('SELECT coalesce(MAX(seq), 0) FROM change_log').fetchone()[0]
+        result = _apply_stream(target, _iter_changes(source, since, until))
+        _set_checkpoint(source, name, until)
+        source.commit()
+        return result
+    finally:
+        source.close()
+        target.close()
+
+
+def prune_change_log(database_path, retention_days=CHANGE_LOG_RETENTION_DAYS):
+    """
+    Удаление записей журнала, уже полученных всеми потребителями,
+    и записей старше срока хранения (даже если потребителей нет)
+
+    Args:
+        database_path: Путь к базе
+        retention_days: Срок хранения, дней (0 - без ограничения по возрасту)
+
+    Returns:
+        int: Количество удаленных записей
+    """
+    conn = _connect(database_path)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        consumed = conn.execute(
+            'SELECT coalesce(MIN(last_seq), 0) FROM cdc_checkpoints WHERE name NOT IN (?, ?)',
+            (APPLIED_CHECKPOINT, PRUNED_CHECKPOINT)
+        ).fetchone()[0]
+        expired = 0
+        if retention_days:
+            expired = conn.execute(
+                "SELECT coalesce(MAX(seq), 0) FROM change_log WHERE changed_at < datetime('now', ?)",
+                (f'-{retention_days} days',)
+            ).fetchone()[0]
+        upto = max(consumed, expired)
+        deleted = conn.execute('DELETE FROM change_log WHERE seq <= ?', (upto,)).rowcount
+        if upto > (get_checkpoint(conn, PRUNED_CHECKPOINT) or 0):
+            _set_checkpoint(conn, PRUNED_CHECKPOINT, upto)
+        conn.commit()
+        return deleted
+    finally:
+        conn.close()
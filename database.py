@@ -1,21 +1,465 @@
+import json
+import os
 import sqlite3
+import tempfile
+import threading
+import time
 from datetime import datetime, date
 from contextlib import contextmanager
 
+import db_profiler
+import migrations
+import records
+from records import Comment, Request, StatusChange, User
+
 # Регистрируем адаптеры для работы с датами
 sqlite3.register_adapter(date, lambda d: d.isoformat())
 sqlite3.register_converter("DATE", lambda s: date.fromisoformat(s.decode()))
 
-@contextmanager
-def get_db_connection():
-    """Контекстный менеджер для подключения к БД"""
-    conn = sqlite3.connect('service_center.db', detect_types=sqlite3.PARSE_DECLTYPES)
+# Путь к файлу базы (переопределяется переменной окружения SC_DB_PATH)
+DB_PATH = os.environ.get('SC_DB_PATH', 'service_center.db')
+
+# Допустимые статусы заявки (CHECK в таблице requests)
+REQUEST_STATUSES = ['Новая заявка', 'В процессе ремонта', 'Готово к выдаче', 'Выполнено']
+
+# Параметры подключений (применяются один раз при открытии соединения)
+BUSY_TIMEOUT_MS = 5000
+SYNCHRONOUS = 'NORMAL'
+CACHE_SIZE_KB = 16384
+HEALTH_CHECK_INTERVAL = 30  # секунд простоя, после которых соединение проверяется
+
+# Время жизни кэша справочников (пользователи, специалисты), секунд.
+# Изменения через функции этого модуля сбрасывают кэш сразу; TTL ограничивает
+# устаревание при изменениях из других процессов (manage.py и т.п.)
+REFERENCE_CACHE_TTL = 300
+
+# Периодичность PRAGMA optimize (секунд) и объем выборки для ANALYZE при нем
+OPTIMIZE_INTERVAL = 3600
+ANALYSIS_LIMIT = 400
+
+# Снимок базы для отчетов (analytics_snapshot): допустимое устаревание, секунд
+# (0 - отчеты читают рабочую базу), и путь к файлу снимка (по умолчанию рядом с базой)
+ANALYTICS_SNAPSHOT_MAX_AGE = float(os.environ.get('SC_ANALYTICS_MAX_AGE', 300))
+ANALYTICS_SNAPSHOT_PATH = os.environ.get('SC_ANALYTICS_SNAPSHOT_PATH')
+
+# Политика нумерации заявок:
+#   'gapless'    - номер выделяется в транзакции вставки, при ошибке откатывается
+#   'allow_gaps' - номер резервируется отдельной транзакцией и может быть пропущен
+REQUEST_NUMBER_GAP_POLICY = 'gapless'
+
+# Минимальная длина фрагмента для поиска по триграммам
+FTS_MIN_TERM_LENGTH = 3
+
+_local = threading.local()
+_pool_generation = 0
+_pool_lock = threading.Lock()
+_schema_ready = False
+_last_optimize = time.monotonic()
+_snapshot_state = {'generation': 0, 'taken_at': None, 'refreshing': False, 'error': None}
+_snapshot_lock = threading.Lock()
+# Снятие снимка (первое и фоновые обновления) - по одному за раз
+_snapshot_refresh_lock = threading.Lock()
+
+
+class _PooledConnection:
+    """Долгоживущее соединение потока и его служебное состояние"""
+    __slots__ = ('conn', 'generation', 'last_used', 'depth')
+
+    def __init__(self, conn, generation):
+        self.conn = conn
+        self.generation = generation
+        self.last_used = time.monotonic()
+        self.depth = 0
+
+
+def _open_connection(readonly, snapshot=False):
+    """
+    Открытие нового соединения с применением PRAGMA
+
+    Args:
+        readonly: True для соединения-читателя (запись запрещена)
+        snapshot: True для соединения со снимком базы для отчетов
+
+    Returns:
+        sqlite3.Connection: Настроенное соединение
+    """
+    if snapshot:
+        # Файл снимка не меняется после создания (новый снимок заменяет его целиком),
+        # поэтому блокировки не нужны
+        path = f'file:{_snapshot_path()}?mode=ro&immutable=1'
+    else:
+        path = DB_PATH
+    conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES,
+                           timeout=BUSY_TIMEOUT_MS / 1000, uri=snapshot,
+                           factory=db_profiler.connection_factory())
     conn.row_factory = sqlite3.Row
+    # Встроенная lower() в SQLite работает только с ASCII
+    conn.create_function('casefold', 1, _casefold, deterministic=True)
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+    conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KB}')
+    if readonly:
+        conn.execute('PRAGMA query_only = ON')
+    else:
+        # WAL позволяет читателям не блокироваться пишущим соединением
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute(f'PRAGMA synchronous = {SYNCHRONOUS}')
+        _ensure_schema(conn)
+    return conn
+
+
+def _casefold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+def _ensure_schema(conn):
+    """Применение недостающих миграций схемы (один раз на процесс)"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _pool_lock:
+        if not _schema_ready:
+            migrations.migrate(conn)
+            _schema_ready = True
+
+
+def _maybe_optimize(conn):
+    """
+    Периодический PRAGMA optimize на пишущем соединении: обновляет статистику
+    планировщика для таблиц, где она устарела (с ограничением analysis_limit)
+    """
+    global _last_optimize
+    now = time.monotonic()
+    if now - _last_optimize < OPTIMIZE_INTERVAL:
+        return
+    _last_optimize = now
+    try:
+        conn.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+        conn.execute('PRAGMA optimize')
+    except sqlite3.Error as e:
+        print(f"Ошибка при оптимизации базы данных: {e}")
+
+
+def _is_healthy(conn):
+    """Проверка, что соединение живое и отвечает на запросы"""
     try:
-        yield conn
+        conn.execute('SELECT 1').fetchone()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def _thread_handles():
+    """Соединения текущего потока: роль ('reader'/'writer') -> _PooledConnection"""
+    handles = getattr(_local, 'handles', None)
+    if handles is None:
+        handles = _local.handles = {}
+    return handles
+
+
+def _checkout(role):
+    """
+    Получение соединения текущего потока (читателя или писателя).
+    Соединение переоткрывается, если пул был сброшен или проверка не прошла.
+    """
+    handles = _thread_handles()
+
+    handle = handles.get(role)
+    now = time.monotonic()
+    generation = _pool_generation
+    if role == 'snapshot':
+        generation = (_pool_generation, _snapshot_state['generation'])
+    if handle is not None and handle.depth == 0:
+        stale = handle.generation != generation
+        idle = now - handle.last_used > HEALTH_CHECK_INTERVAL
+        if stale or (idle and not _is_healthy(handle.conn)):
+            _close_quietly(handle.conn)
+            handle = None
+
+    if handle is None:
+        if role == 'reader' and not _schema_ready:
+            # Схема достраивается пишущим соединением; читатель может открыться первым
+            _checkout('writer')
+        handle = _PooledConnection(_open_connection(readonly=(role != 'writer'), snapshot=(role == 'snapshot')),
+                                   generation)
+        handles[role] = handle
+
+    handle.last_used = now
+    return handle
+
+
+@contextmanager
+def get_db_connection(readonly=False):
+    """
+    Контекстный менеджер для подключения к БД.
+    Соединения живут в пределах потока и переиспользуются между вызовами.
+
+    Args:
+        readonly: True для запросов на чтение (отдельное соединение-читатель;
+                  внутри analytics_snapshot() - соединение со снимком)
+    """
+    if not readonly:
+        role = 'writer'
+    elif getattr(_local, 'snapshot', False):
+        role = 'snapshot'
+    else:
+        role = 'reader'
+    handle = _checkout(role)
+    handle.depth += 1
+    try:
+        yield handle.conn
+    finally:
+        handle.depth -= 1
+        if handle.depth == 0:
+            # Незавершенная транзакция не должна переживать вызов
+            if handle.conn.in_transaction:
+                handle.conn.rollback()
+            if not readonly:
+                _maybe_optimize(handle.conn)
+
+
+def close_connections():
+    """
+    Закрытие соединений текущего потока
+    """
+    handles = getattr(_local, 'handles', None)
+    if not handles:
+        return
+    for handle in handles.values():
+        _close_quietly(handle.conn)
+    handles.clear()
+
+
+def reset_connections():
+    """
+    Сброс пула: все потоки переоткроют соединения при следующем обращении.
+    Нужен после смены DB_PATH или восстановления файла базы.
+    """
+    global _pool_generation, _schema_ready
+    with _pool_lock:
+        _pool_generation += 1
+        _schema_ready = False
+    close_connections()
+
+
+def _snapshot_path():
+    return ANALYTICS_SNAPSHOT_PATH or f'{DB_PATH}.analytics'
+
+
+def refresh_analytics_snapshot():
+    """
+    Создание нового снимка базы для отчетов.
+    Копия снимается backup API за один шаг: это одна читающая транзакция,
+    которая в режиме WAL не мешает пишущим соединениям.
+    Одновременные вызовы выполняются по очереди.
+
+    Returns:
+        datetime: Момент, на который сняты данные
+    """
+    with _snapshot_refresh_lock:
+        return _refresh_snapshot_locked()
+
+
+def _refresh_snapshot_locked():
+    if not _schema_ready:
+        # Снимок должен содержать актуальную схему
+        _checkout('writer')
+    path = _snapshot_path()
+    # Уникальный временный файл рядом со снимком: os.replace не пересекает файловые системы
+    fd, temporary = tempfile.mkstemp(prefix=os.path.basename(path) + '.',
+                                     suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    taken_at = datetime.now()
+    try:
+        source = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000)
+        target = sqlite3.connect(temporary)
+        try:
+            source.backup(target)
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+            source.close()
+        # Открытые соединения продолжают читать прежний файл до переоткрытия
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    with _snapshot_lock:
+        _snapshot_state['generation'] += 1
+        _snapshot_state['taken_at'] = taken_at
+        _snapshot_state['error'] = None
+    return taken_at
+
+
+def _refresh_snapshot_in_background():
+    error = None
+    try:
+        refresh_analytics_snapshot()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Ошибка при обновлении снимка для отчетов: {e}")
+        error = str(e)
+    with _snapshot_lock:
+        if error is not None:
+            _snapshot_state['error'] = error
+        _snapshot_state['refreshing'] = False
+
+
+def _snapshot_schema_version(path):
+    """Версия схемы в файле снимка (None, если файл не читается как база)"""
+    try:
+        conn = sqlite3.connect(f'file:{path}?mode=ro&immutable=1', uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        return migrations.get_schema_version(conn)
+    except sqlite3.Error:
+        return None
     finally:
         conn.close()
 
+
+def _load_first_snapshot():
+    """
+    Первый снимок процесса: оставшийся от предыдущего запуска, если его схема
+    актуальна, иначе новый. Выполняется под блокировкой обновления, поэтому
+    одновременные первые обращения не снимают копию параллельно.
+    """
+    with _snapshot_refresh_lock:
+        if _snapshot_state['taken_at'] is not None:
+            return
+        path = _snapshot_path()
+        if os.path.exists(path) and _snapshot_schema_version(path) == migrations.LATEST_VERSION:
+            with _snapshot_lock:
+                _snapshot_state['taken_at'] = datetime.fromtimestamp(os.path.getmtime(path))
+        else:
+            _refresh_snapshot_locked()
+
+
+def _current_snapshot():
+    """
+    Время актуального снимка. Если снимка нет - он создается сразу;
+    если он устарел - обновляется в фоне, а до замены читается прежний.
+    """
+    if _snapshot_state['taken_at'] is None:
+        _load_first_snapshot()
+    with _snapshot_lock:
+        taken_at = _snapshot_state['taken_at']
+        stale = (datetime.now() - taken_at).total_seconds() > ANALYTICS_SNAPSHOT_MAX_AGE
+        start_refresh = stale and not _snapshot_state['refreshing']
+        if start_refresh:
+            _snapshot_state['refreshing'] = True
+    if start_refresh:
+        threading.Thread(target=_refresh_snapshot_in_background, name='analytics-snapshot',
+                         daemon=True).start()
+    return taken_at
+
+
+@contextmanager
+def analytics_snapshot():
+    """
+    Чтение отчетов из снимка базы: длинные читающие запросы (статистика,
+    аналитика, выгрузки) не конкурируют с операторами за рабочий файл базы.
+    Внутри блока get_db_connection(readonly=True) открывает снимок;
+    запись идет в рабочую базу как обычно.
+
+        with database.analytics_snapshot() as data_as_of:
+            summary = database.get_quality_summary()
+
+    Yields:
+        datetime: Момент, на который сняты данные, или None, если снимки
+                  выключены (ANALYTICS_SNAPSHOT_MAX_AGE = 0) или недоступны
+    """
+    taken_at = None
+    if ANALYTICS_SNAPSHOT_MAX_AGE > 0:
+        try:
+            taken_at = _current_snapshot()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Снимок для отчетов недоступен, чтение из рабочей базы: {e}")
+    previous = getattr(_local, 'snapshot', False)
+    _local.snapshot = taken_at is not None
+    try:
+        yield taken_at
+    finally:
+        _local.snapshot = previous
+
+
+def get_analytics_snapshot_status():
+    """
+    Состояние снимка для отчетов
+
+    Returns:
+        dict: enabled, max_age, taken_at, refreshing, error
+    """
+    return {
+        'enabled': ANALYTICS_SNAPSHOT_MAX_AGE > 0,
+        'max_age': ANALYTICS_SNAPSHOT_MAX_AGE,
+        'taken_at': _snapshot_state['taken_at'],
+        'refreshing': _snapshot_state['refreshing'],
+        'error': _snapshot_state['error'],
+    }
+
+
+def _begin_immediate(conn):
+    """
+    Начало пишущей транзакции с немедленным захватом блокировки записи.
+    Конкурирующие писатели (в том числе из других процессов) ждут busy_timeout.
+
+    Raises:
+        sqlite3.ProgrammingError: На соединении уже открыта транзакция (например,
+            вызов внутри чужого блока записи) - она не фиксируется молча
+    """
+    if conn.in_transaction:
+        raise sqlite3.ProgrammingError("Пишущая транзакция начинается внутри уже открытой транзакции")
+    conn.execute('BEGIN IMMEDIATE')
+
+
+def _allocate_request_numbers(cursor, year, count=1):
+    """
+    Выделение номеров заявок из последовательности года.
+    Должно вызываться внутри пишущей транзакции.
+
+    Args:
+        cursor: Курсор пишущего соединения
+        year: Год нумерации
+        count: Сколько номеров выделить подряд
+
+    Returns:
+        int: Первый выделенный порядковый номер
+    """
+    cursor.execute('''
+    UPDATE request_sequences SET last_value = last_value + ?
+    WHERE year = ?
+    RETURNING last_value
+    ''', (count, year))
+    row = cursor.fetchone()
+    if row is not None:
+        return row[0] - count + 1
+
+    # Первая заявка года: продолжаем нумерацию уже существующих номеров.
+    # Диапазон по request_number использует индекс ограничения UNIQUE(request_number)
+    # (sqlite_autoindex_requests_1; отдельный idx_requests_number удален миграцией 5).
+    prefix = f'REQ-{year}-'
+    cursor.execute('''
+    SELECT MAX(CAST(substr(request_number, ?) AS INTEGER))
+    FROM requests
+    WHERE request_number >= ? AND request_number < ?
+    ''', (len(prefix) + 1, prefix, f'REQ-{year}.'))
+    last_value = cursor.fetchone()[0] or 0
+    cursor.execute('INSERT INTO request_sequences (year, last_value) VALUES (?, ?)',
+                   (year, last_value + count))
+    return last_value + 1
+
+
+def _format_request_number(year, number):
+    return f'REQ-{year}-{number:04d}'
+
+
 def create_request(request_data):
     """
     Создание новой заявки согласно п.2.1 ТЗ
@@ -23,48 +467,111 @@ def create_request(request_data):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            
+
             # генерация номера заявки: REQ-ГГГГ-ПППП
             year = datetime.now().year
-            cursor.execute('SELECT COUNT(*) FROM requests WHERE strftime("%Y", created_at) = ?', (str(year),))
-            count = cursor.fetchone()[0] + 1
-            request_number = f'REQ-{year}-{count:04d}'
-            
-            cursor.execute('''
-            INSERT INTO requests 
-            (request_number, equipment_type, equipment_model, problem_description, 
-             user_name, user_phone, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                request_number,
-                request_data['equipment_type'],
-                request_data['equipment_model'],
-                request_data['problem_description'],
-                request_data['user_name'],
-                request_data['user_phone'],
-                'Новая заявка'
-            ))
-            
-            request_id = cursor.lastrowid
+            if REQUEST_NUMBER_GAP_POLICY == 'allow_gaps':
+                _begin_immediate(conn)
+                number = _allocate_request_numbers(cursor, year)
+                conn.commit()
+                _begin_immediate(conn)
+            else:
+                _begin_immediate(conn)
+                number = _allocate_request_numbers(cursor, year)
+            request_id = _insert_request_tx(cursor, request_data, _format_request_number(year, number))
             conn.commit()
             return request_id
     except Exception as e:
         print(f"Ошибка при создании заявки: {e}")
         return None
 
-def get_all_requests():
+
+def _insert_request_tx(cursor, request_data, request_number):
+    """Вставка новой заявки с выделенным номером внутри открытой транзакции"""
+    cursor.execute('''
+    INSERT INTO requests 
+    (request_number, equipment_type, equipment_model, problem_description, 
+     user_name, user_phone, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        request_number,
+        request_data['equipment_type'],
+        request_data['equipment_model'],
+        request_data['problem_description'],
+        request_data['user_name'],
+        request_data['user_phone'],
+        'Новая заявка'
+    ))
+    return cursor.lastrowid
+
+
+def _create_request_tx(cursor, request_data):
+    """Выделение номера и вставка заявки внутри открытой пишущей транзакции"""
+    year = datetime.now().year
+    number = _allocate_request_numbers(cursor, year)
+    return _insert_request_tx(cursor, request_data, _format_request_number(year, number))
+
+
+def _allocate_request_number_tx(cursor):
+    """Выделение номера заявки текущего года внутри открытой пишущей транзакции"""
+    year = datetime.now().year
+    return _format_request_number(year, _allocate_request_numbers(cursor, year))
+
+
+def insert_requests_bulk(rows):
     """
-    Получение всех заявок для отображения списка
+    Пакетная вставка заявок одной транзакцией.
+    Номера выделяются блоком из последовательности текущего года.
+
+    Args:
+        rows: Список dict с полями equipment_type, equipment_model, problem_description,
+              user_name, user_phone и необязательными status, created_at,
+              assigned_at, completed_at
+
+    Returns:
+        int: Количество вставленных заявок
+
+    Raises:
+        sqlite3.Error: При ошибке вставка всего пакета откатывается
     """
+    if not rows:
+        return 0
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-        SELECT r.*, u.full_name as assigned_name 
-        FROM requests r
-        LEFT JOIN users u ON r.assigned_to = u.id
-        ORDER BY r.created_at DESC, r.id DESC
-        ''')
-        return [dict(row) for row in cursor.fetchall()]
+        year = datetime.now().year
+        _begin_immediate(conn)
+        first_number = _allocate_request_numbers(cursor, year, len(rows))
+        cursor.executemany('''
+        INSERT INTO requests
+        (request_number, equipment_type, equipment_model, problem_description,
+         user_name, user_phone, status, created_at, assigned_at, completed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, coalesce(?, date('now')), ?, ?)
+        ''', (
+            (
+                _format_request_number(year, first_number + i),
+                row['equipment_type'],
+                row['equipment_model'],
+                row['problem_description'],
+                row['user_name'],
+                row['user_phone'],
+                row.get('status') or 'Новая заявка',
+                row.get('created_at'),
+                row.get('assigned_at'),
+                row.get('completed_at')
+            )
+            for i, row in enumerate(rows)
+        ))
+        conn.commit()
+        return len(rows)
+
+def get_all_requests(projection='list'):
+    """
+    Получение всех заявок для отображения списка
+
+    Args:
+        projection: Набор столбцов (см. REQUEST_PROJECTIONS)
+    """
+    return find_requests(projection=projection)
 
 def update_request_status(request_id, new_status, user_id):
     """
@@ -73,25 +580,31 @@ def update_request_status(request_id, new_status, user_id):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT status FROM requests WHERE id = ?', (request_id,))
-            old_status = cursor.fetchone()[0]
-            cursor.execute('''
-            UPDATE requests 
-            SET status = ?, 
-                completed_at = CASE WHEN ? = 'completed' THEN date('now') ELSE completed_at END
-            WHERE id = ?
-            ''', (new_status, new_status, request_id))
-            cursor.execute('''
-            INSERT INTO status_history (request_id, old_status, new_status, changed_by)
-            VALUES (?, ?, ?, ?)
-            ''', (request_id, old_status, new_status, user_id))
-            
+            _update_request_status_tx(cursor, request_id, new_status, user_id)
             conn.commit()
             return True
     except Exception as e:
         print(f"Ошибка при обновлении статуса: {e}")
         return False
 
+
+def _update_request_status_tx(cursor, request_id, new_status, user_id):
+    """Смена статуса одной заявки с записью в историю внутри открытой транзакции"""
+    cursor.execute('SELECT status FROM requests WHERE id = ?', (request_id,))
+    row = cursor.fetchone()
+    if row is None:
+        raise ValueError(f"Заявка {request_id} не найдена")
+    cursor.execute('''
+    UPDATE requests 
+    SET status = ?, 
+        completed_at = CASE WHEN ? = 'Выполнено' THEN date('now') ELSE completed_at END
+    WHERE id = ?
+    ''', (new_status, new_status, request_id))
+    cursor.execute('''
+    INSERT INTO status_history (request_id, old_status, new_status, changed_by)
+    VALUES (?, ?, ?, ?)
+    ''', (request_id, row[0], new_status, user_id))
+
 def assign_technician(request_id, technician_id):
     """
     Назначение специалиста на заявку
@@ -99,68 +612,328 @@ def assign_technician(request_id, technician_id):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            
-            if technician_id: 
-                cursor.execute('''
-                UPDATE requests 
-                SET assigned_to = ?, assigned_at = date('now')
-                WHERE id = ?
-                ''', (technician_id, request_id))
-            else: 
-                cursor.execute('''
-                UPDATE requests 
-                SET assigned_to = NULL, assigned_at = NULL
-                WHERE id = ?
-                ''', (request_id,))
-            
+            _assign_technician_tx(cursor, request_id, technician_id)
             conn.commit()
             return True
     except Exception as e:
         print(f"Ошибка при назначении специалиста: {e}")
         return False
 
+
+def _assign_technician_tx(cursor, request_id, technician_id):
+    """Назначение (или снятие при technician_id=None) специалиста внутри открытой транзакции"""
+    if technician_id: 
+        cursor.execute('''
+        UPDATE requests 
+        SET assigned_to = ?, assigned_at = date('now')
+        WHERE id = ?
+        ''', (technician_id, request_id))
+    else: 
+        cursor.execute('''
+        UPDATE requests 
+        SET assigned_to = NULL, assigned_at = NULL
+        WHERE id = ?
+        ''', (request_id,))
+
+def _ids_json(request_ids):
+    """Список ID заявок в виде JSON-массива для json_each"""
+    return json.dumps([int(request_id) for request_id in request_ids])
+
+
+def _set_status_tx(cursor, ids_json, new_status, user_id):
+    """
+    Смена статуса набора заявок внутри открытой транзакции.
+    История пишется одним INSERT ... SELECT до обновления, пока виден старый статус.
+    Заявки, уже находящиеся в new_status, пропускаются.
+    """
+    cursor.execute('''
+    INSERT INTO status_history (request_id, old_status, new_status, changed_by)
+    SELECT id, status, ?, ?
+    FROM requests
+    WHERE id IN (SELECT value FROM json_each(?)) AND status != ?
+    ''', (new_status, user_id, ids_json, new_status))
+    cursor.execute('''
+    UPDATE requests
+    SET status = ?,
+        completed_at = CASE WHEN ? = 'Выполнено' THEN date('now') ELSE completed_at END
+    WHERE id IN (SELECT value FROM json_each(?)) AND status != ?
+    ''', (new_status, new_status, ids_json, new_status))
+    return cursor.rowcount
+
+
+def _reassign_tx(cursor, from_technician_id, to_technician_id, only_active=True):
+    """
+    Передача заявок одного специалиста другому внутри открытой транзакции.
+    to_technician_id=None снимает назначение.
+    """
+    cursor.execute('''
+    UPDATE requests
+    SET assigned_to = ?,
+        assigned_at = CASE WHEN ? IS NULL THEN NULL ELSE date('now') END
+    WHERE assigned_to = ? AND (? = 0 OR status != 'Выполнено')
+    ''', (to_technician_id, to_technician_id, from_technician_id, int(only_active)))
+    return cursor.rowcount
+
+
+def bulk_update_status(request_ids, new_status, user_id):
+    """
+    Массовая смена статуса заявок одной транзакцией
+
+    Args:
+        request_ids: Список ID заявок
+        new_status: Новый статус
+        user_id: ID пользователя, меняющего статус
+
+    Returns:
+        int: Количество заявок, у которых изменился статус, или None при ошибке
+    """
+    if new_status not in REQUEST_STATUSES:
+        print(f"Неизвестный статус: {new_status}")
+        return None
+    if not request_ids:
+        return 0
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            _begin_immediate(conn)
+            changed = _set_status_tx(cursor, _ids_json(request_ids), new_status, user_id)
+            conn.commit()
+            return changed
+    except Exception as e:
+        print(f"Ошибка при массовом обновлении статуса: {e}")
+        return None
+
+
+def bulk_assign_technician(request_ids, technician_id):
+    """
+    Назначение специалиста на несколько заявок одним запросом
+
+    Args:
+        request_ids: Список ID заявок
+        technician_id: ID специалиста или None для снятия назначения
+
+    Returns:
+        int: Количество обновленных заявок или None при ошибке
+    """
+    if not request_ids:
+        return 0
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            UPDATE requests
+            SET assigned_to = ?,
+                assigned_at = CASE WHEN ? IS NULL THEN NULL ELSE date('now') END
+            WHERE id IN (SELECT value FROM json_each(?))
+            ''', (technician_id, technician_id, _ids_json(request_ids)))
+            conn.commit()
+            return cursor.rowcount
+    except Exception as e:
+        print(f"Ошибка при массовом назначении специалиста: {e}")
+        return None
+
+
+def reassign_technician_requests(from_technician_id, to_technician_id=None, only_active=True):
+    """
+    Передача заявок специалиста другому специалисту (например, при увольнении)
+
+    Args:
+        from_technician_id: ID специалиста, с которого снимаются заявки
+        to_technician_id: ID нового специалиста или None для снятия назначения
+        only_active: Не трогать выполненные заявки
+
+    Returns:
+        int: Количество переназначенных заявок или None при ошибке
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            changed = _reassign_tx(cursor, from_technician_id, to_technician_id, only_active)
+            conn.commit()
+            return changed
+    except Exception as e:
+        print(f"Ошибка при переназначении заявок: {e}")
+        return None
+
+
+def get_technician_tasks(technician_id):
+    """
+    Незавершенные заявки специалиста для страницы "Мои задачи" (п.2.4 ТЗ)
+
+    Args:
+        technician_id: ID специалиста
+
+    Returns:
+        List of Request: Заявки в порядке срочности статуса, новые первыми
+    """
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+        SELECT r.* FROM requests r
+        WHERE r.assigned_to = ? AND r.status != 'Выполнено'
+        ORDER BY 
+            CASE r.status 
+                WHEN 'В процессе ремонта' THEN 1
+                WHEN 'Готово к выдаче' THEN 2
+                WHEN 'Новая заявка' THEN 3
+                ELSE 4
+            END,
+            r.created_at DESC, r.id DESC
+        ''', (technician_id,))
+        return records.fetch_all(cursor, Request)
+
+
+def count_active_assignments(technician_id):
+    """
+    Количество незавершенных заявок, назначенных на специалиста
+    """
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+        SELECT COUNT(*) FROM requests WHERE assigned_to = ? AND status != 'Выполнено'
+        ''', (technician_id,))
+        return cursor.fetchone()[0]
+
 def get_statistics():
     """
     Расчет статистики согласно п.2.5 ТЗ
     ТОЛЬКО ДАТА - расчет в днях
+    Читается из накопительной таблицы request_stats (по строке на тип оборудования)
     """
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM requests')
-        total = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM requests WHERE status = 'completed'")
-        completed = cursor.fetchone()[0]
         cursor.execute('''
-        SELECT AVG(
-            julianday(completed_at) - julianday(created_at)
-        )
-        FROM requests 
-        WHERE status = 'completed' 
-          AND completed_at IS NOT NULL 
-          AND created_at IS NOT NULL
+        SELECT equipment_type, total, completed, completion_days_sum, completion_days_count
+        FROM request_stats
+        WHERE total > 0
+        ORDER BY total DESC
         ''')
-        avg_days_result = cursor.fetchone()[0]
-        avg_days = round(avg_days_result, 2) if avg_days_result else 0
-        cursor.execute('''
-        SELECT equipment_type, COUNT(*) as count
-        FROM requests
-        GROUP BY equipment_type
-        ORDER BY count DESC
-        ''')
-        equipment_stats = [dict(row) for row in cursor.fetchall()]
-        return {
-            'total_requests': total,
-            'completed_requests': completed,
-            'avg_completion_days': avg_days,
-            'equipment_stats': equipment_stats
-        }
+        rows = cursor.fetchall()
+    return _summarize_statistics(rows)
 
 
-def get_technicians():
+def _summarize_statistics(rows):
+    """Итоги get_statistics по строкам статистики типов оборудования (общие для хранилищ)"""
+    total = sum(row['total'] for row in rows)
+    completed = sum(row['completed'] for row in rows)
+    days_sum = sum(row['completion_days_sum'] for row in rows)
+    days_count = sum(row['completion_days_count'] for row in rows)
+    avg_days = round(days_sum / days_count, 2) if days_count else 0
+    equipment_stats = [{'equipment_type': row['equipment_type'], 'count': row['total']} for row in rows]
+    return {
+        'total_requests': total,
+        'completed_requests': completed,
+        'avg_completion_days': avg_days,
+        'equipment_stats': equipment_stats
+    }
+
+
+def check_statistics():
     """
-    Получение списка всех специалистов
+    Сверка накопительной статистики с фактическими данными заявок
+
+    Returns:
+        List of dicts: Расхождения по типам оборудования (пустой список - расхождений нет)
     """
-    with get_db_connection() as conn:
+    columns = ('total', 'completed', 'completion_days_sum', 'completion_days_count')
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(migrations.REQUEST_STATS_QUERY)
+        actual = {row['equipment_type']: row for row in cursor.fetchall()}
+        cursor.execute('SELECT * FROM request_stats')
+        stored = {row['equipment_type']: row for row in cursor.fetchall()}
+
+    drift = []
+    for equipment_type in sorted(set(actual) | set(stored)):
+        for column in columns:
+            expected = actual[equipment_type][column] if equipment_type in actual else 0
+            found = stored[equipment_type][column] if equipment_type in stored else 0
+            if abs(expected - found) > 1e-6:
+                drift.append({
+                    'equipment_type': equipment_type,
+                    'column': column,
+                    'expected': expected,
+                    'stored': found
+                })
+    return drift
+
+
+def rebuild_statistics():
+    """
+    Пересчет накопительной статистики по всем заявкам
+
+    Returns:
+        bool: True если пересчитано, False при ошибке
+    """
+    try:
+        with get_db_connection() as conn:
+            _begin_immediate(conn)
+            migrations.fill_request_stats(conn.cursor())
+            conn.commit()
+            return True
+    except Exception as e:
+        print(f"Ошибка при пересчете статистики: {e}")
+        return False
+
+
+_reference_cache = {}
+_reference_cache_lock = threading.Lock()
+_reference_cache_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _cached_reference(name, loader):
+    """
+    Чтение справочника через кэш процесса.
+    Значение загружается loader() при промахе или по истечении REFERENCE_CACHE_TTL.
+    """
+    now = time.monotonic()
+    with _reference_cache_lock:
+        entry = _reference_cache.get(name)
+        if entry is not None and now - entry[0] < REFERENCE_CACHE_TTL:
+            _reference_cache_stats['hits'] += 1
+            return entry[1]
+        _reference_cache_stats['misses'] += 1
+        generation = _reference_cache_stats['invalidations']
+    # Справочники всегда читаются из рабочей базы, даже внутри analytics_snapshot()
+    previous = getattr(_local, 'snapshot', False)
+    _local.snapshot = False
+    try:
+        value = loader()
+    finally:
+        _local.snapshot = previous
+    with _reference_cache_lock:
+        # Не сохраняем значение, если кэш сбросили во время загрузки
+        if generation == _reference_cache_stats['invalidations']:
+            _reference_cache[name] = (now, value)
+    return value
+
+
+def invalidate_reference_cache():
+    """
+    Сброс кэша справочников. Вызывается после изменения пользователей.
+    """
+    with _reference_cache_lock:
+        _reference_cache.clear()
+        _reference_cache_stats['invalidations'] += 1
+
+
+def get_reference_cache_stats():
+    """
+    Счетчики кэша справочников для мониторинга
+
+    Returns:
+        dict: hits, misses, invalidations, hit_rate, entries
+    """
+    with _reference_cache_lock:
+        stats = dict(_reference_cache_stats)
+        stats['entries'] = sorted(_reference_cache)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def _load_technicians():
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute('''
         SELECT id, full_name, phone 
@@ -168,23 +941,540 @@ def get_technicians():
         WHERE role = 'Специалист'  
         ORDER BY full_name
         ''')
-        return [dict(row) for row in cursor.fetchall()]
+        technicians = records.fetch_all(cursor, User)
+    return technicians, {t['id']: t for t in technicians}
+
+
+def get_technicians():
+    """
+    Получение списка всех специалистов (из кэша справочников)
+    """
+    return list(_cached_reference('technicians', _load_technicians)[0])
 
 
-def search_requests(search_term):
+def get_technician_by_id(technician_id):
+    """
+    Получение специалиста по ID (из кэша справочников)
+
+    Returns:
+        User или None
+    """
+    return _cached_reference('technicians', _load_technicians)[1].get(technician_id)
+
+
+def search_requests(search_term, projection='list'):
     """
     Поиск заявок по номеру или ФИО заказчика согласно п.2.3 ТЗ
+
+    Args:
+        search_term: Строка поиска
+        projection: Набор столбцов (см. REQUEST_PROJECTIONS)
     """
-    with get_db_connection() as conn:
+    return find_requests(search_term=search_term, projection=projection)
+
+
+REQUESTS_PAGE_SIZE = 50
+
+# Наборы столбцов заявки для выборок (projection):
+#   'list'    - карточки списков: номер, статус, заказчик, оборудование, дата создания;
+#               читаются целиком из покрывающего индекса idx_requests_list
+#   'summary' - все, кроме длинного описания проблемы
+#   'detail'  - вся строка (страница заявки, выгрузка, API)
+# Порядок столбцов - как у полей records.Request
+REQUEST_PROJECTIONS = {
+    'list': ['id', 'request_number', 'created_at', 'equipment_type', 'equipment_model',
+             'user_name', 'user_phone', 'status', 'assigned_to'],
+    'summary': ['id', 'request_number', 'created_at', 'equipment_type', 'equipment_model',
+                'user_name', 'user_phone', 'status', 'assigned_to', 'assigned_at', 'completed_at'],
+    'detail': None,
+}
+
+
+def _request_columns(projection):
+    """
+    Список столбцов заявки для SELECT (с алиасом r)
+
+    Raises:
+        ValueError: Неизвестный набор столбцов
+    """
+    if projection not in REQUEST_PROJECTIONS:
+        raise ValueError(f"Неизвестный набор столбцов заявки: {projection}")
+    columns = REQUEST_PROJECTIONS[projection]
+    return 'r.*' if columns is None else ', '.join(f'r.{column}' for column in columns)
+
+
+def build_requests_filter(status=None, assigned_to=None, equipment_type=None,
+                          date_from=None, date_to=None, customer_name=None,
+                          search_term=None):
+    """
+    Сборка параметризованного условия отбора заявок.
+    Все условия объединяются через AND; пустые значения не учитываются.
+
+    Args:
+        status: Статус или список статусов (idx_requests_status_created)
+        assigned_to: ID ответственного специалиста (idx_requests_assigned_status)
+        equipment_type: Тип оборудования
+        date_from: Дата создания не раньше (idx_requests_list)
+        date_to: Дата создания не позже (idx_requests_list)
+        customer_name: ФИО заказчика (idx_requests_customer)
+        search_term: Полнотекстовый поиск (номер, ФИО, оборудование, описание, комментарии)
+
+    Returns:
+        tuple: (строка условия без WHERE, список параметров)
+    """
+    conditions = []
+    params = []
+    if status:
+        if isinstance(status, (list, tuple, set)):
+            statuses = list(status)
+            conditions.append(f"r.status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        else:
+            conditions.append('r.status = ?')
+            params.append(status)
+    if assigned_to:
+        conditions.append('r.assigned_to = ?')
+        params.append(assigned_to)
+    if equipment_type:
+        conditions.append('r.equipment_type = ?')
+        params.append(equipment_type)
+    if date_from:
+        conditions.append('r.created_at >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append('r.created_at <= ?')
+        params.append(date_to)
+    if customer_name:
+        conditions.append('r.user_name = ?')
+        params.append(customer_name)
+    if search_term:
+        match = _fts_match_expression(search_term)
+        if match:
+            conditions.append('r.id IN (SELECT rowid FROM requests_fts WHERE requests_fts MATCH ?)')
+            params.append(match)
+        else:
+            # Слишком короткий фрагмент для триграмм - поиск по номеру и ФИО
+            conditions.append("(r.request_number LIKE ? ESCAPE '\\' OR r.user_name LIKE ? ESCAPE '\\')")
+            params.extend([_like_pattern(search_term)] * 2)
+    return ' AND '.join(conditions) or '1', params
+
+
+def _like_pattern(fragment):
+    """Шаблон LIKE '%фрагмент%' (с ESCAPE '\\'): % и _ во фрагменте ищутся как символы"""
+    escaped = fragment.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _fts_match_expression(search_term):
+    """
+    Преобразование строки поиска в выражение MATCH для requests_fts.
+    Каждое слово ищется как подстрока; слова короче FTS_MIN_TERM_LENGTH пропускаются.
+
+    Returns:
+        str: Выражение MATCH или None, если подходящих слов нет
+    """
+    words = [w for w in search_term.split() if len(w) >= FTS_MIN_TERM_LENGTH]
+    if not words:
+        return None
+    return ' '.join('"' + w.replace('"', '""') + '"' for w in words)
+
+
+def search_requests_ranked(search_term, limit=REQUESTS_PAGE_SIZE, projection='detail', offset=0,
+                           **filters):
+    """
+    Полнотекстовый поиск заявок с ранжированием по релевантности.
+    Ищет по номеру, ФИО, типу и модели оборудования, описанию и комментариям.
+
+    Args:
+        search_term: Строка поиска
+        limit: Максимальное количество результатов
+        projection: Набор столбцов (см. REQUEST_PROJECTIONS)
+        offset: Сколько наиболее релевантных заявок пропустить (постраничный вывод)
+        **filters: Дополнительные условия (см. build_requests_filter)
+
+    Returns:
+        List of Request: Заявки с полем snippet (фрагмент с совпадением)
+    """
+    match = _fts_match_expression(search_term)
+    if not match:
+        # Короткий фрагмент: поиск подстроки (см. build_requests_filter), новые заявки первыми
+        where, params = build_requests_filter(search_term=search_term, **filters)
+        with get_db_connection(readonly=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+            SELECT {_request_columns(projection)}, u.full_name as assigned_name
+            FROM requests r
+            LEFT JOIN users u ON r.assigned_to = u.id
+            WHERE {where}
+            ORDER BY r.created_at DESC, r.id DESC
+            LIMIT ? OFFSET ?
+            ''', params + [limit, offset])
+            return records.fetch_all(cursor, Request)
+
+    where, params = build_requests_filter(**filters)
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-        SELECT r.*, u.full_name as assigned_name 
+        cursor.execute(f'''
+        SELECT {_request_columns(projection)}, u.full_name as assigned_name,
+               snippet(requests_fts, -1, '**', '**', '…', 24) as snippet
+        FROM requests_fts
+        JOIN requests r ON r.id = requests_fts.rowid
+        LEFT JOIN users u ON r.assigned_to = u.id
+        WHERE requests_fts MATCH ? AND {where}
+        ORDER BY requests_fts.rank, r.id
+        LIMIT ? OFFSET ?
+        ''', [match] + params + [limit, offset])
+        return records.fetch_all(cursor, Request)
+
+
+def search_requests_page(search_term, after=None, limit=REQUESTS_PAGE_SIZE, projection='detail', **filters):
+    """
+    Постраничный ранжированный поиск (аналог get_requests_page для search_requests_ranked).
+    Порядок по релевантности не позволяет keyset-пагинацию, курсор - смещение.
+
+    Args:
+        search_term: Строка поиска
+        after: Курсор следующей страницы из предыдущего вызова (None - первая страница)
+        limit: Размер страницы
+        projection: Набор столбцов (см. REQUEST_PROJECTIONS)
+        **filters: Дополнительные условия (см. build_requests_filter)
+
+    Returns:
+        dict: {'items': список заявок, 'next_cursor': курсор следующей страницы или None}
+    """
+    offset = after or 0
+    # Запрашиваем на одну строку больше, чтобы узнать, есть ли следующая страница
+    items = search_requests_ranked(search_term, limit + 1, projection, offset, **filters)
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = offset + limit
+    return {'items': items, 'next_cursor': next_cursor}
+
+
+def rebuild_search_index():
+    """
+    Полное перестроение полнотекстового индекса заявок
+
+    Returns:
+        bool: True если индекс перестроен, False при ошибке
+    """
+    try:
+        with get_db_connection() as conn:
+            _begin_immediate(conn)
+            migrations.fill_search_index(conn.cursor())
+            conn.commit()
+            return True
+    except Exception as e:
+        print(f"Ошибка при перестроении поискового индекса: {e}")
+        return False
+
+
+def find_requests(projection='detail', **filters):
+    """
+    Получение всех заявок, удовлетворяющих фильтрам (см. build_requests_filter)
+
+    Args:
+        projection: Набор столбцов (см. REQUEST_PROJECTIONS)
+
+    Returns:
+        List of Request: Список заявок
+    """
+    where, params = build_requests_filter(**filters)
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+        SELECT {_request_columns(projection)}, u.full_name as assigned_name
         FROM requests r
         LEFT JOIN users u ON r.assigned_to = u.id
-        WHERE r.request_number LIKE ? OR r.user_name LIKE ?
-        ORDER BY r.created_at DESC
-        ''', (f'%{search_term}%', f'%{search_term}%'))
-        return [dict(row) for row in cursor.fetchall()]
+        WHERE {where}
+        ORDER BY r.created_at DESC, r.id DESC
+        ''', params)
+        return records.fetch_all(cursor, Request)
+
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def iter_requests(batch_size=EXPORT_BATCH_SIZE, **filters):
+    """
+    Потоковое чтение заявок по фильтрам (см. build_requests_filter).
+    Заявки читаются порциями get_requests_page (keyset-пагинация по created_at, id),
+    поэтому в памяти одновременно находится не больше batch_size заявок,
+    а соединение пула занято только на время чтения одной порции: генератор,
+    который не дочитали до конца, ничего не держит.
+
+    Args:
+        batch_size: Размер порции чтения
+        **filters: Фильтры build_requests_filter
+
+    Yields:
+        Request: Заявка с ФИО ответственного (assigned_name)
+    """
+    after = None
+    while True:
+        page = get_requests_page(after, batch_size, **filters)
+        yield from page['items']
+        after = page['next_cursor']
+        if after is None:
+            break
+
+
+def get_requests_page(after=None, limit=REQUESTS_PAGE_SIZE, projection='detail', **filters):
+    """
+    Постраничное получение заявок (keyset-пагинация по created_at, id)
+
+    Args:
+        after: Курсор (created_at, id) последней заявки предыдущей страницы
+        limit: Размер страницы
+        projection: Набор столбцов (см. REQUEST_PROJECTIONS)
+        **filters: Условия отбора (см. build_requests_filter)
+
+    Returns:
+        dict: {'items': список заявок, 'next_cursor': курсор следующей страницы или None}
+    """
+    where, params = build_requests_filter(**filters)
+    if after is not None:
+        where += ' AND (r.created_at, r.id) < (?, ?)'
+        params.extend(after)
+
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        # Запрашиваем на одну строку больше, чтобы узнать, есть ли следующая страница
+        cursor.execute(f'''
+        SELECT {_request_columns(projection)}, u.full_name as assigned_name
+        FROM requests r
+        LEFT JOIN users u ON r.assigned_to = u.id
+        WHERE {where}
+        ORDER BY r.created_at DESC, r.id DESC
+        LIMIT ?
+        ''', params + [limit + 1])
+        items = records.fetch_all(cursor, Request)
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = (items[-1]['created_at'], items[-1]['id'])
+    return {'items': items, 'next_cursor': next_cursor}
+
+
+def count_requests(**filters):
+    """
+    Количество заявок по тем же условиям, что и get_requests_page
+
+    Returns:
+        int: Количество заявок
+    """
+    where, params = build_requests_filter(**filters)
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT COUNT(*) FROM requests r WHERE {where}', params)
+        return cursor.fetchone()[0]
+
+
+def count_requests_by_status(**filters):
+    """
+    Количество заявок в разрезе статусов
+
+    Returns:
+        dict: {статус: количество}
+    """
+    where, params = build_requests_filter(**filters)
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+        SELECT r.status, COUNT(*)
+        FROM requests r
+        WHERE {where}
+        GROUP BY r.status
+        ''', params)
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def get_request_ids_with_technical_notes(fragment):
+    """
+    ID заявок, у которых есть техническая заметка с заданным фрагментом текста
+    (без учета регистра). Выполняется одним запросом.
+
+    Args:
+        fragment: Искомый фрагмент, например 'сложн'
+
+    Returns:
+        set: Множество ID заявок
+    """
+    query, params = _technical_notes_subquery(fragment)
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _technical_notes_subquery(fragment):
+    """Подзапрос ID заявок с технической заметкой, содержащей фрагмент"""
+    query = '''
+    SELECT c.request_id FROM comments c
+    WHERE c.is_technical_note AND instr(casefold(c.comment_text), ?) > 0
+    '''
+    params = [fragment.casefold()]
+    match = _fts_match_expression(fragment)
+    if match:
+        # Предварительный отбор по полнотекстовому индексу комментариев
+        query += ' AND c.request_id IN (SELECT rowid FROM requests_fts WHERE requests_fts MATCH ?)'
+        params.append(f'comments : ({match})')
+    return query, params
+
+
+def get_requests_needing_help(min_days_in_progress=3, note_fragment='сложн'):
+    """
+    Заявки, к которым стоит привлечь дополнительных специалистов:
+    в ремонте дольше min_days_in_progress дней с момента назначения
+    или с технической заметкой, содержащей note_fragment.
+
+    Returns:
+        List of Request: Заявки с полями days_in_progress (None, если срок не превышен)
+                       и technical_issues
+    """
+    notes_query, notes_params = _technical_notes_subquery(note_fragment)
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+        SELECT r.*, u.full_name as assigned_name,
+               CASE WHEN r.status = 'В процессе ремонта'
+                         AND r.assigned_at < date('now', 'localtime', ?)
+                    THEN CAST(julianday(date('now', 'localtime')) - julianday(r.assigned_at) AS INTEGER)
+               END as days_in_progress,
+               r.id IN ({notes_query}) as technical_issues
+        FROM requests r
+        LEFT JOIN users u ON r.assigned_to = u.id
+        WHERE (r.status = 'В процессе ремонта' AND r.assigned_at < date('now', 'localtime', ?))
+           OR r.id IN ({notes_query})
+        ORDER BY r.created_at DESC, r.id DESC
+        ''', [f'-{min_days_in_progress} days'] + notes_params
+             + [f'-{min_days_in_progress} days'] + notes_params)
+        return records.fetch_all(cursor, Request)
+
+
+def get_problem_requests(days_overdue=3, waiting_days=5, problem_type=None):
+    """
+    Проблемные заявки для контроля качества. Сроки считаются в БД в днях:
+    - 'Просроченная': новая или в ремонте дольше days_overdue дней с создания;
+    - 'Длительное ожидание': готова к выдаче дольше waiting_days дней с назначения.
+
+    Args:
+        days_overdue: Допустимый срок с момента создания, дней
+        waiting_days: Допустимый срок ожидания выдачи, дней
+        problem_type: 'Просроченная' или 'Длительное ожидание' (None - все)
+
+    Returns:
+        List of Request: Заявки с полями problem_type, days_overdue, days_waiting,
+                       days_since_assignment и days_in_status
+    """
+    conditions = []
+    params = [days_overdue]
+    if problem_type in (None, 'Просроченная'):
+        conditions.append("(r.status IN ('Новая заявка', 'В процессе ремонта') "
+                          "AND r.created_at < date('now', 'localtime', ?))")
+        params.append(f'-{days_overdue} days')
+    if problem_type in (None, 'Длительное ожидание'):
+        conditions.append("(r.status = 'Готово к выдаче' "
+                          "AND r.assigned_at < date('now', 'localtime', ?))")
+        params.append(f'-{waiting_days} days')
+    if not conditions:
+        return []
+
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+        SELECT r.*, u.full_name as assigned_name,
+               CASE WHEN r.status = 'Готово к выдаче' THEN 'Длительное ожидание'
+                    ELSE 'Просроченная' END as problem_type,
+               CASE WHEN r.status != 'Готово к выдаче'
+                    THEN CAST(julianday(date('now', 'localtime')) - julianday(r.created_at) AS INTEGER) - ?
+               END as days_overdue,
+               CASE WHEN r.status = 'Готово к выдаче'
+                    THEN CAST(julianday(date('now', 'localtime')) - julianday(r.assigned_at) AS INTEGER)
+               END as days_waiting,
+               CAST(julianday(date('now', 'localtime')) - julianday(r.assigned_at) AS INTEGER)
+                   as days_since_assignment,
+               CAST(julianday(date('now', 'localtime')) - julianday(coalesce(
+                   (SELECT MAX(sh.changed_at) FROM status_history sh WHERE sh.request_id = r.id),
+                   r.created_at
+               )) AS INTEGER) as days_in_status
+        FROM requests r
+        LEFT JOIN users u ON r.assigned_to = u.id
+        WHERE {' OR '.join(conditions)}
+        ORDER BY r.created_at DESC, r.id DESC
+        ''', params)
+        return records.fetch_all(cursor, Request)
+
+
+def get_quality_summary(days_overdue=3):
+    """
+    Сводка для аналитики качества, рассчитанная в БД без полного прохода по заявкам:
+    итоги по типам берутся из накопительной request_stats, незавершенные
+    и просроченные заявки считаются по диапазонам idx_requests_status_created.
+
+    Args:
+        days_overdue: Срок с момента создания, после которого незавершенная заявка просрочена
+
+    Returns:
+        dict: Общие показатели и статистика по типам оборудования
+              (equipment_stats: {тип: {'total': ..., 'problems': ...}})
+    """
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+        SELECT equipment_type, total, completed, completion_days_sum
+        FROM request_stats
+        WHERE total > 0
+        ORDER BY total DESC
+        ''')
+        rows = cursor.fetchall()
+        cursor.execute('''
+        SELECT COUNT(*) FROM requests
+        WHERE status IN ('В процессе ремонта', 'Готово к выдаче')
+        ''')
+        in_progress = cursor.fetchone()[0]
+        cursor.execute('''
+        SELECT equipment_type, COUNT(*)
+        FROM requests
+        WHERE status IN ('Новая заявка', 'В процессе ремонта')
+          AND created_at < date('now', 'localtime', ?)
+        GROUP BY equipment_type
+        ''', (f'-{days_overdue} days',))
+        problems = dict(cursor.fetchall())
+        # Выполненные заявки без даты завершения считаются по сегодняшний день
+        # (request_stats их не учитывает). Планировщик сам выбирает
+        # idx_requests_status_created и читает все выполненные заявки, поэтому индекс задан явно;
+        # в базе или снимке без миграции 8 индекса нет - запрос без подсказки
+        undated_query = '''
+        SELECT TOTAL(julianday(date('now', 'localtime')) - julianday(created_at))
+        FROM requests {}
+        WHERE status = 'Выполнено' AND completed_at IS NULL
+        '''
+        try:
+            cursor.execute(undated_query.format('INDEXED BY idx_requests_completed_undated'))
+        except sqlite3.OperationalError:
+            cursor.execute(undated_query.format(''))
+        undated_days = cursor.fetchone()[0]
+    return _summarize_quality(rows, in_progress, problems, undated_days)
+
+
+def _summarize_quality(rows, in_progress, problems, undated_days):
+    """Итоги get_quality_summary по статистике типов и счетчикам (общие для хранилищ)"""
+    completed = sum(row['completed'] for row in rows)
+    return {
+        'total': sum(row['total'] for row in rows),
+        'completed': completed,
+        'in_progress': in_progress,
+        'overdue': sum(problems.values()),
+        'avg_completion_days': ((sum(row['completion_days_sum'] for row in rows) + undated_days) / completed
+                                if completed else None),
+        'equipment_stats': {
+            row['equipment_type']: {'total': row['total'], 'problems': problems.get(row['equipment_type'], 0)}
+            for row in rows
+        }
+    }
 
 
 def add_comment(request_id, user_id, comment_text, is_technical=False, parts_ordered=None):
@@ -194,30 +1484,37 @@ def add_comment(request_id, user_id, comment_text, is_technical=False, parts_ord
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-            INSERT INTO comments (request_id, user_id, comment_text, is_technical_note, parts_ordered)
-            VALUES (?, ?, ?, ?, ?)
-            ''', (request_id, user_id, comment_text, is_technical, parts_ordered))
+            _add_comment_tx(cursor, request_id, user_id, comment_text, is_technical, parts_ordered)
             conn.commit()
             return True
     except Exception as e:
         print(f"Ошибка при добавлении комментария: {e}")
         return False
 
+
+def _add_comment_tx(cursor, request_id, user_id, comment_text, is_technical=False, parts_ordered=None):
+    """Вставка комментария внутри открытой транзакции; возвращает ID комментария"""
+    cursor.execute('''
+    INSERT INTO comments (request_id, user_id, comment_text, is_technical_note, parts_ordered)
+    VALUES (?, ?, ?, ?, ?)
+    ''', (request_id, user_id, comment_text, is_technical, parts_ordered))
+    return cursor.lastrowid
+
+
 def get_comments(request_id):
     """
     Получение всех комментариев к заявке
     """
-    with get_db_connection() as conn:
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute('''
         SELECT c.*, u.full_name, u.role
         FROM comments c
         JOIN users u ON c.user_id = u.id
         WHERE c.request_id = ?
-        ORDER BY c.created_at ASC
+        ORDER BY c.created_at ASC, c.id ASC
         ''', (request_id,))
-        return [dict(row) for row in cursor.fetchall()]
+        return records.fetch_all(cursor, Comment)
     
 
 def create_user_db(user_data):
@@ -249,6 +1546,7 @@ def create_user_db(user_data):
             ))
             
             conn.commit()
+            invalidate_reference_cache()
             return True
     except sqlite3.IntegrityError:
         print(f"Пользователь с логином '{user_data['username']}' уже существует")
@@ -297,17 +1595,21 @@ def update_user_db(user_id, user_data):
                 ))
             
             conn.commit()
+            invalidate_reference_cache()
             return True
     except Exception as e:
         print(f"Ошибка при обновлении пользователя: {e}")
         return False
 
-def delete_user_db(user_id):
+def delete_user_db(user_id, reassign_to=None):
     """
-    Удаление пользователя из базы данных
+    Удаление пользователя из базы данных.
+    Незавершенные заявки пользователя передаются reassign_to (или остаются
+    без специалиста) в той же транзакции.
     
     Args:
         user_id: ID пользователя
+        reassign_to: ID специалиста, которому передаются заявки
         
     Returns:
         bool: True если удалено, False при ошибке
@@ -315,8 +1617,11 @@ def delete_user_db(user_id):
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
+            _begin_immediate(conn)
+            _reassign_tx(cursor, user_id, reassign_to)
             cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
             conn.commit()
+            invalidate_reference_cache()
             
             return cursor.rowcount > 0
     except Exception as e:
@@ -324,14 +1629,8 @@ def delete_user_db(user_id):
         return False
     
 
-def get_all_users():
-    """
-    Получение списка всех пользователей
-    
-    Returns:
-        List of dicts: Список пользователей
-    """
-    with get_db_connection() as conn:
+def _load_users():
+    with get_db_connection(readonly=True) as conn:
         cursor = conn.cursor()
         cursor.execute('''
         SELECT id, username, role, full_name, phone, created_at 
@@ -347,7 +1646,39 @@ def get_all_users():
             END,
             full_name
         ''')
-        return [dict(row) for row in cursor.fetchall()]
+        users = records.fetch_all(cursor, User)
+    return users, {u['id']: u for u in users}
+
+
+def get_all_users():
+    """
+    Получение списка всех пользователей (из кэша справочников)
+    
+    Returns:
+        List of User: Список пользователей
+    """
+    return list(_cached_reference('users', _load_users)[0])
+
+
+def get_user_by_id(user_id, cached=True):
+    """
+    Получение пользователя по ID (из кэша справочников)
+
+    Args:
+        user_id: ID пользователя
+        cached: False - прочитать из базы мимо кэша (проверка прав: удаление
+            или смена роли должны действовать сразу, а не через REFERENCE_CACHE_TTL)
+
+    Returns:
+        User или None
+    """
+    if cached:
+        return _cached_reference('users', _load_users)[1].get(user_id)
+    with get_db_connection(readonly=True) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, username, role, full_name, phone, created_at FROM users WHERE id = ?',
+                       (user_id,))
+        return records.fetch_one(cursor, User)
 
 def hash_password(password):
     """
@@ -365,10 +1696,10 @@ def get_request_by_id(request_id):
         request_id: ID заявки
         
     Returns:
-        dict: Данные заявки или None если не найдена
+        Request: Данные заявки или None если не найдена
     """
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute('''
             SELECT r.*, u.full_name as assigned_name 
@@ -376,10 +1707,7 @@ def get_request_by_id(request_id):
             LEFT JOIN users u ON r.assigned_to = u.id
             WHERE r.id = ?
             ''', (request_id,))
-            row = cursor.fetchone()
-            if row:
-                return dict(row)
-            return None
+            return records.fetch_one(cursor, Request)
     except Exception as e:
         print(f"Ошибка при получении заявки по ID: {e}")
         return None
@@ -393,83 +1721,40 @@ def get_status_history(request_id):
         request_id: ID заявки
         
     Returns:
-        List of dicts: История изменений статусов
+        List of StatusChange: История изменений статусов
     """
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(readonly=True) as conn:
             cursor = conn.cursor()
             cursor.execute('''
             SELECT sh.*, u.full_name as changed_by_name
             FROM status_history sh
             LEFT JOIN users u ON sh.changed_by = u.id
             WHERE sh.request_id = ?
-            ORDER BY sh.changed_at DESC
+            ORDER BY sh.changed_at DESC, sh.id DESC
             ''', (request_id,))
-            
-            rows = cursor.fetchall()
-            result = []
-            for row in rows:
-                if isinstance(row, sqlite3.Row):
-                    result.append(dict(row))
-                else:
-                    result.append({
-                        'id': row[0],
-                        'request_id': row[1],
-                        'old_status': row[2],
-                        'new_status': row[3],
-                        'changed_by': row[4],
-                        'changed_at': row[5],
-                        'changed_by_name': row[6] if len(row) > 6 else None
-                    })
-            return result
+            return records.fetch_all(cursor, StatusChange)
     except Exception as e:
         print(f"Ошибка при получении истории статусов: {e}")
         return []
     
 
-def get_requests_by_customer(customer_name, customer_phone=None):
+def get_requests_by_customer(customer_name, customer_phone=None, projection='list'):
     """
     Получение заявок конкретного заказчика
     
     Args:
         customer_name: ФИО заказчика
         customer_phone: Телефон заказчика (опционально)
+        projection: Набор столбцов (см. REQUEST_PROJECTIONS)
         
     Returns:
-        List of dicts: Список заявок заказчика
+        List of Request: Список заявок заказчика
     """
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            if customer_phone:
-                cursor.execute('''
-                SELECT r.*, u.full_name as assigned_name 
-                FROM requests r
-                LEFT JOIN users u ON r.assigned_to = u.id
-                WHERE (r.user_name = ? AND r.user_phone = ?)
-                   OR r.user_name = ?
-                ORDER BY r.created_at DESC
-                ''', (customer_name, customer_phone, customer_name))
-            else:
-                cursor.execute('''
-                SELECT r.*, u.full_name as assigned_name 
-                FROM requests r
-                LEFT JOIN users u ON r.assigned_to = u.id
-                WHERE r.user_name = ?
-                ORDER BY r.created_at DESC
-                ''', (customer_name,))
-            
-            rows = cursor.fetchall()
-            result = [dict(row) for row in rows]
-            
-            print(f"DEBUG DB: Поиск заявок для '{customer_name}' (тел: {customer_phone})")
-            print(f"DEBUG DB: Найдено: {len(result)} заявок")
-            if result:
-                print(f"DEBUG DB: Пример: {result[0]['user_name']} - {result[0]['user_phone']}")
-            
-            return result
-            
+        # Совпадение по ФИО покрывает и совпадение по паре ФИО + телефон
+        return find_requests(customer_name=customer_name, projection=projection)
+        
     except Exception as e:
         print(f"Ошибка при получении заявок заказчика: {e}")
         return []
\ No newline at end of file
@@ -0,0 +1,327 @@
+"""
+Профилирование запросов к базе данных
+
+Пока профилирование включено, соединения database.py открываются с фабрикой
+ProfilingConnection (при переключении пул соединений сбрасывается; выключенное
+профилирование не добавляет к запросам ничего). Оно собирает по каждому запросу (функция database.py + тип оператора):
+количество вызовов, гистограмму времени, число строк и страницы, с которых
+выполнялся запрос. Медленные запросы пишутся в журнал вместе с EXPLAIN QUERY PLAN.
+
+Включение:
+    SC_DB_PROFILE=1 streamlit run main.py      - при запуске
+    db_profiler.set_enabled(True)              - во время работы (страница администратора)
+
+Настройки окружения:
+    SC_DB_SLOW_MS    - порог медленного запроса, мс (по умолчанию 100)
+    SC_DB_SLOW_LOG   - файл журнала медленных запросов (по умолчанию slow_queries.log
+                       в каталоге базы)
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Верхние границы интервалов гистограммы, мс
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, float('inf')]
+SLOW_QUERY_MS = float(os.environ.get('SC_DB_SLOW_MS', 100))
+# Файл журнала медленных запросов (None - SLOW_QUERY_LOG_NAME рядом с базой)
+SLOW_QUERY_LOG = os.environ.get('SC_DB_SLOW_LOG')
+SLOW_QUERY_LOG_NAME = 'slow_queries.log'
+SLOW_QUERIES_KEPT = 200
+
+_enabled = os.environ.get('SC_DB_PROFILE', '').lower() in ('1', 'true', 'yes', 'on')
+_stats = {}
+_slow_queries = deque(maxlen=SLOW_QUERIES_KEPT)
+_lock = threading.Lock()
+_local = threading.local()
+
+_SKIPPED_MODULES = {__name__, 'sqlite3', 'sqlite3.dbapi2', 'contextlib'}
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_enabled(flag):
+    """
+    Включение/выключение профилирования без перезапуска
+    (соединения database.py переоткрываются с нужной фабрикой)
+    """
+    global _enabled
+    import database  # database импортирует db_profiler
+
+    if _enabled != bool(flag):
+        _enabled = bool(flag)
+        database.reset_connections()
+
+
+def connection_factory():
+    """Фабрика соединений database.py: ProfilingConnection, только пока профилирование включено"""
+    return ProfilingConnection if _enabled else sqlite3.Connection
+
+
+def slow_query_log_path():
+    """Файл журнала медленных запросов: SC_DB_SLOW_LOG или slow_queries.log рядом с базой"""
+    if SLOW_QUERY_LOG:
+        return SLOW_QUERY_LOG
+    import database
+
+    return os.path.join(os.path.dirname(os.path.abspath(database.DB_PATH)), SLOW_QUERY_LOG_NAME)
+
+
+def set_page(page):
+    """
+    Страница, запросы которой выполняются в текущем потоке (сессии Streamlit)
+    """
+    _local.page = page
+
+
+def reset_stats():
+    """Очистка накопленной статистики и списка медленных запросов"""
+    with _lock:
+        _stats.clear()
+        _slow_queries.clear()
+
+
+def get_stats():
+    """
+    Накопленная статистика по запросам
+
+    Returns:
+        List of dicts: name, calls, total_ms, avg_ms, max_ms, rows, histogram, pages;
+                       по убыванию суммарного времени
+    """
+    with _lock:
+        result = []
+        for name, item in _stats.items():
+            result.append({
+                'name': name,
+                'calls': item['calls'],
+                'total_ms': item['total_ms'],
+                'avg_ms': item['total_ms'] / item['calls'],
+                'max_ms': item['max_ms'],
+                'rows': item['rows'],
+                'histogram': dict(zip(_bucket_labels(), item['histogram'])),
+                'pages': dict(item['pages']),
+            })
+    result.sort(key=lambda item: item['total_ms'], reverse=True)
+    return result
+
+
+def get_slow_queries(limit=50):
+    """
+    Последние медленные запросы (новые первыми)
+
+    Returns:
+        List of dicts: time, name, page, ms, rows, sql, plan
+    """
+    with _lock:
+        return list(reversed(_slow_queries))[:limit]
+
+
+def _bucket_labels():
+    return [f"≤{int(b)} мс" if b != float('inf') else f">{int(HISTOGRAM_BUCKETS_MS[-2])} мс"
+            for b in HISTOGRAM_BUCKETS_MS]
+
+
+def _query_name(sql):
+    """
+    Имя запроса: внешняя функция database.py, из которой он выполнен, и тип оператора.
+    Вызовы из других модулей называются модуль.функция.
+    """
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals.get('__name__') in _SKIPPED_MODULES:
+        frame = frame.f_back
+    if frame is None:
+        name = '?'
+    elif frame.f_globals.get('__name__') == 'database':
+        # Поднимаемся до внешней функции database.py, через которую пришел вызов
+        name = frame.f_code.co_name
+        frame = frame.f_back
+        while frame is not None and frame.f_globals.get('__name__') in ('database', 'contextlib'):
+            if frame.f_globals.get('__name__') == 'database':
+                name = frame.f_code.co_name
+            frame = frame.f_back
+    else:
+        name = f"{frame.f_globals.get('__name__')}.{frame.f_code.co_name}"
+    verb = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+    return f"{name}:{verb}"
+
+
+def _record(conn, name, sql, params, elapsed_ms, rows):
+    page = getattr(_local, 'page', None) or '-'
+    with _lock:
+        item = _stats.get(name)
+        if item is None:
+            item = _stats[name] = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                                   'histogram': [0] * len(HISTOGRAM_BUCKETS_MS), 'pages': {}}
+        item['calls'] += 1
+        item['total_ms'] += elapsed_ms
+        item['max_ms'] = max(item['max_ms'], elapsed_ms)
+        item['rows'] += rows
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                item['histogram'][i] += 1
+                break
+        item['pages'][page] = item['pages'].get(page, 0) + 1
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        _log_slow_query(conn, name, page, sql, params, elapsed_ms, rows)
+
+
+def _explain(conn, sql, params):
+    """EXPLAIN QUERY PLAN запроса в виде текста (без профилирования самого EXPLAIN)"""
+    try:
+        cursor = sqlite3.Cursor(conn)
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return '\n'.join(row[3] for row in cursor.fetchall())
+    except sqlite3.Error as e:
+        return f"(план недоступен: {e})"
+
+
+def _log_slow_query(conn, name, page, sql, params, elapsed_ms, rows):
+    plan = _explain(conn, sql, params) if params is not None else '(executemany/executescript)'
+    entry = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'name': name,
+        'page': page,
+        'ms': round(elapsed_ms, 1),
+        'rows': rows,
+        'sql': ' '.join(sql.split()),
+        'plan': plan,
+    }
+    with _lock:
+        _slow_queries.append(entry)
+    try:
+        with open(slow_query_log_path(), 'a', encoding='utf-8') as f:
+            f.write(f"{entry['time']} {entry['ms']} мс, строк: {rows}, {name} [{page}]\n"
+                    f"  {entry['sql']}\n")
+            for line in plan.splitlines():
+                f.write(f"  PLAN {line}\n")
+    except OSError as e:
+        print(f"Ошибка записи журнала медленных запросов: {e}")
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """
+    Курсор, замеряющий выполнение запроса вместе с чтением результата.
+    Замер закрывается, когда результат прочитан полностью, курсор закрыт
+    или на нем выполнен следующий запрос.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending = None
+
+    def _start(self, sql, params, started):
+        self._pending = [_query_name(sql), sql, params, time.perf_counter() - started, 0]
+
+    def _finish(self, rows=None):
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        name, sql, params, elapsed, fetched = pending
+        if rows is None and fetched == 0 and self.rowcount > 0:
+            fetched = self.rowcount
+        _record(self.connection, name, sql, params, elapsed * 1000, fetched)
+
+    def _fetched(self, started, count, exhausted):
+        if self._pending is None:
+            return
+        self._pending[3] += time.perf_counter() - started
+        self._pending[4] += count
+        if exhausted:
+            self._finish(rows=self._pending[4])
+
+    def execute(self, sql, parameters=()):
+        if not _enabled:
+            self._pending = None
+            return super().execute(sql, parameters)
+        self._finish()
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._start(sql, parameters, started)
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        if not _enabled:
+            self._pending = None
+            return super().executemany(sql, seq_of_parameters)
+        self._finish()
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._start(sql, None, started)
+        self._finish()
+        return self
+
+    def executescript(self, sql_script):
+        if not _enabled:
+            self._pending = None
+            return super().executescript(sql_script)
+        self._finish()
+        started = time.perf_counter()
+        super().executescript(sql_script)
+        self._start(sql_script, None, started)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        if self._pending is None:
+            return super().fetchone()
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        if self._pending is None:
+            return super().fetchmany(self.arraysize if size is None else size)
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        if self._pending is None:
+            return super().fetchall()
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Курсоры, у которых прочитана только первая строка (fetchone()[0])
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """
+    Соединение, все курсоры которого - ProfilingCursor
+    (в том числе создаваемые неявно в Connection.execute)
+    """
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
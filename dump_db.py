@@ -1,13 +1,318 @@
+"""
+Резервное копирование базы данных сервисного центра
+
+Горячая копия снимается через sqlite3 backup API порциями страниц с паузой
+между ними, поэтому пишущие соединения не блокируются на все время копирования.
+Снимок проверяется (PRAGMA quick_check), сжимается gzip, рядом кладется
+файл с контрольной суммой SHA-256 в формате sha256sum; старые копии удаляются.
+
+Примеры:
+    python manage.py backup
+    python manage.py verify-backup backups/service_center-20250101-030000.db.gz
+
+Копии по умолчанию кладутся в каталог backups рядом с файлом базы
+(не в текущий каталог процесса).
+    python dump_db.py                       - текстовый дамп в dump.sql (UTF-8)
+"""
+import gzip
+import hashlib
+import os
+import shutil
 import sqlite3
-import sys
+import threading
+import time
+from datetime import datetime
+
+# Каталог копий; относительный путь отсчитывается от каталога базы (см. backup_dir_for)
+BACKUP_DIR = 'backups'
+BACKUP_PAGES_PER_STEP = 256      # страниц за шаг копирования
+BACKUP_STEP_SLEEP = 0.05         # пауза между шагами, секунд
+# Запись в базу из другого соединения между шагами начинает копирование заново.
+# После стольких перезапусков или по истечении времени копия снимается за один шаг
+BACKUP_MAX_RESTARTS = 5
+BACKUP_MAX_SECONDS = 600
+BACKUP_KEEP = 7                  # сколько последних копий хранить
+BACKUP_COMPRESS_LEVEL = 6        # уровень gzip: 9 сжимает ненамного лучше, но в разы медленнее
+# Периодичность копирования планировщиком приложения (0 - планировщик не запускается)
+BACKUP_INTERVAL_HOURS = float(os.environ.get('SC_BACKUP_INTERVAL_HOURS', 24))
+BACKUP_SUFFIX = '.db.gz'
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_backup_lock = threading.Lock()
+_last_result = {'time': None, 'path': None, 'error': None}
+
+
+def backup_dir_for(database_path):
+    """
+    Каталог резервных копий базы по умолчанию
+
+    Args:
+        database_path: Путь к базе
+
+    Returns:
+        str: BACKUP_DIR относительно каталога файла базы
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(database_path)), BACKUP_DIR)
+
+
+class _StepBackupAborted(Exception):
+    """Пошаговое копирование прервано: слишком много перезапусков или истекло время"""
+
 
 def create_dump(database_path, output_file):
+    """
+    Текстовый SQL-дамп базы (для просмотра и переноса схемы)
+
+    Args:
+        database_path: Путь к базе
+        output_file: Файл дампа (пишется в UTF-8)
+    """
     conn = sqlite3.connect(database_path)
-    
-    with open(output_file, 'w') as f:
-        for line in conn.iterdump():
-            f.write(f'{line}\n')
-    
-    conn.close()
-
-create_dump('service_center.db', 'dump.sql')
\ No newline at end of file
+    try:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for line in conn.iterdump():
+                f.write(f'{line}\n')
+    finally:
+        conn.close()
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_checksum(path):
+    """Файл path.sha256 с контрольной суммой в формате sha256sum"""
+    with open(path + '.sha256', 'w', encoding='utf-8') as f:
+        f.write(f'{_sha256(path)}  {os.path.basename(path)}\n')
+
+
+def create_backup(database_path, backup_dir=None, pages=BACKUP_PAGES_PER_STEP,
+                  step_sleep=BACKUP_STEP_SLEEP, keep=BACKUP_KEEP,
+                  max_restarts=BACKUP_MAX_RESTARTS, max_seconds=BACKUP_MAX_SECONDS):
+    """
+    Горячая резервная копия базы
+
+    Args:
+        database_path: Путь к базе
+        backup_dir: Каталог резервных копий (по умолчанию backup_dir_for(database_path))
+        pages: Страниц за шаг backup API
+        step_sleep: Пауза между шагами (дает писателям захватить блокировку)
+        keep: Сколько последних копий оставить (0 - не удалять)
+        max_restarts: Допустимое число перезапусков пошагового копирования
+        max_seconds: Допустимая длительность пошагового копирования, секунд;
+                     после этого копия снимается за один шаг (одна читающая транзакция)
+
+    Returns:
+        str: Путь к сжатой копии
+
+    Raises:
+        sqlite3.Error, OSError: При ошибке копирования; частичные файлы удаляются
+    """
+    backup_dir = backup_dir or backup_dir_for(database_path)
+    os.makedirs(backup_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(database_path))[0]
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    snapshot = os.path.join(backup_dir, f'{name}-{stamp}.db.partial')
+    target = os.path.join(backup_dir, f'{name}-{stamp}{BACKUP_SUFFIX}')
+
+    progress = {'remaining': None, 'restarts': 0, 'started': time.monotonic()}
+
+    def pause(status, remaining, total):
+        # После перезапуска остаток не уменьшается: копирование пошло с начала
+        if progress['remaining'] is not None and remaining >= progress['remaining']:
+            progress['restarts'] += 1
+        progress['remaining'] = remaining
+        if remaining and (progress['restarts'] > max_restarts
+                          or time.monotonic() - progress['started'] > max_seconds):
+            raise _StepBackupAborted()
+        if remaining and step_sleep:
+            time.sleep(step_sleep)
+
+    with _backup_lock:
+        _remove_stale_partials(backup_dir)
+        try:
+            source = sqlite3.connect(database_path)
+            destination = sqlite3.connect(snapshot)
+            try:
+                try:
+                    source.backup(destination, pages=pages, progress=pause)
+                except _StepBackupAborted:
+                    # Один шаг - одна читающая транзакция: в режиме WAL писатели
+                    # не блокируются, а перезапускать копирование нечему
+                    source.backup(destination)
+                result = destination.execute('PRAGMA quick_check').fetchone()[0]
+                if result != 'ok':
+                    raise sqlite3.DatabaseError(f"Снимок не прошел проверку: {result}")
+            finally:
+                destination.close()
+                source.close()
+
+            with open(snapshot, 'rb') as src, gzip.open(target + '.partial', 'wb', BACKUP_COMPRESS_LEVEL) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(target + '.partial', target)
+            write_checksum(target)
+        finally:
+            for path in (snapshot, target + '.partial'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        if keep:
+            for old in list_backups(backup_dir)[keep:]:
+                for path in (old['path'], old['path'] + '.sha256'):
+                    if os.path.exists(path):
+                        os.remove(path)
+    return target
+
+
+def _remove_stale_partials(backup_dir, max_age=3600):
+    """Удаление незавершенных файлов копирования, оставшихся после остановки процесса"""
+    now = time.time()
+    for entry in os.scandir(backup_dir):
+        if '.partial' in entry.name and now - entry.stat().st_mtime > max_age:
+            os.remove(entry.path)
+
+
+def list_backups(backup_dir):
+    """
+    Список резервных копий, новые первыми
+
+    Args:
+        backup_dir: Каталог резервных копий (обычно backup_dir_for(путь к базе))
+
+    Returns:
+        List of dicts: path, name, size, created (datetime)
+    """
+    if not os.path.isdir(backup_dir):
+        return []
+    result = []
+    for entry in os.scandir(backup_dir):
+        if entry.is_file() and entry.name.endswith(BACKUP_SUFFIX):
+            stat = entry.stat()
+            result.append({
+                'path': entry.path,
+                'name': entry.name,
+                'size': stat.st_size,
+                'created': datetime.fromtimestamp(stat.st_mtime),
+            })
+    result.sort(key=lambda item: item['name'], reverse=True)
+    return result
+
+
+def verify_backup(path):
+    """
+    Проверка контрольной суммы резервной копии
+
+    Returns:
+        bool: True если сумма совпадает с записанной в .sha256
+    """
+    try:
+        with open(path + '.sha256', encoding='utf-8') as f:
+            expected = f.read().split()[0]
+    except (OSError, IndexError):
+        return False
+    return _sha256(path) == expected
+
+
+def get_backup_status():
+    """
+    Состояние резервного копирования для страницы администратора
+
+    Returns:
+        dict: scheduler_running, interval_hours, last_time, last_path, last_error
+    """
+    return {
+        'scheduler_running': _scheduler is not None and _scheduler.is_alive(),
+        'interval_hours': _scheduler.interval_hours if _scheduler else None,
+        'last_time': _last_result['time'],
+        'last_path': _last_result['path'],
+        'last_error': _last_result['error'],
+    }
+
+
+def run_backup(database_path, **options):
+    """
+    Резервная копия с записью результата в состояние (для приложения и планировщика)
+
+    Returns:
+        str: Путь к копии или None при ошибке
+    """
+    try:
+        path = create_backup(database_path, **options)
+        _last_result.update(time=datetime.now(), path=path, error=None)
+        return path
+    except (sqlite3.Error, OSError) as e:
+        print(f"Ошибка при резервном копировании: {e}")
+        _last_result.update(time=datetime.now(), error=str(e))
+        return None
+
+
+def _prune_change_log(database_path):
+    """Очистка журнала изменений после копии: без нее журнал растет без ограничений"""
+    import cdc  # cdc импортирует dump_db
+
+    try:
+        cdc.prune_change_log(database_path)
+    except sqlite3.Error as e:
+        print(f"Ошибка при очистке журнала изменений: {e}")
+
+
+class _BackupScheduler(threading.Thread):
+    """Фоновый поток, снимающий копию, когда последняя старше интервала"""
+
+    def __init__(self, database_path, interval_hours, options):
+        super().__init__(name='backup-scheduler', daemon=True)
+        self.database_path = database_path
+        self.interval_hours = interval_hours
+        self.options = options
+        self.stop_event = threading.Event()
+
+    def run(self):
+        interval = self.interval_hours * 3600
+        while not self.stop_event.is_set():
+            backups = list_backups(self.options.get('backup_dir') or backup_dir_for(self.database_path))
+            age = (datetime.now() - backups[0]['created']).total_seconds() if backups else None
+            if age is None or age >= interval:
+                if run_backup(self.database_path, **self.options):
+                    _prune_change_log(self.database_path)
+                wait = interval
+            else:
+                wait = interval - age
+            self.stop_event.wait(min(wait, 3600))
+
+
+def start_backup_scheduler(database_path, interval_hours=BACKUP_INTERVAL_HOURS, **options):
+    """
+    Запуск планировщика резервного копирования (один на процесс;
+    повторные вызовы при перезапусках скрипта Streamlit ничего не делают)
+
+    Args:
+        database_path: Путь к базе
+        interval_hours: Периодичность копирования
+        **options: Параметры create_backup (backup_dir, pages, step_sleep, keep)
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None and _scheduler.is_alive():
+            return
+        _scheduler = _BackupScheduler(database_path, interval_hours, options)
+        _scheduler.start()
+
+
+def stop_backup_scheduler():
+    """Остановка планировщика резервного копирования"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.stop_event.set()
+            _scheduler = None
+
+
+if __name__ == '__main__':
+    import database
+
+    create_dump(database.DB_PATH, 'dump.sql')
@@ -0,0 +1,229 @@
+"""
+Потоковая выгрузка заявок в CSV, XLSX и Parquet
+
+Строки берутся из генератора (database.iter_requests) и сразу пишутся в файл,
+поэтому память не зависит от объема выгрузки. XLSX собирается вручную:
+лист пишется в zip-архив по мере чтения строк, без построения книги в памяти.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+import database
+
+# Колонки выгрузки заявок: (ключ строки, заголовок)
+EXPORT_COLUMNS = [
+    ('request_number', 'Номер заявки'),
+    ('created_at', 'Дата создания'),
+    ('equipment_type', 'Тип оборудования'),
+    ('equipment_model', 'Модель'),
+    ('problem_description', 'Описание проблемы'),
+    ('user_name', 'ФИО заказчика'),
+    ('user_phone', 'Телефон'),
+    ('status', 'Статус'),
+    ('assigned_name', 'Ответственный'),
+    ('assigned_at', 'Дата назначения'),
+    ('completed_at', 'Дата завершения'),
+]
+
+# Форматы: расширение -> MIME-тип
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+CSV_DELIMITER = ';'
+PARQUET_ROW_GROUP_SIZE = 10000
+
+# Управляющие символы, недопустимые в XML
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_EXCEL_EPOCH = date(1899, 12, 30)
+
+
+def export_requests(fileobj, file_format, columns=EXPORT_COLUMNS, **filters):
+    """
+    Выгрузка заявок по фильтрам в файл
+
+    Args:
+        fileobj: Двоичный файловый объект для записи
+        file_format: 'csv', 'xlsx' или 'parquet'
+        columns: Колонки выгрузки
+        **filters: Фильтры database.build_requests_filter
+
+    Returns:
+        int: Количество выгруженных заявок
+    """
+    return export_rows(database.iter_requests(**filters), fileobj, file_format, columns)
+
+
+def export_rows(rows, fileobj, file_format, columns=EXPORT_COLUMNS):
+    """
+    Запись строк (итерируемое dict) в файл выбранного формата
+
+    Returns:
+        int: Количество записанных строк
+    """
+    if file_format == 'csv':
+        return write_csv(rows, fileobj, columns)
+    if file_format == 'xlsx':
+        return write_xlsx(rows, fileobj, columns)
+    if file_format == 'parquet':
+        return write_parquet(rows, fileobj, columns)
+    raise ValueError(f"Неизвестный формат выгрузки: {file_format}")
+
+
+def write_csv(rows, fileobj, columns=EXPORT_COLUMNS):
+    """CSV в UTF-8 с BOM и разделителем ';' (открывается в Excel без настройки)"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    count = 0
+    try:
+        writer = csv.writer(text, delimiter=CSV_DELIMITER)
+        writer.writerow([header for _, header in columns])
+        for row in rows:
+            writer.writerow(['' if row.get(key) is None else row.get(key) for key, _ in columns])
+            count += 1
+        text.flush()
+    finally:
+        # Файл остается открытым для вызывающего кода
+        text.detach()
+    return count
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(ref, value):
+    if value is None or value == '':
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        # Дата - число дней от эпохи Excel со стилем даты (s="1")
+        return f'<c r="{ref}" s="1"><v>{(value - _EXCEL_EPOCH).days}</v></c>'
+    text = escape(_XML_ILLEGAL.sub('', str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+_XLSX_STATIC = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Заявки" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+
+def write_xlsx(rows, fileobj, columns=EXPORT_COLUMNS):
+    """XLSX с одним листом; строки пишутся в архив по мере поступления"""
+    letters = [_column_letter(i) for i in range(len(columns))]
+    count = 0
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            header = ''.join(
+                f'<c r="{letter}1" t="inlineStr" s="2"><is><t>{escape(title)}</t></is></c>'
+                for letter, (_, title) in zip(letters, columns)
+            )
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetViews><sheetView workbookViewId="0">'
+                '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                '</sheetView></sheetViews>'
+                f'<sheetData><row r="1">{header}</row>'
+            ).encode('utf-8'))
+            for row in rows:
+                count += 1
+                line = count + 1
+                cells = ''.join(_xlsx_cell(f'{letter}{line}', row.get(key))
+                                for letter, (key, _) in zip(letters, columns))
+                sheet.write(f'<row r="{line}">{cells}</row>'.encode('utf-8'))
+            sheet.write(b'</sheetData></worksheet>')
+    return count
+
+
+def write_parquet(rows, fileobj, columns=EXPORT_COLUMNS, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """Parquet; строки накапливаются только в пределах одной row group"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    date_keys = {'created_at', 'assigned_at', 'completed_at', 'changed_at'}
+    schema = pa.schema([(key, pa.date32() if key in date_keys else pa.string())
+                        for key, _ in columns])
+    count = 0
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append({key: row.get(key) if key in date_keys or row.get(key) is None
+                          else str(row.get(key)) for key, _ in columns})
+            if len(batch) >= row_group_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
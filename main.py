@@ -1,8 +1,25 @@
 import streamlit as st
 import auth
 import database
-from datetime import datetime
+import bulk_import
+import db_profiler
+import dump_db
+import export
+import os
+import storage
+import tempfile
 import time
+import write_queue
+from collections.abc import Mapping
+from datetime import date
+
+# Хранилище: SQLite (database.py) или PostgreSQL - по SC_DATABASE_URL
+store = storage.get_storage()
+# Импорт, выгрузка, резервные копии и профилирование работают только с SQLite
+SQLITE_ONLY = store.name == 'sqlite'
+# Запись заявок, статусов и комментариев: через очередь с групповой фиксацией
+# (SC_WRITE_QUEUE=1, только SQLite) или напрямую
+writes = write_queue if write_queue.WRITE_QUEUE_ENABLED and SQLITE_ONLY else store
 auth.init_session_state()
 
 
@@ -17,9 +34,9 @@ def show_add_comment_modal(request_id, current_user):
         with col1:
             if st.button("💾 Сохранить комментарий", use_container_width=True, type="primary"):
                 if comment.strip():
-                    if database.add_comment(request_id, current_user['id'], 
-                                          comment.strip(), is_technical, 
-                                          parts_ordered if parts_ordered.strip() else None):
+                    if writes.add_comment(request_id, current_user['id'], 
+                                        comment.strip(), is_technical, 
+                                        parts_ordered if parts_ordered.strip() else None):
                         st.success("✅ Комментарий успешно добавлен")
                         st.rerun()
                 else:
@@ -87,7 +104,7 @@ def show_create_request_form(current_user):
             with col4:
                 # Назначение специалиста сразу
                 if current_user['role'] in ['Администратор', 'Менеджер']:
-                    technicians = database.get_technicians()
+                    technicians = store.get_technicians()
                     if technicians:
                         tech_options = ["❌ Не назначать сразу"] + [t['full_name'] for t in technicians]
                         initial_tech = st.selectbox(
@@ -127,7 +144,7 @@ def show_create_request_form(current_user):
                 request_data['status'] = initial_status
             
             # Создаем заявку
-            request_id = database.create_request(request_data)
+            request_id = writes.create_request(request_data)
             
             if request_id:
                 # Если нужно сразу назначить специалиста
@@ -136,7 +153,7 @@ def show_create_request_form(current_user):
                         # Находим ID специалиста
                         for tech in technicians:
                             if tech['full_name'] == initial_tech:
-                                database.assign_technician(request_id, tech['id'])
+                                writes.assign_technician(request_id, tech['id'])
                                 break
                 
                 st.success("✅ Заявка успешно создана!")
@@ -159,7 +176,7 @@ def show_request_detail_page(request_id, current_user):
     Страница детального просмотра заявки
     """
     # Получаем данные заявки
-    request = database.get_request_by_id(request_id)
+    request = store.get_request_by_id(request_id)
     if not request:
         st.error("Заявка не найдена")
         if st.button("← Назад к списку"):
@@ -199,7 +216,7 @@ def show_request_detail_page(request_id, current_user):
             
             if new_status != request['status']:
                 if st.button("🔄 Обновить статус", type="secondary"):
-                    if database.update_request_status(request_id, new_status, current_user['id']):
+                    if writes.update_request_status(request_id, new_status, current_user['id']):
                         st.success("✅ Статус обновлен")
                         st.rerun()
     
@@ -227,7 +244,7 @@ def show_request_detail_page(request_id, current_user):
     st.subheader("💬 Комментарии")
     
     # Показать существующие комментарии
-    comments = database.get_comments(request_id)
+    comments = store.get_comments(request_id)
     if comments:
         for comment in comments:
             with st.container():
@@ -268,17 +285,8 @@ def show_requests_page(current_user):
         show_create_request_form(current_user)
         return
     
-    requests = []
-    
     if current_user['role'] == 'Заказчик':
-        requests = database.get_requests_by_customer(
-            current_user['full_name'], 
-            current_user.get('phone', '') 
-        )
-
-        if not requests and current_user.get('phone'):
-            all_requests = database.get_all_requests()
-            requests = [r for r in all_requests if r['user_name'] == current_user['full_name']]
+        filters = {'customer_name': current_user['full_name']}
     
     else:
         col1, col2, col3 = st.columns(3)
@@ -289,37 +297,187 @@ def show_requests_page(current_user):
                 key="status_filter_all"
             )
         with col2:
-            search_term = st.text_input("Поиск по номеру или ФИО", key="search_all")
+            search_term = st.text_input("Поиск по номеру, ФИО, модели, описанию, комментариям",
+                                        key="search_all")
         with col3:
             if st.button("🔍 Поиск", use_container_width=True, key="search_btn_all"):
                 st.session_state.search_term = search_term
             if st.button("🔄 Сбросить", use_container_width=True, key="reset_btn_all"):
                 st.session_state.search_term = ""
         
-        # Получаем заявки
-        if st.session_state.get('search_term'):
-            requests = database.search_requests(st.session_state.search_term)
-        else:
-            requests = database.get_all_requests()
-        
-        # Применяем фильтр по статусу
-        if status_filter != "Все":
-            requests = [r for r in requests if r['status'] == status_filter]
+        with st.expander("Дополнительные фильтры"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                technicians = store.get_technicians()
+                tech_options = {"Все": None}
+                tech_options.update({t['full_name']: t['id'] for t in technicians})
+                tech_filter = st.selectbox("Ответственный", list(tech_options.keys()),
+                                           key="tech_filter_all")
+            with col2:
+                equipment_filter = st.text_input("Тип оборудования", key="equipment_filter_all")
+            with col3:
+                date_range = st.date_input("Период создания", value=(), key="date_filter_all")
+        
+        date_from, date_to = (list(date_range) + [None, None])[:2]
+        filters = {
+            'search_term': st.session_state.get('search_term') or None,
+            'status': status_filter if status_filter != "Все" else None,
+            'assigned_to': tech_options[tech_filter],
+            'equipment_type': equipment_filter.strip() or None,
+            'date_from': date_from,
+            'date_to': date_to,
+        }
+    
+    # Фильтры применяются в БД: загружается только текущая страница
+    total = store.count_requests(**filters)
+    after = get_page_cursor("requests_pages", filters)
+    if filters.get('search_term'):
+        # При поиске заявки идут по релевантности, с фрагментами совпадений
+        search_filters = {k: v for k, v in filters.items() if k != 'search_term'}
+        page = store.search_requests_page(filters['search_term'], after=after, projection='list',
+                                             **search_filters)
+    else:
+        page = store.get_requests_page(after=after, projection='list', **filters)
+    requests = page['items']
+    next_cursor = page['next_cursor']
 
     if current_user['role'] == 'Заказчик':
         if not requests:
             st.info("📭 У вас еще нет заявок. Создайте первую!")
         else:
-            st.success(f"✅ Найдено ваших заявок: {len(requests)}")
+            st.success(f"✅ Найдено ваших заявок: {total}")
     else:
         # Для остальных ролей
         if not requests:
             st.info("📭 Заявок не найдено")
         else:
-            st.write(f"**Найдено заявок:** {len(requests)}")
-    
+            st.write(f"**Найдено заявок:** {total}")
+
     # Отображаем таблицу заявок с разными правами
     display_requests_table_by_role(requests, current_user)
+    if requests and current_user['role'] in ['Администратор', 'Менеджер']:
+        show_bulk_actions(requests, current_user)
+    show_page_navigation("requests_pages", next_cursor, total)
+
+    if current_user['role'] != 'Заказчик':
+        show_export_controls("requests_export", filters)
+
+
+def show_bulk_actions(requests, current_user):
+    """
+    Массовая смена статуса и назначение специалиста для заявок текущей страницы
+    """
+    with st.expander("⚙️ Массовые действия"):
+        numbers = {req['request_number']: req['id'] for req in requests}
+        selected = st.multiselect("Заявки", list(numbers.keys()), key="bulk_selected")
+        request_ids = [numbers[number] for number in selected]
+
+        col1, col2 = st.columns(2)
+        with col1:
+            new_status = st.selectbox("Новый статус", database.REQUEST_STATUSES, key="bulk_status")
+            if st.button("Сменить статус", use_container_width=True, key="bulk_status_btn",
+                         disabled=not request_ids):
+                changed = store.bulk_update_status(request_ids, new_status, current_user['id'])
+                if changed is None:
+                    st.error("❌ Не удалось обновить статус")
+                else:
+                    st.success(f"✅ Статус изменен у заявок: {changed}")
+                    st.rerun()
+        with col2:
+            tech_options = {"Не назначен": None}
+            tech_options.update({t['full_name']: t['id'] for t in store.get_technicians()})
+            technician = st.selectbox("Специалист", list(tech_options.keys()), key="bulk_technician")
+            if st.button("Назначить", use_container_width=True, key="bulk_assign_btn",
+                         disabled=not request_ids):
+                changed = store.bulk_assign_technician(request_ids, tech_options[technician])
+                if changed is None:
+                    st.error("❌ Не удалось назначить специалиста")
+                else:
+                    st.success(f"✅ Обновлено заявок: {changed}")
+                    st.rerun()
+
+
+def show_data_as_of(data_as_of):
+    """
+    Подпись с моментом, на который сняты данные отчета (None - рабочая база)
+    """
+    if data_as_of is not None:
+        st.caption(f"🕒 Данные на {data_as_of:%d.%m.%Y %H:%M:%S}")
+
+
+def show_export_controls(state_key, filters, title="📤 Выгрузка заявок"):
+    """
+    Выгрузка заявок по текущим фильтрам в CSV/XLSX/Parquet.
+    Файл пишется потоково во временный файл, затем отдается кнопкой скачивания.
+    """
+    if not SQLITE_ONLY:
+        return
+    with st.expander(title):
+        col1, col2 = st.columns(2)
+        with col1:
+            file_format = st.selectbox("Формат", list(export.EXPORT_FORMATS.keys()),
+                                       key=f"{state_key}_format")
+        with col2:
+            st.write("")
+            prepare = st.button("Подготовить файл", use_container_width=True, key=f"{state_key}_prepare")
+
+        if prepare:
+            previous = st.session_state.pop(state_key, None)
+            if previous and os.path.exists(previous['path']):
+                os.remove(previous['path'])
+            with tempfile.NamedTemporaryFile(suffix=f".{file_format}", delete=False) as f, \
+                    store.analytics_snapshot() as data_as_of:
+                count = export.export_requests(f, file_format, **filters)
+            st.session_state[state_key] = {'path': f.name, 'format': file_format, 'count': count,
+                                           'data_as_of': data_as_of}
+
+        prepared = st.session_state.get(state_key)
+        if prepared and os.path.exists(prepared['path']):
+            st.caption(f"Заявок в файле: {prepared['count']}")
+            show_data_as_of(prepared.get('data_as_of'))
+            with open(prepared['path'], 'rb') as f:
+                st.download_button(
+                    "⬇️ Скачать",
+                    data=f,
+                    file_name=f"заявки_{date.today().isoformat()}.{prepared['format']}",
+                    mime=export.EXPORT_FORMATS[prepared['format']],
+                    key=f"{state_key}_download"
+                )
+
+
+def get_page_cursor(state_key, filters):
+    """
+    Курсор текущей страницы списка.
+    При изменении фильтров навигация начинается с первой страницы.
+    """
+    filters_key = f"{state_key}_filters"
+    if st.session_state.get(filters_key) != filters or state_key not in st.session_state:
+        st.session_state[filters_key] = filters
+        st.session_state[state_key] = []
+    cursors = st.session_state[state_key]
+    return cursors[-1] if cursors else None
+
+
+def show_page_navigation(state_key, next_cursor, total, page_size=database.REQUESTS_PAGE_SIZE):
+    """
+    Кнопки перехода между страницами списка заявок
+    """
+    cursors = st.session_state.get(state_key, [])
+    pages = max(1, -(-total // page_size))
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("← Назад", use_container_width=True, disabled=not cursors,
+                     key=f"{state_key}_prev"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Страница {len(cursors) + 1} из {pages}")
+    with col3:
+        if st.button("Вперед →", use_container_width=True, disabled=next_cursor is None,
+                     key=f"{state_key}_next"):
+            cursors.append(next_cursor)
+            st.rerun()
 
 
 def display_requests_table_by_role(requests, current_user):
@@ -345,6 +503,8 @@ def display_requests_table_by_role(requests, current_user):
                 st.write(f"**{req['request_number']}** {icon}")
                 st.write(f"📱 {req['user_name']} | {req['user_phone']}")
                 st.write(f"🔧 {req['equipment_type']} {req['equipment_model']}")
+                if req.get('snippet'):
+                    st.caption(f"🔎 {req['snippet']}")
             
             with col2:
                 st.write(f"**Статус:** {req['status']}")
@@ -444,13 +604,13 @@ def show_edit_request_modal(request, current_user):
         
         if current_user['role'] in ['Администратор', 'Менеджер']:
             # Получаем специалистов
-            technicians_raw = database.get_technicians()
+            technicians_raw = store.get_technicians()
             
             # Преобразуем в правильный формат если нужно
             technicians = []
             if technicians_raw:
                 for tech in technicians_raw:
-                    if isinstance(tech, dict):
+                    if isinstance(tech, Mapping):
                         technicians.append(tech)
                     else:
                         # Если пришел не словарь, создаем его
@@ -503,7 +663,7 @@ def show_edit_request_modal(request, current_user):
             if st.button("💾 Сохранить", type="primary", key=f"save_simple_{request['id']}"):
                 # Сохраняем статус
                 if new_status != request['status']:
-                    database.update_request_status(request['id'], new_status, current_user['id'])
+                    writes.update_request_status(request['id'], new_status, current_user['id'])
                     st.success(f"✅ Статус: {new_status}")
                 
                 # Сохраняем специалиста
@@ -511,7 +671,7 @@ def show_edit_request_modal(request, current_user):
                     current_tech_id = request.get('assigned_to')
                     
                     if selected_tech_id != current_tech_id:
-                        database.assign_technician(request['id'], selected_tech_id)
+                        writes.assign_technician(request['id'], selected_tech_id)
                         
                         if selected_tech_id:
                             # Находим имя
@@ -541,7 +701,7 @@ def show_edit_request_page(request_id, current_user):
     Отдельная страница для редактирования заявки
     """
     # Получаем данные заявки
-    request = database.get_request_by_id(request_id)
+    request = store.get_request_by_id(request_id)
     
     if not request:
         st.error("❌ Заявка не найдена")
@@ -601,7 +761,7 @@ def show_edit_request_page(request_id, current_user):
         if current_user['role'] in ['Администратор', 'Менеджер']:
             st.write("**Назначение специалиста:**")
             
-            technicians = database.get_technicians()
+            technicians = store.get_technicians()
             
             if technicians:
                 # Создаем список опций
@@ -609,7 +769,7 @@ def show_edit_request_page(request_id, current_user):
                 tech_ids = [None]
                 
                 for tech in technicians:
-                    if isinstance(tech, dict):
+                    if isinstance(tech, Mapping):
                         name = tech.get('full_name', 'Неизвестно')
                         tech_id = tech.get('id')
                     else:
@@ -679,7 +839,7 @@ def show_edit_request_page(request_id, current_user):
             
             # Статус
             if new_status != request['status']:
-                if database.update_request_status(request_id, new_status, current_user['id']):
+                if writes.update_request_status(request_id, new_status, current_user['id']):
                     changes_made = True
                     messages.append(f"✅ Статус изменен на: **{new_status}**")
             
@@ -688,15 +848,15 @@ def show_edit_request_page(request_id, current_user):
                 current_tech_id = request.get('assigned_to')
                 
                 if new_assigned_to != current_tech_id:
-                    if database.assign_technician(request_id, new_assigned_to):
+                    if writes.assign_technician(request_id, new_assigned_to):
                         changes_made = True
                         if new_assigned_to:
                             # Находим имя специалиста
                             tech_name = "специалист"
                             for tech in technicians:
-                                tech_id = tech.get('id') if isinstance(tech, dict) else (tech[0] if len(tech) > 0 else None)
+                                tech_id = tech.get('id') if isinstance(tech, Mapping) else (tech[0] if len(tech) > 0 else None)
                                 if tech_id == new_assigned_to:
-                                    tech_name = tech.get('full_name', 'специалист') if isinstance(tech, dict) else (tech[1] if len(tech) > 1 else 'специалист')
+                                    tech_name = tech.get('full_name', 'специалист') if isinstance(tech, Mapping) else (tech[1] if len(tech) > 1 else 'специалист')
                                     break
                             messages.append(f"✅ Назначен специалист: **{tech_name}**")
                         else:
@@ -708,7 +868,7 @@ def show_edit_request_page(request_id, current_user):
                     st.success(msg)
                 
                 # Обновляем данные заявки
-                request = database.get_request_by_id(request_id)
+                request = store.get_request_by_id(request_id)
                 time.sleep(1)
                 st.rerun()
             else:
@@ -774,21 +934,7 @@ def show_my_tasks_page(current_user):
         st.warning("Эта страница доступна только специалистам")
         return
     
-    with database.get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-        SELECT r.* FROM requests r
-        WHERE r.assigned_to = ? AND r.status != 'Выполнено'
-        ORDER BY 
-            CASE r.status 
-                WHEN 'В процессе ремонта' THEN 1
-                WHEN 'Готово к выдаче' THEN 2
-                WHEN 'Новая заявка' THEN 3
-                ELSE 4
-            END,
-            r.created_at DESC
-        ''', (current_user['id'],))
-        my_requests = [dict(row) for row in cursor.fetchall()]
+    my_requests = store.get_technician_tasks(current_user['id'])
     
     if not my_requests:
         st.info("У вас нет активных заявок")
@@ -815,7 +961,7 @@ def show_my_tasks_page(current_user):
                 
                 if new_status != req['status']:
                     if st.button("🔄 Обновить", key=f"update_{req['id']}", use_container_width=True):
-                        if database.update_request_status(req['id'], new_status, current_user['id']):
+                        if writes.update_request_status(req['id'], new_status, current_user['id']):
                             st.success("✓ Обновлено")
                             st.rerun()
                 
@@ -834,7 +980,9 @@ def show_statistics_page(current_user):
     
     st.title("📊 Статистика работы")
     
-    stats = database.get_statistics()
+    with store.analytics_snapshot() as data_as_of:
+        stats = store.get_statistics()
+    show_data_as_of(data_as_of)
     
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -853,6 +1001,24 @@ def show_statistics_page(current_user):
     else:
         st.info("Нет данных для отображения")
 
+    st.divider()
+    date_range = st.date_input("Период выгрузки", value=(), key="statistics_export_period")
+    date_from, date_to = (list(date_range) + [None, None])[:2]
+    show_export_controls("statistics_export", {'date_from': date_from, 'date_to': date_to})
+
+    if current_user['role'] == 'Администратор' and SQLITE_ONLY:
+        with st.expander("🗄️ Кэш справочников"):
+            cache = database.get_reference_cache_stats()
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Попадания", cache['hits'])
+            with col2:
+                st.metric("Промахи", cache['misses'])
+            with col3:
+                st.metric("Доля попаданий", f"{cache['hit_rate']:.0%}")
+            with col4:
+                st.metric("Сбросы", cache['invalidations'])
+
 def show_users_page(current_user):
     """
     Страница управления пользователями (только для администратора)
@@ -871,12 +1037,12 @@ def show_users_page(current_user):
     
     with tab1:
         if 'editing_user_id' in st.session_state:
-            user_to_edit = next((u for u in database.get_all_users() if u['id'] == st.session_state.editing_user_id), None)
+            user_to_edit = store.get_user_by_id(st.session_state.editing_user_id)
             if user_to_edit:
                 show_edit_user_modal(user_to_edit, current_user)
                 return  
         if 'deleting_user_id' in st.session_state:
-            user_to_delete = next((u for u in database.get_all_users() if u['id'] == st.session_state.deleting_user_id), None)
+            user_to_delete = store.get_user_by_id(st.session_state.deleting_user_id)
             if user_to_delete:
                 show_delete_user_modal(user_to_delete, current_user)
                 return 
@@ -889,7 +1055,7 @@ def show_users_list_simple(current_user):
     """
     Упрощенный список пользователей с работающими кнопками
     """
-    users = database.get_all_users()
+    users = store.get_all_users()
     
     if not users:
         st.info("👤 Пользователи не найдены")
@@ -1074,7 +1240,7 @@ def show_add_user_form(current_user):
                 'phone': phone
             }
             
-            if database.create_user_db(user_data):
+            if store.create_user_db(user_data):
                 st.success(f"✅ Пользователь {full_name} успешно добавлен!")
                 
                 # Очищаем поля формы
@@ -1179,7 +1345,7 @@ def show_edit_user_modal(user, current_user):
                 if new_password:
                     update_data['password'] = new_password
                 
-                if database.update_user_db(user['id'], update_data):
+                if store.update_user_db(user['id'], update_data):
                     st.success("✅ Данные пользователя обновлены!")
                     
                     # Очищаем состояние и перезагружаем через 2 секунды
@@ -1222,6 +1388,17 @@ def show_delete_user_modal(user, current_user):
     
     st.error("❌ **ВНИМАНИЕ:** Это действие нельзя отменить! Все данные пользователя будут удалены.")
     
+    reassign_to = None
+    if user['role'] == 'Специалист':
+        active = store.count_active_assignments(user['id'])
+        if active:
+            tech_options = {"Оставить без специалиста": None}
+            tech_options.update({t['full_name']: t['id'] for t in store.get_technicians()
+                                 if t['id'] != user['id']})
+            choice = st.selectbox(f"Незавершенных заявок у специалиста: {active}. Передать их:",
+                                  list(tech_options.keys()), key=f"reassign_{user['id']}")
+            reassign_to = tech_options[choice]
+    
     confirm_text = st.text_input(
         "Для подтверждения введите 'УДАЛИТЬ' (заглавными буквами):",
         placeholder="Введите УДАЛИТЬ",
@@ -1234,7 +1411,7 @@ def show_delete_user_modal(user, current_user):
         if st.button("✅ Да, удалить", type="primary", use_container_width=True, 
                     key=f"confirm_delete_btn_{user['id']}"):
             if confirm_text == "УДАЛИТЬ":
-                if database.delete_user_db(user['id']):
+                if store.delete_user_db(user['id'], reassign_to):
                     st.success(f"✅ Пользователь {user['full_name']} успешно удален!")
                     
                     if 'deleting_user_id' in st.session_state:
@@ -1329,33 +1506,19 @@ def show_problem_requests(current_user):
             key="overdue_days"
         )
     
-    all_requests = database.get_all_requests()
-    
-    problem_requests = []
-    
-    for req in all_requests:
-        if req['status'] in ['Новая заявка', 'В процессе ремонта']:
-            created_date = datetime.strptime(req['created_at'], '%Y-%m-%d') if isinstance(req['created_at'], str) else req['created_at']
-            days_in_work = (datetime.now() - created_date).days
-            
-            if days_in_work > days_overdue:
-                req['problem_type'] = 'Просроченная'
-                req['days_overdue'] = days_in_work - days_overdue
-                problem_requests.append(req)
-    
-        elif req['status'] == 'Готово к выдаче':
-            if req.get('assigned_at'):
-                assigned_date = datetime.strptime(req['assigned_at'], '%Y-%m-%d') if isinstance(req['assigned_at'], str) else req['assigned_at']
-                days_waiting = (datetime.now() - assigned_date).days
-                if days_waiting > 5:
-                    req['problem_type'] = 'Длительное ожидание'
-                    req['days_waiting'] = days_waiting
-                    problem_requests.append(req)
-    
-
-    if problem_type != "Все":
-        problem_requests = [r for r in problem_requests if r.get('problem_type', '') == problem_type]
-    
+    # Соответствие пунктов фильтра типам проблем, определяемым в БД
+    problem_types = {
+        "Все": None,
+        "Просроченные": 'Просроченная',
+    }
+    if problem_type in problem_types:
+        problem_requests = store.get_problem_requests(
+            days_overdue=days_overdue,
+            waiting_days=5,
+            problem_type=problem_types[problem_type]
+        )
+    else:
+        problem_requests = []
 
     if problem_requests:
         st.warning(f"⚠️ Найдено проблемных заявок: {len(problem_requests)}")
@@ -1381,6 +1544,8 @@ def show_problem_requests(current_user):
                         st.error(f"**Просрочка:** {req['days_overdue']} дней")
                     if req.get('days_waiting'):
                         st.warning(f"**Ожидание:** {req['days_waiting']} дней")
+                    if req.get('days_in_status') is not None:
+                        st.write(f"**В текущем статусе:** {req['days_in_status']} дней")
                 
                 col_actions = st.columns(3)
                 
@@ -1408,7 +1573,7 @@ def show_problem_requests(current_user):
                     
                     if st.form_submit_button("💾 Добавить комментарий"):
                         if comment:
-                            database.add_comment(
+                            writes.add_comment(
                                 req['id'], 
                                 current_user['id'], 
                                 f"👨‍💼 Менеджер по качеству: {comment}",
@@ -1426,24 +1591,10 @@ def show_assign_specialists(current_user):
     st.subheader("👥 Привлечение специалистов к сложным заявкам")
     
 
-    all_requests = database.get_all_requests()
-    
-    need_help_requests = []
-    
-    for req in all_requests:
-        if req['status'] == 'В процессе ремонта':
-            if req.get('assigned_at'):
-                assigned_date = datetime.strptime(req['assigned_at'], '%Y-%m-%d') if isinstance(req['assigned_at'], str) else req['assigned_at']
-                days_in_progress = (datetime.now() - assigned_date).days
-                if days_in_progress > 3:
-                    req['days_in_progress'] = days_in_progress
-                    need_help_requests.append(req)
-        
-        comments = database.get_comments(req['id'])
-        technical_notes = [c for c in comments if c.get('is_technical_note') and 'сложн' in c.get('comment_text', '').lower()]
-        if technical_notes:
-            req['technical_issues'] = True
-            need_help_requests.append(req)
+    # Отбор выполняется в БД одним запросом (срок в работе + технические заметки)
+    need_help_requests = store.get_requests_needing_help(min_days_in_progress=3,
+                                                            note_fragment='сложн')
+    technicians = store.get_technicians()
     
     if need_help_requests:
         st.write(f"**Заявки, требующие дополнительных специалистов:** {len(need_help_requests)}")
@@ -1466,8 +1617,6 @@ def show_assign_specialists(current_user):
                 
                 with col2:
                     with st.form(key=f"add_specialist_{req['id']}"):
-                        technicians = database.get_technicians()
-                        
                         if technicians:
                             available_techs = [
                                 t for t in technicians 
@@ -1494,7 +1643,7 @@ def show_assign_specialists(current_user):
                                     for tech in available_techs:
                                         if tech['full_name'] == selected_tech:
                                          
-                                            database.add_comment(
+                                            writes.add_comment(
                                                 req['id'],
                                                 current_user['id'],
                                                 f"👨‍💼 Менеджер по качеству привлек дополнительного специалиста: {selected_tech}. Причина: {reason}",
@@ -1520,15 +1669,9 @@ def show_extend_deadlines(current_user):
     """
     st.subheader("📅 Продление сроков выполнения заявок")
     
-    # Получаем заявки, которые могут требовать продления
-    all_requests = database.get_all_requests()
-    
-    extend_candidates = []
-    
-    for req in all_requests:
-        # Заявки в работе, которым может потребоваться продление
-        if req['status'] in ['В процессе ремонта', 'Готово к выдаче']:
-            extend_candidates.append(req)
+    # Заявки в работе, которым может потребоваться продление
+    extend_candidates = store.find_requests(status=['В процессе ремонта', 'Готово к выдаче'],
+                                               projection='summary')
     
     if extend_candidates:
         st.info("ℹ️ Выберите заявку для продления срока выполнения")
@@ -1624,7 +1767,7 @@ def show_extend_deadlines(current_user):
 📝 Заметки: {additional_notes if additional_notes else "нет"}
                         """.strip()
                         
-                        database.add_comment(
+                        writes.add_comment(
                             request_id,
                             current_user['id'],
                             comment_text,
@@ -1649,10 +1792,12 @@ def show_quality_analytics(current_user):
     """
     st.subheader("📊 Аналитика качества обслуживания")
     
-    # Получаем все заявки для анализа
-    all_requests = database.get_all_requests()
+    # Показатели рассчитываются в БД (по снимку для отчетов)
+    with store.analytics_snapshot() as data_as_of:
+        summary = store.get_quality_summary(days_overdue=3)
+    show_data_as_of(data_as_of)
     
-    if not all_requests:
+    if not summary['total']:
         st.info("📭 Нет данных для анализа")
         return
     
@@ -1660,20 +1805,17 @@ def show_quality_analytics(current_user):
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total = len(all_requests)
+        total = summary['total']
         st.metric("Всего заявок", total)
     
     with col2:
-        completed = sum(1 for r in all_requests if r['status'] == 'Выполнено')
-        st.metric("Выполнено", completed)
+        st.metric("Выполнено", summary['completed'])
     
     with col3:
-        in_progress = sum(1 for r in all_requests if r['status'] in ['В процессе ремонта', 'Готово к выдаче'])
-        st.metric("В работе", in_progress)
+        st.metric("В работе", summary['in_progress'])
     
     with col4:
-        overdue = sum(1 for r in all_requests if r['status'] in ['Новая заявка', 'В процессе ремонта'] 
-                     and (datetime.now() - datetime.strptime(r['created_at'], '%Y-%m-%d')).days > 3)
+        overdue = summary['overdue']
         st.metric("Просрочено", overdue)
     
     st.divider()
@@ -1681,18 +1823,7 @@ def show_quality_analytics(current_user):
     # Анализ по типам оборудования
     st.write("**📈 Распределение проблем по типам оборудования:**")
     
-    equipment_stats = {}
-    for req in all_requests:
-        eq_type = req['equipment_type']
-        if eq_type not in equipment_stats:
-            equipment_stats[eq_type] = {'total': 0, 'problems': 0}
-        equipment_stats[eq_type]['total'] += 1
-        
-        # Определяем "проблемные" заявки
-        if req['status'] in ['Новая заявка', 'В процессе ремонта']:
-            days_old = (datetime.now() - datetime.strptime(req['created_at'], '%Y-%m-%d')).days
-            if days_old > 3:
-                equipment_stats[eq_type]['problems'] += 1
+    equipment_stats = summary['equipment_stats']
     
     # Выводим статистику
     for eq_type, stats in equipment_stats.items():
@@ -1719,16 +1850,9 @@ def show_quality_analytics(current_user):
         recommendations.append("📅 **Увеличить количество специалистов** для обработки заявок")
     
     # Проверяем среднее время выполнения
-    completed_requests = [r for r in all_requests if r['status'] == 'Выполнено']
-    if completed_requests:
-        avg_completion_days = sum(
-            (datetime.strptime(r.get('completed_at', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d') - 
-             datetime.strptime(r['created_at'], '%Y-%m-%d')).days 
-            for r in completed_requests
-        ) / len(completed_requests)
-        
-        if avg_completion_days > 5:
-            recommendations.append("⏱️ **Оптимизировать процессы ремонта** для сокращения времени выполнения")
+    avg_completion_days = summary['avg_completion_days']
+    if avg_completion_days is not None and avg_completion_days > 5:
+        recommendations.append("⏱️ **Оптимизировать процессы ремонта** для сокращения времени выполнения")
     
     # Рекомендации по обучению
     problematic_types = [eq_type for eq_type, stats in equipment_stats.items() 
@@ -1755,22 +1879,19 @@ def show_customer_requests_page(current_user):
     # Статистика для заказчика
     col1, col2, col3 = st.columns(3)
     
-    # Получаем все заявки заказчика
-    customer_requests = database.get_requests_by_customer(
-        current_user['full_name'], 
-        current_user.get('phone', '')
-    )
+    # Счетчики по статусам считаются в БД, без загрузки самих заявок
+    status_counts = store.count_requests_by_status(customer_name=current_user['full_name'])
     
     with col1:
-        total = len(customer_requests)
+        total = sum(status_counts.values())
         st.metric("Всего заявок", total)
     
     with col2:
-        completed = sum(1 for r in customer_requests if r['status'] == 'Выполнено')
+        completed = status_counts.get('Выполнено', 0)
         st.metric("Выполнено", completed)
     
     with col3:
-        in_progress = sum(1 for r in customer_requests if r['status'] in ['В процессе ремонта', 'Готово к выдаче'])
+        in_progress = status_counts.get('В процессе ремонта', 0) + status_counts.get('Готово к выдаче', 0)
         st.metric("В работе", in_progress)
     
     # Кнопка создания заявки
@@ -1779,7 +1900,7 @@ def show_customer_requests_page(current_user):
         st.rerun()
     
     # Фильтры для заказчика
-    if customer_requests:
+    if total:
         st.divider()
         
         # Простые фильтры
@@ -1791,13 +1912,18 @@ def show_customer_requests_page(current_user):
                 key="customer_filter"
             )
         
-        # Применяем фильтр
-        filtered_requests = customer_requests
-        if status_filter != "Все":
-            filtered_requests = [r for r in customer_requests if r['status'] == status_filter]
+        # Применяем фильтр и получаем текущую страницу
+        filters = {
+            'customer_name': current_user['full_name'],
+            'status': status_filter if status_filter != "Все" else None,
+        }
+        after = get_page_cursor("customer_pages", filters)
+        page = store.get_requests_page(after=after, **filters)
+        filtered_requests = page['items']
+        filtered_total = status_counts.get(status_filter, 0) if status_filter != "Все" else total
         
         # Отображение заявок
-        st.write(f"**Найдено заявок:** {len(filtered_requests)}")
+        st.write(f"**Найдено заявок:** {filtered_total}")
         
         for req in filtered_requests:
             with st.container():
@@ -1828,6 +1954,8 @@ def show_customer_requests_page(current_user):
         
         if not filtered_requests:
             st.info("📭 Заявок по выбранному фильтру не найдено")
+        else:
+            show_page_navigation("customer_pages", page['next_cursor'], filtered_total)
     else:
         st.info("""
         📭 У вас еще нет заявок!
@@ -1842,6 +1970,180 @@ def show_customer_requests_page(current_user):
         """)
 
 
+def show_import_page(current_user):
+    """
+    Пакетный импорт заявок из CSV/Parquet (только для администратора)
+    """
+    if current_user['role'] != 'Администратор':
+        st.warning("⛔ Эта страница доступна только администраторам")
+        return
+
+    st.title("📥 Импорт заявок")
+    st.caption("Поля заявки: " + ", ".join(bulk_import.REQUIRED_FIELDS + bulk_import.OPTIONAL_FIELDS))
+
+    uploaded = st.file_uploader("Файл выгрузки", type=["csv", "parquet"], key="import_file")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        delimiter = st.text_input("Разделитель CSV", value=";", max_chars=1, key="import_delimiter")
+    with col2:
+        batch_size = st.number_input("Строк в транзакции", min_value=100, max_value=100000,
+                                     value=bulk_import.IMPORT_BATCH_SIZE, step=100, key="import_batch")
+
+    mapping_text = st.text_area("Соответствие колонок (колонка_файла=поле_заявки, по одному в строке)",
+                                key="import_mapping")
+
+    if uploaded is not None and st.button("🚀 Импортировать", type="primary", key="import_start"):
+        column_map = {}
+        for line in mapping_text.splitlines():
+            source, _, target = line.partition('=')
+            if source.strip() and target.strip():
+                column_map[source.strip()] = target.strip()
+
+        status_text = st.empty()
+        try:
+            report = bulk_import.import_requests(
+                uploaded,
+                column_map=column_map,
+                delimiter=delimiter or ';',
+                batch_size=int(batch_size),
+                progress=lambda processed: status_text.write(f"Обработано строк: {processed}")
+            )
+        except (OSError, ValueError) as e:
+            st.error(f"❌ Не удалось прочитать файл: {e}")
+            return
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Всего строк", report['total'])
+        with col2:
+            st.metric("Импортировано", report['imported'])
+        with col3:
+            st.metric("С ошибками", report['failed'])
+        with col4:
+            st.metric("Время, с", f"{report['elapsed']:.1f}")
+
+        if report['errors']:
+            st.subheader("Ошибки")
+            st.dataframe(report['errors'], use_container_width=True)
+            if report['failed'] > len(report['errors']):
+                st.caption(f"Показаны первые {len(report['errors'])} ошибок из {report['failed']}")
+        else:
+            st.success("✅ Все строки импортированы")
+
+
+def show_profiler_page(current_user):
+    """
+    Профилирование запросов к БД (только для администратора)
+    """
+    if current_user['role'] != 'Администратор':
+        st.warning("⛔ Эта страница доступна только администраторам")
+        return
+
+    st.title("⏱️ Профилирование БД")
+
+    enabled = st.toggle("Собирать статистику запросов", value=db_profiler.is_enabled(),
+                        key="profiler_enabled")
+    if enabled != db_profiler.is_enabled():
+        db_profiler.set_enabled(enabled)
+    st.caption(f"Медленные запросы: от {db_profiler.SLOW_QUERY_MS:g} мс, "
+               f"журнал: {db_profiler.slow_query_log_path()}")
+
+    if st.button("🗑️ Очистить статистику", key="profiler_reset"):
+        db_profiler.reset_stats()
+        st.rerun()
+
+    queue_metrics = write_queue.get_metrics()
+    if queue_metrics:
+        st.subheader("Очередь записи")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Операций", queue_metrics['operations'],
+                    f"ошибок: {queue_metrics['failed']}, отменено: {queue_metrics['cancelled']}",
+                    delta_color="off")
+        col2.metric("Средний пакет", f"{queue_metrics['avg_batch']:.1f}", f"макс.: {queue_metrics['max_batch']}",
+                    delta_color="off")
+        col3.metric("Длина очереди", queue_metrics['queue_depth'], f"макс.: {queue_metrics['max_queue_depth']}",
+                    delta_color="off")
+        col4.metric("Фиксация пакета, мс", f"{queue_metrics['avg_commit_ms']:.1f}",
+                    f"ожидание: {queue_metrics['avg_wait_ms']:.1f} мс", delta_color="off")
+        st.bar_chart(queue_metrics['histogram'])
+
+    stats = db_profiler.get_stats()
+    if not stats:
+        st.info("Статистика пока не собрана")
+        return
+
+    st.subheader("Запросы")
+    st.dataframe([{
+        'Запрос': item['name'],
+        'Вызовов': item['calls'],
+        'Всего, мс': round(item['total_ms'], 1),
+        'Среднее, мс': round(item['avg_ms'], 2),
+        'Макс., мс': round(item['max_ms'], 1),
+        'Строк': item['rows'],
+        'Страницы': ", ".join(f"{page} ({count})" for page, count in item['pages'].items()),
+    } for item in stats], use_container_width=True)
+
+    selected = st.selectbox("Гистограмма времени", [item['name'] for item in stats],
+                            key="profiler_histogram")
+    histogram = next(item['histogram'] for item in stats if item['name'] == selected)
+    st.bar_chart(histogram)
+
+    st.subheader("Медленные запросы")
+    slow = db_profiler.get_slow_queries()
+    if not slow:
+        st.info("Медленных запросов нет")
+    for entry in slow:
+        with st.expander(f"{entry['time']} — {entry['name']} — {entry['ms']} мс ({entry['page']})"):
+            st.code(entry['sql'], language="sql")
+            st.text(entry['plan'])
+
+
+def show_backups_page(current_user):
+    """
+    Резервные копии базы данных (только для администратора)
+    """
+    if current_user['role'] != 'Администратор':
+        st.warning("⛔ Эта страница доступна только администраторам")
+        return
+
+    st.title("💾 Резервные копии")
+
+    status = dump_db.get_backup_status()
+    if status['scheduler_running']:
+        st.caption(f"Автоматическое копирование: каждые {status['interval_hours']:g} ч")
+    else:
+        st.caption("Автоматическое копирование выключено (SC_BACKUP_INTERVAL_HOURS=0)")
+    if status['last_error']:
+        st.error(f"❌ Последняя попытка ({status['last_time']:%d.%m.%Y %H:%M}): {status['last_error']}")
+
+    if st.button("💾 Создать копию сейчас", type="primary", key="backup_now"):
+        with st.spinner("Копирование..."):
+            path = dump_db.run_backup(database.DB_PATH)
+        if path:
+            st.success(f"✅ Копия создана: {os.path.basename(path)}")
+        else:
+            st.error("❌ Не удалось создать копию")
+
+    backups = dump_db.list_backups(dump_db.backup_dir_for(database.DB_PATH))
+    if not backups:
+        st.info("Резервных копий пока нет")
+        return
+
+    for backup in backups:
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            st.write(f"**{backup['name']}** — {backup['created']:%d.%m.%Y %H:%M}")
+        with col2:
+            st.write(f"{backup['size'] / 1024 / 1024:.1f} МБ")
+        with col3:
+            if st.button("Проверить", key=f"verify_{backup['name']}", use_container_width=True):
+                if dump_db.verify_backup(backup['path']):
+                    st.success("✅ OK")
+                else:
+                    st.error("❌ Сумма не совпадает")
+
+
 def main():
     """
     Главная функция приложения
@@ -1871,6 +2173,10 @@ def main():
 
         if current_user['role'] == 'Администратор':
             menu_items.append(("👥 Управление пользователями", "users"))
+            if SQLITE_ONLY:
+                menu_items.append(("📥 Импорт заявок", "import"))
+                menu_items.append(("⏱️ Профилирование БД", "profiler"))
+                menu_items.append(("💾 Резервные копии", "backups"))
         
 
         for text, page in menu_items:
@@ -1899,6 +2205,7 @@ def main():
 
     if 'page' not in st.session_state:
         st.session_state.page = "requests"
+    db_profiler.set_page(st.session_state.page)
     
     if 'editing_request' in st.session_state and st.session_state.editing_request:
         show_edit_request_page(st.session_state.editing_request, current_user)
@@ -1922,6 +2229,12 @@ def main():
         show_users_page(current_user)
     elif st.session_state.page == "quality_control":  
         show_quality_control_page(current_user)
+    elif st.session_state.page == "import":
+        show_import_page(current_user)
+    elif st.session_state.page == "profiler":
+        show_profiler_page(current_user)
+    elif st.session_state.page == "backups":
+        show_backups_page(current_user)
 
 if __name__ == "__main__":
     st.set_page_config(
@@ -1930,5 +2243,7 @@ if __name__ == "__main__":
         layout="wide",
         initial_sidebar_state="expanded"
     )
+    if dump_db.BACKUP_INTERVAL_HOURS and SQLITE_ONLY:
+        dump_db.start_backup_scheduler(database.DB_PATH, dump_db.BACKUP_INTERVAL_HOURS)
 
     main()
\ No newline at end of file
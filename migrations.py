@@ -0,0 +1,516 @@
+"""
+Версионные миграции схемы базы данных сервисного центра
+
+Каждая миграция применяется один раз, в отдельной транзакции, и записывается
+в таблицу schema_version. Миграции идемпотентны (IF NOT EXISTS), поэтому
+применяются и к базам, созданным старыми версиями init_db.py.
+Запускаются автоматически при первом открытии пишущего соединения
+(database.py) и вручную: python manage.py migrate
+"""
+import sqlite3
+from datetime import datetime
+
+# Запрос фактической статистики заявок по типам оборудования
+REQUEST_STATS_QUERY = '''
+SELECT equipment_type,
+       COUNT(*) as total,
+       SUM(status = 'Выполнено') as completed,
+       TOTAL(CASE WHEN status = 'Выполнено' AND completed_at IS NOT NULL AND created_at IS NOT NULL
+                  THEN julianday(completed_at) - julianday(created_at) END) as completion_days_sum,
+       SUM(status = 'Выполнено' AND completed_at IS NOT NULL AND created_at IS NOT NULL)
+           as completion_days_count
+FROM requests
+GROUP BY equipment_type
+'''
+
+
+def fill_search_index(cursor):
+    """Заполнение полнотекстового индекса по текущим заявкам и комментариям"""
+    cursor.execute('DELETE FROM requests_fts')
+    cursor.execute('''
+    INSERT INTO requests_fts (rowid, request_number, user_name, equipment_type,
+                              equipment_model, problem_description, comments)
+    SELECT r.id, r.request_number, r.user_name, r.equipment_type,
+           r.equipment_model, r.problem_description,
+           coalesce((
+               SELECT group_concat(c.comment_text || ' ' || coalesce(c.parts_ordered, ''), ' ')
+               FROM comments c WHERE c.request_id = r.id
+           ), '')
+    FROM requests r
+    ''')
+    cursor.execute("INSERT INTO requests_fts (requests_fts) VALUES ('optimize')")
+
+
+def fill_request_stats(cursor):
+    """Пересчет накопительной статистики по текущим заявкам"""
+    cursor.execute('DELETE FROM request_stats')
+    cursor.execute(f'''
+    INSERT INTO request_stats (equipment_type, total, completed,
+                               completion_days_sum, completion_days_count)
+    {REQUEST_STATS_QUERY}
+    ''')
+
+
+def raise_request_sequences(cursor):
+    """
+    Подъем последовательностей номеров заявок до наибольшего существующего номера
+    каждого года (после переноса строк requests в обход _allocate_request_numbers)
+    """
+    cursor.execute('''
+    INSERT INTO request_sequences (year, last_value)
+    SELECT CAST(substr(request_number, 5, 4) AS INTEGER),
+           MAX(CAST(substr(request_number, 10) AS INTEGER))
+    FROM requests
+    WHERE request_number GLOB 'REQ-[0-9][0-9][0-9][0-9]-*'
+    GROUP BY 1
+    ON CONFLICT (year) DO UPDATE SET last_value = max(last_value, excluded.last_value)
+    ''')
+
+
+def _fill_if_created(table, fill):
+    """
+    Шаг миграции: заполнить производную таблицу, если она создана этой миграцией
+    (в базах, где объекты уже были созданы прежним кодом, данные не трогаем)
+    """
+    def step(cursor, existing):
+        if table not in existing:
+            fill(cursor)
+    return step
+
+
+# Журнал изменений (CDC): столбцы отслеживаемых таблиц.
+# Хеш пароля в журнал не пишется: выгрузки изменений передаются потребителям
+CDC_TABLES = {
+    'users': ['id', 'username', 'role', 'full_name', 'phone', 'created_at'],
+    'requests': ['id', 'request_number', 'created_at', 'equipment_type', 'equipment_model',
+                 'problem_description', 'user_name', 'user_phone', 'status', 'assigned_to',
+                 'assigned_at', 'completed_at'],
+    'comments': ['id', 'request_id', 'user_id', 'comment_text', 'is_technical_note',
+                 'parts_ordered', 'created_at'],
+    'status_history': ['id', 'request_id', 'old_status', 'new_status', 'changed_by', 'changed_at'],
+}
+
+
+def _change_log_triggers(tables=None):
+    """
+    Триггеры журнала изменений: на вставку и изменение пишется строка целиком
+    (json_object), на удаление - только id
+
+    Args:
+        tables: Таблицы из CDC_TABLES (по умолчанию все)
+    """
+    statements = []
+    for table in tables or CDC_TABLES:
+        columns = CDC_TABLES[table]
+        row = ', '.join(f"'{column}', NEW.{column}" for column in columns)
+        for event, op, data, row_id in (('INSERT', 'I', f'json_object({row})', 'NEW.id'),
+                                        ('UPDATE', 'U', f'json_object({row})', 'NEW.id'),
+                                        ('DELETE', 'D', 'NULL', 'OLD.id')):
+            statements.append(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_change_log_{event.lower()} AFTER {event} ON {table}
+        BEGIN
+            INSERT INTO change_log (table_name, op, row_id, data)
+            VALUES ('{table}', '{op}', {row_id}, {data});
+        END
+        ''')
+    return statements
+
+
+# Миграции: (версия, описание, шаги). Шаг - SQL-строка или функция (cursor, existing),
+# где existing - имена объектов схемы до начала миграции.
+MIGRATIONS = [
+    (1, 'Базовые таблицы и индексы', [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL CHECK(role IN (
+                'Администратор',
+                'Менеджер',
+                'Менеджер по качеству',
+                'Специалист',
+                'Оператор',
+                'Заказчик'
+            )),
+            full_name TEXT NOT NULL,
+            phone TEXT,
+            created_at DATE DEFAULT (date('now'))
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_number TEXT UNIQUE NOT NULL,
+            created_at DATE DEFAULT (date('now')),
+            equipment_type TEXT NOT NULL,
+            equipment_model TEXT NOT NULL,
+            problem_description TEXT NOT NULL,
+            user_name TEXT NOT NULL,
+            user_phone TEXT NOT NULL,
+            status TEXT DEFAULT 'Новая заявка' CHECK(status IN ('Новая заявка', 'В процессе ремонта', 'Готово к выдаче', 'Выполнено')),
+            assigned_to INTEGER,
+            assigned_at DATE,
+            completed_at DATE,
+            FOREIGN KEY (assigned_to) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS comments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            comment_text TEXT NOT NULL,
+            is_technical_note BOOLEAN DEFAULT 0,
+            parts_ordered TEXT,
+            created_at DATE DEFAULT (date('now')),
+            FOREIGN KEY (request_id) REFERENCES requests(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS status_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_id INTEGER NOT NULL,
+            old_status TEXT,
+            new_status TEXT NOT NULL,
+            changed_by INTEGER NOT NULL,
+            changed_at DATE DEFAULT (date('now')),
+            FOREIGN KEY (request_id) REFERENCES requests(id) ON DELETE CASCADE,
+            FOREIGN KEY (changed_by) REFERENCES users(id)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_requests_status ON requests(status)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_assigned ON requests(assigned_to)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_number ON requests(request_number)',
+        'CREATE INDEX IF NOT EXISTS idx_comments_request ON comments(request_id)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_date ON requests(created_at)',
+    ]),
+    (2, 'Последовательности номеров заявок', [
+        '''
+        CREATE TABLE IF NOT EXISTS request_sequences (
+            year INTEGER PRIMARY KEY,
+            last_value INTEGER NOT NULL
+        )
+        ''',
+    ]),
+    # Полнотекстовый индекс заявок: rowid = requests.id,
+    # в столбец comments собраны тексты всех комментариев заявки
+    (3, 'Полнотекстовый поиск по заявкам и комментариям', [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS requests_fts USING fts5(
+            request_number, user_name, equipment_type, equipment_model,
+            problem_description, comments,
+            tokenize = 'trigram'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS requests_fts_insert AFTER INSERT ON requests
+        BEGIN
+            INSERT INTO requests_fts (rowid, request_number, user_name, equipment_type,
+                                      equipment_model, problem_description, comments)
+            VALUES (NEW.id, NEW.request_number, NEW.user_name, NEW.equipment_type,
+                    NEW.equipment_model, NEW.problem_description, '');
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS requests_fts_update
+        AFTER UPDATE OF request_number, user_name, equipment_type, equipment_model,
+                        problem_description ON requests
+        BEGIN
+            UPDATE requests_fts
+            SET request_number = NEW.request_number,
+                user_name = NEW.user_name,
+                equipment_type = NEW.equipment_type,
+                equipment_model = NEW.equipment_model,
+                problem_description = NEW.problem_description
+            WHERE rowid = NEW.id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS requests_fts_delete AFTER DELETE ON requests
+        BEGIN
+            DELETE FROM requests_fts WHERE rowid = OLD.id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS comments_fts_insert AFTER INSERT ON comments
+        BEGIN
+            UPDATE requests_fts SET comments = (
+                SELECT group_concat(comment_text || ' ' || coalesce(parts_ordered, ''), ' ')
+                FROM comments WHERE request_id = NEW.request_id
+            )
+            WHERE rowid = NEW.request_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS comments_fts_update AFTER UPDATE ON comments
+        BEGIN
+            UPDATE requests_fts SET comments = coalesce((
+                SELECT group_concat(comment_text || ' ' || coalesce(parts_ordered, ''), ' ')
+                FROM comments WHERE request_id = requests_fts.rowid
+            ), '')
+            WHERE rowid IN (OLD.request_id, NEW.request_id);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS comments_fts_delete AFTER DELETE ON comments
+        BEGIN
+            UPDATE requests_fts SET comments = coalesce((
+                SELECT group_concat(comment_text || ' ' || coalesce(parts_ordered, ''), ' ')
+                FROM comments WHERE request_id = OLD.request_id
+            ), '')
+            WHERE rowid = OLD.request_id;
+        END
+        ''',
+        _fill_if_created('requests_fts', fill_search_index),
+    ]),
+    # Накопительная статистика по типам оборудования для get_statistics.
+    # Вклад заявки: total=1; completed, если статус 'Выполнено';
+    # срок выполнения в днях, если известны даты создания и завершения.
+    (4, 'Накопительная статистика по типам оборудования', [
+        '''
+        CREATE TABLE IF NOT EXISTS request_stats (
+            equipment_type TEXT PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            completion_days_sum REAL NOT NULL DEFAULT 0,
+            completion_days_count INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS request_stats_insert AFTER INSERT ON requests
+        BEGIN
+            INSERT INTO request_stats (equipment_type, total, completed,
+                                       completion_days_sum, completion_days_count)
+            VALUES (
+                NEW.equipment_type, 1,
+                NEW.status = 'Выполнено',
+                CASE WHEN NEW.status = 'Выполнено' AND NEW.completed_at IS NOT NULL AND NEW.created_at IS NOT NULL
+                     THEN julianday(NEW.completed_at) - julianday(NEW.created_at) ELSE 0 END,
+                CASE WHEN NEW.status = 'Выполнено' AND NEW.completed_at IS NOT NULL AND NEW.created_at IS NOT NULL
+                     THEN 1 ELSE 0 END
+            )
+            ON CONFLICT (equipment_type) DO UPDATE SET
+                total = total + excluded.total,
+                completed = completed + excluded.completed,
+                completion_days_sum = completion_days_sum + excluded.completion_days_sum,
+                completion_days_count = completion_days_count + excluded.completion_days_count;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS request_stats_delete AFTER DELETE ON requests
+        BEGIN
+            UPDATE request_stats SET
+                total = total - 1,
+                completed = completed - (OLD.status = 'Выполнено'),
+                completion_days_sum = completion_days_sum - CASE
+                    WHEN OLD.status = 'Выполнено' AND OLD.completed_at IS NOT NULL AND OLD.created_at IS NOT NULL
+                    THEN julianday(OLD.completed_at) - julianday(OLD.created_at) ELSE 0 END,
+                completion_days_count = completion_days_count - CASE
+                    WHEN OLD.status = 'Выполнено' AND OLD.completed_at IS NOT NULL AND OLD.created_at IS NOT NULL
+                    THEN 1 ELSE 0 END
+            WHERE equipment_type = OLD.equipment_type;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS request_stats_update
+        AFTER UPDATE OF status, equipment_type, created_at, completed_at ON requests
+        BEGIN
+            UPDATE request_stats SET
+                total = total - 1,
+                completed = completed - (OLD.status = 'Выполнено'),
+                completion_days_sum = completion_days_sum - CASE
+                    WHEN OLD.status = 'Выполнено' AND OLD.completed_at IS NOT NULL AND OLD.created_at IS NOT NULL
+                    THEN julianday(OLD.completed_at) - julianday(OLD.created_at) ELSE 0 END,
+                completion_days_count = completion_days_count - CASE
+                    WHEN OLD.status = 'Выполнено' AND OLD.completed_at IS NOT NULL AND OLD.created_at IS NOT NULL
+                    THEN 1 ELSE 0 END
+            WHERE equipment_type = OLD.equipment_type;
+            INSERT INTO request_stats (equipment_type, total, completed,
+                                       completion_days_sum, completion_days_count)
+            VALUES (
+                NEW.equipment_type, 1,
+                NEW.status = 'Выполнено',
+                CASE WHEN NEW.status = 'Выполнено' AND NEW.completed_at IS NOT NULL AND NEW.created_at IS NOT NULL
+                     THEN julianday(NEW.completed_at) - julianday(NEW.created_at) ELSE 0 END,
+                CASE WHEN NEW.status = 'Выполнено' AND NEW.completed_at IS NOT NULL AND NEW.created_at IS NOT NULL
+                     THEN 1 ELSE 0 END
+            )
+            ON CONFLICT (equipment_type) DO UPDATE SET
+                total = total + excluded.total,
+                completed = completed + excluded.completed,
+                completion_days_sum = completion_days_sum + excluded.completion_days_sum,
+                completion_days_count = completion_days_count + excluded.completion_days_count;
+        END
+        ''',
+        _fill_if_created('request_stats', fill_request_stats),
+    ]),
+    # Составные индексы горячих запросов. Индексы, ставшие префиксами новых,
+    # и дубль автоматического индекса UNIQUE(request_number) удаляются.
+    (5, 'Составные индексы для истории, комментариев, задач специалиста и заказчиков', [
+        'CREATE INDEX IF NOT EXISTS idx_status_history_request ON status_history(request_id, changed_at)',
+        'CREATE INDEX IF NOT EXISTS idx_comments_request_created ON comments(request_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_assigned_status ON requests(assigned_to, status)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_customer ON requests(user_name, user_phone)',
+        'DROP INDEX IF EXISTS idx_comments_request',
+        'DROP INDEX IF EXISTS idx_requests_assigned',
+        'DROP INDEX IF EXISTS idx_requests_number',
+    ]),
+    (6, 'Сбор статистики планировщика по новым индексам', [
+        'ANALYZE',
+    ]),
+    # Журнал изменений для инкрементальных копий и синхронизации (cdc.py).
+    # seq (AUTOINCREMENT) монотонно растет и не переиспользуется после очистки журнала.
+    (7, 'Журнал изменений и контрольные точки потребителей', [
+        '''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op TEXT NOT NULL CHECK(op IN ('I', 'U', 'D')),
+            row_id INTEGER NOT NULL,
+            data TEXT,
+            changed_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS cdc_checkpoints (
+            name TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL,
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        ''',
+    ] + _change_log_triggers()),
+    # Индексы сводки качества (get_quality_summary): незавершенные и просроченные
+    # заявки считаются по диапазонам индекса без чтения таблицы; выполненные
+    # без даты завершения (данные до учета completed_at) - по частичному индексу.
+    # idx_requests_status - префикс нового индекса.
+    (8, 'Индексы для сводки качества по статусам и срокам', [
+        'CREATE INDEX IF NOT EXISTS idx_requests_status_created ON requests(status, created_at, equipment_type)',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_requests_completed_undated ON requests(created_at)
+        WHERE status = 'Выполнено' AND completed_at IS NULL
+        ''',
+        'DROP INDEX IF EXISTS idx_requests_status',
+        'ANALYZE requests',
+    ]),
+    # Покрывающий индекс списков заявок (набор столбцов 'list' в database.py):
+    # страница списка читается из индекса в порядке (created_at, id) без обращения
+    # к строкам таблицы с длинным описанием проблемы. idx_requests_date - его префикс.
+    (9, 'Покрывающий индекс для списков заявок', [
+        '''
+        CREATE INDEX IF NOT EXISTS idx_requests_list ON requests(
+            created_at, id, status, assigned_to, request_number,
+            equipment_type, equipment_model, user_name, user_phone
+        )
+        ''',
+        'DROP INDEX IF EXISTS idx_requests_date',
+        'ANALYZE requests',
+    ]),
+    # Триггеры users из миграции 7 писали в журнал хеш пароля: они пересоздаются
+    # без него, а уже записанные хеши удаляются из журнала
+    (10, 'Журнал изменений без хешей паролей', [
+        'DROP TRIGGER IF EXISTS users_change_log_insert',
+        'DROP TRIGGER IF EXISTS users_change_log_update',
+    ] + _change_log_triggers(['users']) + [
+        '''
+        UPDATE change_log SET data = json_remove(data, '$.password_hash')
+        WHERE table_name = 'users' AND data IS NOT NULL
+        ''',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )
+    ''')
+
+
+def get_schema_version(conn):
+    """
+    Текущая версия схемы
+
+    Returns:
+        int: Номер последней примененной миграции (0 - миграции не применялись)
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not exists:
+        return 0
+    return conn.execute('SELECT coalesce(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def pending_migrations(conn):
+    """
+    Миграции, еще не примененные к базе
+
+    Returns:
+        List of tuples: (версия, описание)
+    """
+    current = get_schema_version(conn)
+    return [(version, description) for version, description, _ in MIGRATIONS if version > current]
+
+
+def migrate(conn, target=None):
+    """
+    Применение недостающих миграций по порядку.
+    Каждая миграция выполняется в своей транзакции BEGIN IMMEDIATE, поэтому
+    параллельно запущенные процессы не применят одну миграцию дважды;
+    если ожидающих миграций нет, блокировка записи не берется.
+
+    Args:
+        conn: Соединение с базой (пишущее)
+        target: Версия, до которой применять миграции (по умолчанию последняя)
+
+    Returns:
+        List of tuples: Примененные миграции (версия, описание)
+
+    Raises:
+        sqlite3.ProgrammingError: У соединения открыта транзакция (ее нельзя
+            ни зафиксировать, ни откатить за вызывающий код)
+        sqlite3.Error: Ошибка миграции; ее транзакция откатывается
+    """
+    if conn.in_transaction:
+        raise sqlite3.ProgrammingError("Миграции нельзя применять внутри открытой транзакции")
+    target = LATEST_VERSION if target is None else target
+    # Обычный запуск на актуальной схеме: только чтение, без блокировки записи
+    current = get_schema_version(conn)
+    if current >= target:
+        return []
+    _ensure_version_table(conn)
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        if version > target:
+            break
+        if version <= current:
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,)).fetchone():
+                conn.rollback()
+                continue
+            cursor = conn.cursor()
+            existing = {row[0] for row in cursor.execute('SELECT name FROM sqlite_master')}
+            for step in steps:
+                if callable(step):
+                    step(cursor, existing)
+                else:
+                    cursor.execute(step)
+            cursor.execute(
+                'INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)',
+                (version, description, datetime.now().isoformat(timespec='seconds'))
+            )
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        applied.append((version, description))
+    return applied
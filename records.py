@@ -0,0 +1,173 @@
+"""
+Типизированные записи строк бд: заявка, комментарий, смена статуса, пользователь
+
+Запись - dataclass со __slots__: поля доступны как атрибуты (request.status),
+даты приходят уже разобранными в datetime.date (конвертер DATE в database.py,
+date в PostgreSQL), а строка занимает в памяти меньше, чем dict(row).
+Для страниц, написанных под словари, запись остается отображением
+(collections.abc.Mapping):
+
+    request = database.get_request_by_id(42)
+    request.created_at.year                 - типизированный доступ
+    request['status'], request.get('assigned_name'), dict(request)  - как раньше
+
+Столбцы запроса, которых нет среди полей записи (вычисляемые в SQL snippet,
+days_overdue, problem_type и т.п.), сохраняются в extra и доступны по ключу.
+Поля, не выбранные запросом, равны None.
+"""
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from datetime import date
+
+
+class Record(Mapping):
+    """Основа записей: доступ к полям по ключу, как у dict(row)"""
+    __slots__ = ()
+
+    # Заполняются декоратором _record
+    _fields = ()
+    _field_set = frozenset()
+    _converters = {}
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._field_set or (self.extra is not None and key in self.extra)
+
+    def __iter__(self):
+        yield from self._fields
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return len(self._fields) + (len(self.extra) if self.extra is not None else 0)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def to_dict(self):
+        """Обычный словарь (для JSON и сериализации)"""
+        return dict(self.items())
+
+
+def _record(cls):
+    """Декоратор записи: slotted dataclass; логические поля (0/1 в SQLite) приводятся к bool"""
+    cls = dataclass(slots=True, repr=False)(cls)
+    cls._fields = tuple(f.name for f in fields(cls) if f.name != 'extra')
+    cls._field_set = frozenset(cls._fields)
+    cls._converters = {f.name: bool for f in fields(cls) if f.type is bool}
+    return cls
+
+
+@_record
+class Request(Record):
+    """Заявка (таблица requests) с ФИО ответственного"""
+    id: int = None
+    request_number: str = None
+    created_at: date = None
+    equipment_type: str = None
+    equipment_model: str = None
+    problem_description: str = None
+    user_name: str = None
+    user_phone: str = None
+    status: str = None
+    assigned_to: int = None
+    assigned_at: date = None
+    completed_at: date = None
+    assigned_name: str = None
+    extra: dict = None
+
+
+@_record
+class Comment(Record):
+    """Комментарий к заявке с ФИО и ролью автора"""
+    id: int = None
+    request_id: int = None
+    user_id: int = None
+    comment_text: str = None
+    is_technical_note: bool = None
+    parts_ordered: str = None
+    created_at: date = None
+    full_name: str = None
+    role: str = None
+    extra: dict = None
+
+
+@_record
+class StatusChange(Record):
+    """Запись истории статусов с ФИО изменившего"""
+    id: int = None
+    request_id: int = None
+    old_status: str = None
+    new_status: str = None
+    changed_by: int = None
+    changed_at: date = None
+    changed_by_name: str = None
+    extra: dict = None
+
+
+@_record
+class User(Record):
+    """Пользователь без хеша пароля (справочники, профиль)"""
+    id: int = None
+    username: str = None
+    role: str = None
+    full_name: str = None
+    phone: str = None
+    created_at: date = None
+    extra: dict = None
+
+
+def record_maker(record_type, columns):
+    """
+    Функция, собирающая запись из строки результата запроса.
+    Позиции столбцов сопоставляются полям один раз на запрос.
+
+    Args:
+        record_type: Request, Comment, StatusChange или User
+        columns: Имена столбцов результата (cursor.description, result.keys())
+
+    Returns:
+        callable: row -> запись (row - кортеж, sqlite3.Row или строка SQLAlchemy)
+    """
+    columns = list(columns)
+    positions = [columns.index(name) if name in columns else None for name in record_type._fields]
+    converters = [(i, record_type._converters[name]) for i, name in enumerate(record_type._fields)
+                  if name in record_type._converters and positions[i] is not None]
+    extra = [(name, i) for i, name in enumerate(columns) if name not in record_type._field_set]
+    if not converters and not extra and positions[:len(columns)] == list(range(len(columns))):
+        # Столбцы идут в порядке полей (r.* и т.п.): строка передается в конструктор как есть
+        return lambda row: record_type(*row)
+
+    def make(row):
+        values = [None if i is None else row[i] for i in positions]
+        for i, convert in converters:
+            if values[i] is not None:
+                values[i] = convert(values[i])
+        record = record_type(*values)
+        if extra:
+            record.extra = {name: row[i] for name, i in extra}
+        return record
+    return make
+
+
+def fetch_all(cursor, record_type):
+    """Все строки результата курсора sqlite3 как записи record_type"""
+    columns = [column[0] for column in cursor.description]
+    # Кортежи вместо sqlite3.Row: записи не нужен доступ к строке по имени столбца
+    cursor.row_factory = None
+    make = record_maker(record_type, columns)
+    return list(map(make, cursor.fetchall()))
+
+
+def fetch_one(cursor, record_type):
+    """Первая строка результата как запись или None"""
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return record_maker(record_type, [column[0] for column in cursor.description])(row)
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Пустая база со схемой последней версии; снимки для отчетов выключены"""
+    path = str(tmp_path / 'service_center.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    monkeypatch.setattr(database, 'ANALYTICS_SNAPSHOT_MAX_AGE', 0)
+    database.reset_connections()
+    # Кэш справочников общий для процесса: пользователи прошлого теста не должны остаться
+    database.invalidate_reference_cache()
+    with database.get_db_connection() as conn:
+        conn.execute('''
+        INSERT INTO users (username, password_hash, role, full_name, phone)
+        VALUES ('tech', '-', 'Специалист', 'Инженер Петров', '+79992222222')
+        ''')
+        conn.commit()
+    yield path
+    database.reset_connections()
+
+
+def new_request(n=0):
+    return {
+        'equipment_type': ['Кондиционер', 'Вентилятор', 'Сплит-система'][n % 3],
+        'equipment_model': f'Модель {n}',
+        'problem_description': 'Не включается',
+        'user_name': f'Заказчик {n % 4}',
+        'user_phone': '+79990000000',
+    }
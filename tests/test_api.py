@@ -0,0 +1,88 @@
+import pytest
+
+pytest.importorskip('flask')
+
+import api  # noqa: E402
+import database  # noqa: E402
+from conftest import new_request  # noqa: E402
+
+
+@pytest.fixture
+def client(db_path):
+    for username, role, full_name in [('manager', 'Менеджер', 'Менеджер Сидорова'),
+                                      ('tech2', 'Специалист', 'Инженер Иванов'),
+                                      ('customer', 'Заказчик', 'Заказчик 0')]:
+        assert database.create_user_db({'username': username, 'password': 'secret', 'role': role,
+                                        'full_name': full_name})
+    return api.app.test_client()
+
+
+def _login(client, username):
+    response = client.post('/api/login', json={'username': username, 'password': 'secret'})
+    assert response.status_code == 200
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+def _user_id(username):
+    return next(user['id'] for user in database.get_all_users() if user['username'] == username)
+
+
+def test_requests_need_a_valid_token(client):
+    assert client.get('/api/requests').status_code == 401
+    assert client.get('/api/requests', headers={'Authorization': 'Bearer x'}).status_code == 401
+    assert client.post('/api/login', json={'username': 'manager', 'password': 'x'}).status_code == 401
+    assert client.get('/api/requests', headers=_login(client, 'manager')).status_code == 200
+
+
+def test_expired_token(client, monkeypatch):
+    headers = _login(client, 'manager')
+    monkeypatch.setattr(api, 'API_TOKEN_MAX_AGE', -1)
+    response = client.get('/api/requests', headers=headers)
+    assert response.status_code == 401
+    assert response.get_json()['error'] == 'Срок действия токена истек'
+
+
+def test_role_permissions(client):
+    request_id = database.create_request(new_request(0))
+    customer = _login(client, 'customer')
+    assert client.post(f'/api/requests/{request_id}/status', headers=customer,
+                       json={'status': 'Выполнено'}).status_code == 403
+    assert client.post(f'/api/requests/{request_id}/assign', headers=_login(client, 'tech2'),
+                       json={'technician_id': 1}).status_code == 403
+    # Заказчик видит только свои заявки
+    other = database.create_request(new_request(1))
+    assert client.get(f'/api/requests/{request_id}', headers=customer).status_code == 200
+    assert client.get(f'/api/requests/{other}', headers=customer).status_code == 404
+
+
+def test_role_change_applies_to_issued_tokens(client):
+    headers = _login(client, 'manager')
+    request_id = database.create_request(new_request(0))
+    # Справочник пользователей уже в кэше: токен должен видеть базу, а не кэш
+    database.get_all_users()
+    manager_id = _user_id('manager')
+    with database.get_db_connection() as conn:
+        conn.execute("UPDATE users SET role = 'Оператор' WHERE id = ?", (manager_id,))
+        conn.commit()
+    assert client.post(f'/api/requests/{request_id}/status', headers=headers,
+                       json={'status': 'Выполнено'}).status_code == 403
+    with database.get_db_connection() as conn:
+        conn.execute('DELETE FROM users WHERE id = ?', (manager_id,))
+        conn.commit()
+    assert client.get('/api/requests', headers=headers).status_code == 401
+
+
+def test_technician_updates_only_assigned_requests(client):
+    own = database.create_request(new_request(0))
+    other = database.create_request(new_request(1))
+    database.bulk_assign_technician([own], _user_id('tech2'))
+    database.bulk_assign_technician([other], 1)
+    headers = _login(client, 'tech2')
+
+    response = client.post(f'/api/requests/{own}/status', headers=headers,
+                           json={'status': 'В процессе ремонта'})
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'В процессе ремонта'
+    assert client.post(f'/api/requests/{other}/status', headers=headers,
+                       json={'status': 'Выполнено'}).status_code == 403
+    assert database.get_request_by_id(other)['status'] == 'Новая заявка'
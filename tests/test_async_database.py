@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import async_database
+import database
+from conftest import new_request
+
+# Запрос, который выполняется, пока его не прервут
+ENDLESS_QUERY = '''
+WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000)
+SELECT count(*) FROM c
+'''
+
+
+@pytest.fixture
+def adb(db_path, monkeypatch):
+    monkeypatch.setattr(async_database, 'ASYNC_DB_WORKERS', 1)
+    async_database.shutdown()
+    yield async_database
+    async_database.shutdown()
+
+
+def _insert_then_hang(started):
+    with database.get_db_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute("INSERT INTO users (username, password_hash, role, full_name) "
+                     "VALUES ('ghost', '-', 'Оператор', 'Не сохранен')")
+        started.set()
+        conn.execute(ENDLESS_QUERY).fetchone()
+        conn.commit()
+
+
+def _usernames():
+    with database.get_db_connection(readonly=True) as conn:
+        return {row[0] for row in conn.execute('SELECT username FROM users')}
+
+
+def test_context_managers_and_generators_are_not_wrapped(adb):
+    for name in ('analytics_snapshot', 'get_db_connection'):
+        with pytest.raises(AttributeError):
+            getattr(adb, name)
+    database.create_request(new_request(0))
+    assert asyncio.run(adb.count_requests()) == 1
+
+
+def test_timeout_interrupts_query_and_rolls_back(adb):
+    started = threading.Event()
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await adb.run(_insert_then_hang, started, timeout=0.3)
+        # Поток пула освобождается: следующий запрос выполняется сразу
+        return await adb.run(_usernames, timeout=5)
+
+    begin = time.monotonic()
+    usernames = asyncio.run(scenario())
+    assert started.is_set()
+    assert 'ghost' not in usernames
+    assert time.monotonic() - begin < 5
+
+
+def test_cancel_interrupts_query(adb):
+    started = threading.Event()
+
+    async def scenario():
+        task = asyncio.create_task(adb.run(_insert_then_hang, started, timeout=None))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await adb.run(_usernames, timeout=5)
+
+    assert 'ghost' not in asyncio.run(scenario())
+
+
+def test_queued_call_is_skipped_after_timeout(adb):
+    started = threading.Event()
+    calls = []
+
+    async def scenario():
+        busy = asyncio.create_task(adb.run(_insert_then_hang, started, timeout=None))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        # Единственный поток пула занят: вызов ждет в очереди и снимается по таймауту
+        with pytest.raises(asyncio.TimeoutError):
+            await adb.run(calls.append, 'queued', timeout=0.1)
+        busy.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await busy
+        await adb.run(calls.append, 'after', timeout=5)
+
+    asyncio.run(scenario())
+    assert calls == ['after']
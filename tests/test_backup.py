@@ -0,0 +1,47 @@
+import gzip
+import sqlite3
+import threading
+
+import database
+import dump_db
+from conftest import new_request
+
+
+def test_backup_finishes_under_constant_writes(db_path, tmp_path):
+    database.insert_requests_bulk([new_request(n) for n in range(2000)])
+    stop = threading.Event()
+
+    def writer():
+        conn = sqlite3.connect(db_path, timeout=5)
+        try:
+            while not stop.is_set():
+                conn.execute("UPDATE users SET phone = phone WHERE id = 1")
+                conn.commit()
+        finally:
+            conn.close()
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    try:
+        path = dump_db.create_backup(db_path, str(tmp_path / 'backups'), pages=1, step_sleep=0.001,
+                                     keep=0, max_restarts=3, max_seconds=5)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert dump_db.verify_backup(path)
+    restored = tmp_path / 'restored.db'
+    with gzip.open(path, 'rb') as src, open(restored, 'wb') as dst:
+        dst.write(src.read())
+    conn = sqlite3.connect(restored)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM requests').fetchone()[0] == 2000
+    finally:
+        conn.close()
+
+
+def test_default_backup_dir_is_next_to_the_database(db_path, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path.parent)
+    path = dump_db.create_backup(db_path)
+    assert path.startswith(str(tmp_path / 'backups'))
+    assert [item['path'] for item in dump_db.list_backups(dump_db.backup_dir_for(db_path))] == [path]
@@ -0,0 +1,65 @@
+from datetime import date
+
+import pytest
+
+import database
+from conftest import new_request
+
+
+@pytest.fixture
+def request_ids(db_path):
+    database.insert_requests_bulk([new_request(n) for n in range(6)])
+    with database.get_db_connection() as conn:
+        conn.execute("INSERT INTO users (username, password_hash, role, full_name) "
+                     "VALUES ('tech2', '-', 'Специалист', 'Инженер Иванов')")
+        conn.commit()
+    return sorted(item['id'] for item in database.get_all_requests())
+
+
+def _statuses():
+    return {item['id']: item['status'] for item in database.get_all_requests()}
+
+
+def test_bulk_status_skips_requests_already_in_status(request_ids):
+    assert database.update_request_status(request_ids[0], 'Выполнено', 1)
+    changed = database.bulk_update_status(request_ids[:4], 'Выполнено', 1)
+    assert changed == 3
+    statuses = _statuses()
+    assert [statuses[request_id] for request_id in request_ids] == ['Выполнено'] * 4 + ['Новая заявка'] * 2
+    for request_id in request_ids[1:4]:
+        [entry] = database.get_status_history(request_id)
+        assert (entry['old_status'], entry['new_status'], entry['changed_by']) == \
+            ('Новая заявка', 'Выполнено', 1)
+        assert database.get_request_by_id(request_id)['completed_at'] == date.today()
+    assert len(database.get_status_history(request_ids[0])) == 1
+
+
+def test_bulk_status_rejects_unknown_status_and_empty_input(request_ids):
+    assert database.bulk_update_status(request_ids, 'Потеряна', 1) is None
+    assert database.bulk_update_status([], 'Выполнено', 1) == 0
+    assert set(_statuses().values()) == {'Новая заявка'}
+    # Несуществующие ID не считаются измененными
+    assert database.bulk_update_status([10 ** 6], 'Выполнено', 1) == 0
+
+
+def test_bulk_assign_and_unassign(request_ids):
+    assert database.bulk_assign_technician(request_ids[:3] + [10 ** 6], 2) == 3
+    tasks = database.get_technician_tasks(2)
+    assert sorted(item['id'] for item in tasks) == request_ids[:3]
+    assert all(database.get_request_by_id(i)['assigned_at'] == date.today() for i in request_ids[:3])
+    assert database.count_active_assignments(2) == 3
+
+    assert database.bulk_assign_technician(request_ids[:1], None) == 1
+    unassigned = database.get_request_by_id(request_ids[0])
+    assert (unassigned['assigned_to'], unassigned['assigned_at']) == (None, None)
+    assert database.bulk_assign_technician([], 2) == 0
+
+
+def test_reassign_moves_only_active_requests(request_ids):
+    database.bulk_assign_technician(request_ids, 1)
+    database.bulk_update_status(request_ids[:2], 'Выполнено', 1)
+    assert database.reassign_technician_requests(1, 2) == 4
+    assert database.count_active_assignments(1) == 0
+    assert [database.get_request_by_id(i)['assigned_to'] for i in request_ids] == [1, 1, 2, 2, 2, 2]
+    assert database.reassign_technician_requests(1, None, only_active=False) == 2
+    assert database.get_request_by_id(request_ids[0])['assigned_to'] is None
@@ -0,0 +1,85 @@
+import io
+from datetime import date
+
+import pytest
+
+pytest.importorskip('pandas')
+
+import bulk_import  # noqa: E402
+import database  # noqa: E402
+
+HEADER = 'equipment_type;equipment_model;problem_description;user_name;user_phone;status;created_at'
+
+
+def _csv(*lines):
+    return io.BytesIO('\n'.join((HEADER,) + lines).encode('utf-8'))
+
+
+def test_report_lists_invalid_rows(db_path):
+    report = bulk_import.import_requests(_csv(
+        'Кондиционер;AC-1;Не холодит;Заказчик 1;+7999;;2024-03-01',
+        'Вентилятор;;Шумит;Заказчик 2;+7999;;',
+        'Вентилятор;F-2;Шумит;Заказчик 2;+7999;Потеряна;',
+        'Вентилятор;F-3;Шумит;Заказчик 2;+7999;;01.03.2024',
+        'Сплит-система;S-4;Течет;Заказчик 3;+7999;Готова к выдаче;NULL',
+        'Сплит-система;S-5;Течет;Заказчик 3;+7999;Выполнено;2024-02-10',
+    ), file_format='csv', batch_size=2)
+
+    assert (report['total'], report['imported'], report['failed']) == (6, 3, 3)
+    # Номера строк - как в файле (строка 1 - заголовок)
+    assert [(error['row'], error['error'].split(':')[0]) for error in report['errors']] == [
+        (3, 'не заполнены поля'), (4, 'неизвестный статус'), (5, 'некорректная дата в поле created_at'),
+    ]
+    imported = {item['equipment_model']: item for item in database.find_requests()}
+    assert sorted(imported) == ['AC-1', 'S-4', 'S-5']
+    assert imported['AC-1']['created_at'] == date(2024, 3, 1)
+    assert imported['AC-1']['status'] == 'Новая заявка'
+    assert imported['S-4']['status'] == 'Готово к выдаче'
+    assert imported['S-4']['created_at'] == date.today()
+    # Выполненная заявка без даты завершения считается завершенной в день создания
+    assert imported['S-5']['completed_at'] == date(2024, 2, 10)
+    numbers = [item['request_number'] for item in imported.values()]
+    assert len(set(numbers)) == 3
+
+
+def test_rows_rejected_by_the_database_are_reported(db_path):
+    with database.get_db_connection() as conn:
+        conn.execute('''
+        CREATE TRIGGER reject_model BEFORE INSERT ON requests WHEN NEW.equipment_model = 'Брак'
+        BEGIN SELECT RAISE(ABORT, 'модель отклонена'); END
+        ''')
+        conn.commit()
+    progress = []
+    report = bulk_import.import_requests(_csv(
+        'Кондиционер;AC-1;Не холодит;Заказчик 1;+7999;;',
+        'Кондиционер;Брак;Не холодит;Заказчик 1;+7999;;',
+        'Кондиционер;AC-3;Не холодит;Заказчик 1;+7999;;',
+    ), file_format='csv', progress=progress.append)
+
+    # Пакет откатывается целиком и повторяется построчно
+    assert (report['imported'], report['failed']) == (2, 1)
+    assert report['errors'] == [{'row': 3, 'error': 'модель отклонена'}]
+    assert sorted(item['equipment_model'] for item in database.find_requests()) == ['AC-1', 'AC-3']
+    assert progress == [3]
+
+
+def test_column_map_and_parquet(db_path, tmp_path):
+    pd = pytest.importorskip('pandas')
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'partner.parquet'
+    pd.DataFrame({
+        'Тип': ['Кондиционер', 'Вентилятор'],
+        'Модель': ['AC-1', 'F-2'],
+        'Описание': ['Не холодит', 'Шумит'],
+        'Заказчик': ['Заказчик 1', 'Заказчик 2'],
+        'Телефон': ['+7999', None],
+        'created_at': [date(2024, 1, 5), date(2024, 1, 6)],
+    }).to_parquet(path)
+    column_map = {'Тип': 'equipment_type', 'Модель': 'equipment_model', 'Описание': 'problem_description',
+                  'Заказчик': 'user_name', 'Телефон': 'user_phone'}
+
+    report = bulk_import.import_requests(str(path), column_map=column_map)
+    assert (report['imported'], report['failed']) == (1, 1)
+    assert report['errors'][0]['error'] == 'не заполнены поля: user_phone'
+    [item] = database.find_requests()
+    assert (item['equipment_model'], item['created_at']) == ('AC-1', date(2024, 1, 5))
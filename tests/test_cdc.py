@@ -0,0 +1,154 @@
+import sqlite3
+
+import pytest
+
+import cdc
+import database
+import migrations
+from conftest import new_request
+
+
+def _copy(source, target):
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def test_create_request_after_restore_and_changes_apply(db_path, tmp_path, monkeypatch):
+    for n in range(3):
+        assert database.create_request(new_request(n))
+    restored = str(tmp_path / 'restored.db')
+    _copy(db_path, restored)
+
+    for n in range(3, 6):
+        assert database.create_request(new_request(n))
+    exported = cdc.export_changes(db_path, 'hourly', str(tmp_path / 'changes'))
+    assert cdc.apply_changes(restored, [exported['path']])['applied'] == 3
+
+    monkeypatch.setattr(database, 'DB_PATH', restored)
+    database.reset_connections()
+    request_id = database.create_request(new_request(6))
+    assert request_id is not None
+    with database.get_db_connection(readonly=True) as conn:
+        numbers = [row[0] for row in conn.execute('SELECT request_number FROM requests ORDER BY id')]
+    assert len(numbers) == len(set(numbers)) == 7
+    assert database.get_request_by_id(request_id)['request_number'].endswith('-0007')
+
+
+def test_sync_raises_request_sequences(db_path, tmp_path):
+    secondary = str(tmp_path / 'secondary.db')
+    _copy(db_path, secondary)
+    for n in range(4):
+        database.create_request(new_request(n))
+
+    cdc.sync_database(db_path, secondary, 'replica')
+    conn = sqlite3.connect(secondary)
+    try:
+        assert conn.execute('SELECT last_value FROM request_sequences').fetchall() == [(4,)]
+    finally:
+        conn.close()
+
+
+def _clear_change_log(path):
+    """Журнал без записей фикстуры"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute('DELETE FROM change_log')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _backdate_change_log(path, days):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("UPDATE change_log SET changed_at = datetime('now', ?)", (f'-{days} days',))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _logged(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM change_log').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_password_hashes_stay_out_of_the_change_log(db_path, tmp_path):
+    _clear_change_log(db_path)
+    restored = str(tmp_path / 'restored.db')
+    _copy(db_path, restored)
+    assert database.create_user_db({'username': 'operator', 'password': 'secret', 'role': 'Оператор',
+                                    'full_name': 'Оператор Л'})
+    assert database.update_user_db(1, {'role': 'Специалист', 'full_name': 'Инженер Петров',
+                                       'password': 'changed'})
+    conn = sqlite3.connect(db_path)
+    try:
+        logged = [row[0] for row in conn.execute(
+            "SELECT data FROM change_log WHERE table_name = 'users'")]
+    finally:
+        conn.close()
+    assert len(logged) == 2 and all(logged) and not any('password_hash' in data for data in logged)
+
+    exported = cdc.export_changes(db_path, 'hourly', str(tmp_path / 'changes'))
+    cdc.apply_changes(restored, [exported['path']])
+    conn = sqlite3.connect(restored)
+    try:
+        hashes = dict(conn.execute('SELECT username, password_hash FROM users'))
+    finally:
+        conn.close()
+    # Новый пользователь без пароля, у существующего хеш из полной копии не затерт
+    assert hashes['operator'] == '!'
+    assert hashes['tech'] != '!'
+
+
+def test_migration_scrubs_logged_password_hashes(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("INSERT INTO change_log (table_name, op, row_id, data) "
+                     "VALUES ('users', 'U', 1, json_object('id', 1, 'password_hash', 'x'))")
+        conn.execute('DELETE FROM schema_version WHERE version = 10')
+        conn.commit()
+        migrations.migrate(conn)
+        data = conn.execute("SELECT data FROM change_log WHERE table_name = 'users'").fetchone()[0]
+    finally:
+        conn.close()
+    assert 'password_hash' not in data
+
+
+def test_prune_without_consumers_keeps_only_recent_changes(db_path, tmp_path):
+    _clear_change_log(db_path)
+    for n in range(3):
+        database.create_request(new_request(n))
+    assert cdc.prune_change_log(db_path, retention_days=7) == 0
+    _backdate_change_log(db_path, 10)
+    database.create_request(new_request(3))
+
+    assert cdc.prune_change_log(db_path, retention_days=7) == 3
+    assert _logged(db_path) == 1
+    # Новый потребитель начинает с первой сохраненной записи
+    exported = cdc.export_changes(db_path, 'fresh', str(tmp_path / 'changes'))
+    assert exported['count'] == 1
+
+
+def test_lagging_consumer_needs_a_new_full_copy(db_path, tmp_path):
+    _clear_change_log(db_path)
+    database.create_request(new_request(0))
+    cdc.export_changes(db_path, 'hourly', str(tmp_path / 'changes'))
+    secondary = str(tmp_path / 'secondary.db')
+    _copy(db_path, secondary)
+    database.create_request(new_request(1))
+    _backdate_change_log(db_path, 10)
+    database.create_request(new_request(2))
+
+    assert cdc.prune_change_log(db_path, retention_days=7) == 2
+    with pytest.raises(ValueError):
+        cdc.export_changes(db_path, 'hourly', str(tmp_path / 'changes'))
+    with pytest.raises(ValueError):
+        cdc.sync_database(db_path, secondary, 'replica')
@@ -0,0 +1,69 @@
+import csv
+import io
+from datetime import date
+
+import pytest
+
+import database
+import export
+from conftest import new_request
+
+
+@pytest.fixture
+def requests_db(db_path):
+    for n in range(7):
+        database.create_request(new_request(n))
+    database.bulk_assign_technician([1, 2], 1)
+    return db_path
+
+
+def test_iter_requests_reads_in_batches_without_holding_a_connection(requests_db):
+    expected = [item['id'] for item in database.find_requests(projection='list')]
+    rows = database.iter_requests(batch_size=3)
+    first = next(rows)
+    # Между порциями соединение пула свободно
+    assert all(handle.depth == 0 for handle in database._thread_handles().values())
+    assert [first['id']] + [item['id'] for item in rows] == expected
+
+
+def _exported(file_format, **filters):
+    buffer = io.BytesIO()
+    count = export.export_requests(buffer, file_format, **filters)
+    buffer.seek(0)
+    return count, buffer
+
+
+def _expected(**filters):
+    return [[item[key] for key, _ in export.EXPORT_COLUMNS]
+            for item in database.iter_requests(batch_size=2, **filters)]
+
+
+def test_csv_round_trip(requests_db):
+    count, buffer = _exported('csv', assigned_to=1)
+    assert count == 2
+    lines = list(csv.reader(io.TextIOWrapper(buffer, encoding='utf-8-sig'),
+                            delimiter=export.CSV_DELIMITER))
+    assert lines[0] == [title for _, title in export.EXPORT_COLUMNS]
+    assert lines[1:] == [['' if value is None else str(value) for value in row]
+                         for row in _expected(assigned_to=1)]
+
+
+def test_xlsx_round_trip(requests_db):
+    openpyxl = pytest.importorskip('openpyxl')
+    count, buffer = _exported('xlsx')
+    assert count == 7
+    sheet = openpyxl.load_workbook(buffer).active
+    values = [list(row) for row in sheet.iter_rows(min_row=2, values_only=True)]
+    # Даты Excel читаются как datetime
+    values = [[value.date() if hasattr(value, 'date') else value for value in row] for row in values]
+    assert values == _expected()
+
+
+def test_parquet_round_trip(requests_db):
+    pq = pytest.importorskip('pyarrow.parquet')
+    count, buffer = _exported('parquet', status='Новая заявка')
+    table = pq.read_table(buffer).to_pylist()
+    assert count == len(table) == 7
+    assert [[row[key] for key, _ in export.EXPORT_COLUMNS] for row in table] == \
+        [[value if value is None or isinstance(value, date) else str(value) for value in row]
+         for row in _expected(status='Новая заявка')]
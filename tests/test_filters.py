@@ -0,0 +1,64 @@
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+import database
+from conftest import new_request
+
+TODAY = date.today()
+
+
+@pytest.fixture
+def mixed_requests(db_path):
+    rows = []
+    for n in range(40):
+        row = new_request(n)
+        row['status'] = database.REQUEST_STATUSES[n % len(database.REQUEST_STATUSES)]
+        row['created_at'] = TODAY - timedelta(days=n % 9)
+        rows.append(row)
+    database.insert_requests_bulk(rows)
+    ids = [item['id'] for item in database.get_all_requests()]
+    database.bulk_assign_technician(ids[::3], 1)
+    return db_path
+
+
+def _matches(item, status=None, assigned_to=None, equipment_type=None,
+             date_from=None, date_to=None, customer_name=None):
+    """Отбор в Python, как на странице списка до переноса фильтров в SQL"""
+    statuses = [status] if isinstance(status, str) else status
+    return ((not statuses or item['status'] in statuses)
+            and (not assigned_to or item['assigned_to'] == assigned_to)
+            and (not equipment_type or item['equipment_type'] == equipment_type)
+            and (not date_from or item['created_at'] >= date_from)
+            and (not date_to or item['created_at'] <= date_to)
+            and (not customer_name or item['user_name'] == customer_name))
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'status': 'Новая заявка'},
+    {'status': ['В процессе ремонта', 'Выполнено']},
+    {'assigned_to': 1},
+    {'assigned_to': 1, 'status': ['Новая заявка']},
+    {'equipment_type': 'Кондиционер', 'customer_name': 'Заказчик 2'},
+    {'date_from': TODAY - timedelta(days=3)},
+    {'date_from': TODAY - timedelta(days=6), 'date_to': TODAY - timedelta(days=2)},
+    {'status': 'Выполнено', 'date_to': TODAY - timedelta(days=8)},
+])
+def test_sql_filters_match_python_filtering(mixed_requests, filters):
+    everything = database.get_all_requests('summary')
+    expected = [item['id'] for item in everything if _matches(item, **filters)]
+    assert [item['id'] for item in database.find_requests('summary', **filters)] == expected
+    assert database.count_requests(**filters) == len(expected)
+    assert database.count_requests_by_status(**filters) == \
+        dict(Counter(item['status'] for item in everything if _matches(item, **filters)))
+
+
+def test_iso_string_dates_filter_like_dates(mixed_requests):
+    since = TODAY - timedelta(days=4)
+    assert database.count_requests(date_from=since.isoformat()) == database.count_requests(date_from=since)
+
+
+def test_empty_filters_are_ignored(mixed_requests):
+    assert database.count_requests(status=[], assigned_to=None, equipment_type='', search_term='') == 40
@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+import migrations
+
+
+def test_fresh_database_reaches_latest_version(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'new.db'))
+    try:
+        applied = migrations.migrate(conn)
+        assert [version for version, _ in applied] == [m[0] for m in migrations.MIGRATIONS]
+        assert migrations.get_schema_version(conn) == migrations.LATEST_VERSION
+        assert migrations.migrate(conn) == []
+    finally:
+        conn.close()
+
+
+def test_open_transaction_is_left_to_the_caller(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("INSERT INTO users (username, password_hash, role, full_name) "
+                     "VALUES ('pending', '-', 'Оператор', 'Не зафиксирован')")
+        assert conn.in_transaction
+        with pytest.raises(sqlite3.ProgrammingError):
+            migrations.migrate(conn)
+        # Транзакция не зафиксирована за вызывающий код
+        assert conn.in_transaction
+        conn.rollback()
+        assert conn.execute("SELECT 1 FROM users WHERE username = 'pending'").fetchone() is None
+    finally:
+        conn.close()
+
+
+def test_current_schema_needs_no_write_lock(db_path):
+    writer = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, timeout=0)
+    try:
+        writer.execute('BEGIN IMMEDIATE')
+        assert migrations.migrate(conn) == []
+        assert not conn.in_transaction
+    finally:
+        writer.rollback()
+        writer.close()
+        conn.close()
@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+
+import pytest
+
+import database
+from conftest import new_request
+
+
+@pytest.fixture
+def dated_requests(db_path):
+    today = date.today()
+    rows = []
+    for n in range(45):
+        row = new_request(n)
+        # По несколько заявок на дату: порядок внутри даты задает id
+        row['created_at'] = today - timedelta(days=n // 4)
+        rows.append(row)
+    database.insert_requests_bulk(rows)
+    return db_path
+
+
+def _all_pages(limit, **filters):
+    pages, after = [], None
+    while True:
+        page = database.get_requests_page(after, limit, 'list', **filters)
+        pages.append([item['id'] for item in page['items']])
+        after = page['next_cursor']
+        if after is None:
+            return pages
+
+
+@pytest.mark.parametrize('limit', [1, 4, 7, 45, 100])
+def test_pages_follow_list_order(dated_requests, limit):
+    pages = _all_pages(limit)
+    expected = [item['id'] for item in database.get_all_requests()]
+    assert [request_id for page in pages for request_id in page] == expected
+    assert all(len(page) == limit for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= limit
+
+
+def test_pages_with_filters(dated_requests):
+    pages = _all_pages(5, equipment_type='Вентилятор')
+    expected = [item['id'] for item in database.find_requests('list', equipment_type='Вентилятор')]
+    assert [request_id for page in pages for request_id in page] == expected
+    assert len(expected) == database.count_requests(equipment_type='Вентилятор') == 15
+
+
+def test_new_request_does_not_shift_later_pages(dated_requests):
+    first = database.get_requests_page(None, 10, 'list')
+    before = [item['id'] for item in database.get_all_requests()]
+    # Новая заявка попадает в начало списка; курсор продолжает с того же места
+    database.create_request(new_request(99))
+    rest = database.get_requests_page(first['next_cursor'], 10, 'list')
+    assert [item['id'] for item in rest['items']] == before[10:20]
+
+
+def test_last_page_has_no_cursor(dated_requests):
+    page = database.get_requests_page(None, 45, 'list')
+    assert len(page['items']) == 45
+    assert page['next_cursor'] is None
+    assert database.get_requests_page(None, 10, 'list', status='Выполнено') == \
+        {'items': [], 'next_cursor': None}
@@ -0,0 +1,40 @@
+import os
+import sqlite3
+
+import pytest
+
+import database
+import db_profiler
+from conftest import new_request
+
+
+@pytest.fixture
+def profiler(db_path, monkeypatch):
+    monkeypatch.setattr(db_profiler, 'SLOW_QUERY_LOG', None)
+    db_profiler.reset_stats()
+    yield db_profiler
+    db_profiler.set_enabled(False)
+    db_profiler.reset_stats()
+
+
+def test_plain_connections_while_disabled(profiler):
+    with database.get_db_connection(readonly=True) as conn:
+        assert type(conn) is sqlite3.Connection
+        conn.execute('SELECT 1').fetchone()
+    assert profiler.get_stats() == []
+
+
+def test_enabling_reopens_connections_and_logs_next_to_the_database(profiler, db_path, monkeypatch):
+    monkeypatch.setattr(db_profiler, 'SLOW_QUERY_MS', 0)
+    profiler.set_enabled(True)
+    database.create_request(new_request(0))
+    with database.get_db_connection(readonly=True) as conn:
+        assert isinstance(conn, db_profiler.ProfilingConnection)
+    assert any(item['name'].startswith('create_request:') for item in profiler.get_stats())
+    log = os.path.join(os.path.dirname(db_path), db_profiler.SLOW_QUERY_LOG_NAME)
+    assert profiler.slow_query_log_path() == log
+    assert os.path.getsize(log) > 0
+
+    profiler.set_enabled(False)
+    with database.get_db_connection(readonly=True) as conn:
+        assert type(conn) is sqlite3.Connection
@@ -0,0 +1,47 @@
+import pytest
+
+import database
+from conftest import new_request
+
+
+@pytest.fixture
+def filled_db(db_path):
+    database.insert_requests_bulk([new_request(n) for n in range(12)])
+    ids = [item['id'] for item in database.get_all_requests()]
+    database.bulk_assign_technician(ids[:4], 1)
+    database.bulk_update_status(ids[:2], 'Выполнено', 1)
+    return db_path
+
+
+@pytest.mark.parametrize('projection', ['list', 'summary'])
+def test_projection_keeps_selected_columns(filled_db, projection):
+    columns = set(database.REQUEST_PROJECTIONS[projection]) | {'assigned_name'}
+    full = {item['id']: item for item in database.find_requests('detail')}
+    projected = database.find_requests(projection)
+    assert [item['id'] for item in projected] == list(full)
+    for item in projected:
+        for key in full[item['id']]:
+            expected = full[item['id']][key] if key in columns else None
+            assert item[key] == expected, key
+
+
+@pytest.mark.parametrize('call', [
+    lambda: database.find_requests('full'),
+    lambda: database.get_all_requests('full'),
+    lambda: database.get_requests_page(None, 10, 'full'),
+    lambda: database.search_requests_ranked('Модель', 10, 'full'),
+])
+def test_unknown_projection_is_rejected(filled_db, call):
+    with pytest.raises(ValueError):
+        call()
+
+
+def test_list_page_reads_only_the_covering_index(filled_db):
+    with database.get_db_connection(readonly=True) as conn:
+        plan = ' '.join(row[3] for row in conn.execute(f'''
+        EXPLAIN QUERY PLAN
+        SELECT {database._request_columns('list')} FROM requests r
+        WHERE r.created_at >= ? ORDER BY r.created_at DESC, r.id DESC LIMIT 50
+        ''', ('2024-01-01',)))
+    assert 'COVERING INDEX idx_requests_list' in plan
+    assert 'TEMP B-TREE' not in plan
@@ -0,0 +1,168 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import database
+from conftest import new_request
+
+# Прежний расчет сводки полным проходом по заявкам
+FULL_SCAN_QUERY = '''
+SELECT equipment_type,
+       COUNT(*) as total,
+       SUM(status = 'Выполнено') as completed,
+       SUM(status IN ('В процессе ремонта', 'Готово к выдаче')) as in_progress,
+       SUM(status IN ('Новая заявка', 'В процессе ремонта')
+           AND created_at < date('now', 'localtime', ?)) as problems,
+       TOTAL(CASE WHEN status = 'Выполнено'
+                  THEN julianday(coalesce(completed_at, date('now', 'localtime')))
+                       - julianday(created_at)
+             END) as completion_days_sum
+FROM requests
+GROUP BY equipment_type
+ORDER BY total DESC
+'''
+
+
+def _full_scan_summary(days_overdue):
+    with database.get_db_connection(readonly=True) as conn:
+        rows = conn.execute(FULL_SCAN_QUERY, (f'-{days_overdue} days',)).fetchall()
+    completed = sum(row['completed'] for row in rows)
+    return {
+        'total': sum(row['total'] for row in rows),
+        'completed': completed,
+        'in_progress': sum(row['in_progress'] for row in rows),
+        'overdue': sum(row['problems'] for row in rows),
+        'avg_completion_days': (sum(row['completion_days_sum'] for row in rows) / completed
+                                if completed else None),
+        'equipment_stats': {
+            row['equipment_type']: {'total': row['total'], 'problems': row['problems']}
+            for row in rows
+        }
+    }
+
+
+@pytest.fixture
+def seeded_db(db_path):
+    today = date.today()
+    rows = []
+    for n in range(120):
+        row = new_request(n)
+        row['status'] = database.REQUEST_STATUSES[n % 4]
+        row['created_at'] = today - timedelta(days=n % 11)
+        if row['status'] != 'Новая заявка':
+            row['assigned_at'] = row['created_at'] + timedelta(days=1)
+        # Часть выполненных заявок - без даты завершения (данные до учета completed_at)
+        if row['status'] == 'Выполнено' and n % 3:
+            row['completed_at'] = row['created_at'] + timedelta(days=n % 5)
+        rows.append(row)
+    database.insert_requests_bulk(rows)
+    request_id = database.create_request(new_request(200))
+    database.update_request_status(request_id, 'Выполнено', 1)
+    return db_path
+
+
+def _assert_same(actual, expected):
+    assert actual.pop('avg_completion_days') == pytest.approx(expected.pop('avg_completion_days'))
+    assert actual == expected
+
+
+@pytest.mark.parametrize('days_overdue', [0, 3, 7])
+def test_quality_summary_matches_full_scan(seeded_db, days_overdue):
+    _assert_same(database.get_quality_summary(days_overdue), _full_scan_summary(days_overdue))
+
+
+def test_quality_summary_without_migration_8_indexes(seeded_db):
+    with database.get_db_connection() as conn:
+        conn.execute('DROP INDEX idx_requests_completed_undated')
+        conn.commit()
+    _assert_same(database.get_quality_summary(3), _full_scan_summary(3))
+
+
+def _original_python_summary(all_requests, days_overdue):
+    """
+    Расчет show_quality_analytics до переноса в SQL: проход по всем заявкам в Python.
+    Единственное отличие - completed_at=None: r.get(key, default) не подставлял
+    сегодняшнюю дату для None, и исходный код падал на таких заявках.
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    total = len(all_requests)
+    completed = sum(1 for r in all_requests if r['status'] == 'Выполнено')
+    in_progress = sum(1 for r in all_requests if r['status'] in ['В процессе ремонта', 'Готово к выдаче'])
+    overdue = sum(1 for r in all_requests if r['status'] in ['Новая заявка', 'В процессе ремонта']
+                  and (datetime.now() - datetime.strptime(r['created_at'], '%Y-%m-%d')).days > days_overdue)
+    equipment_stats = {}
+    for req in all_requests:
+        eq_type = req['equipment_type']
+        if eq_type not in equipment_stats:
+            equipment_stats[eq_type] = {'total': 0, 'problems': 0}
+        equipment_stats[eq_type]['total'] += 1
+        if req['status'] in ['Новая заявка', 'В процессе ремонта']:
+            days_old = (datetime.now() - datetime.strptime(req['created_at'], '%Y-%m-%d')).days
+            if days_old > days_overdue:
+                equipment_stats[eq_type]['problems'] += 1
+    completed_requests = [r for r in all_requests if r['status'] == 'Выполнено']
+    avg_completion_days = None
+    if completed_requests:
+        avg_completion_days = sum(
+            (datetime.strptime(r.get('completed_at') or today, '%Y-%m-%d') -
+             datetime.strptime(r['created_at'], '%Y-%m-%d')).days
+            for r in completed_requests
+        ) / len(completed_requests)
+    return {
+        'total': total,
+        'completed': completed,
+        'in_progress': in_progress,
+        'overdue': overdue,
+        'avg_completion_days': avg_completion_days,
+        'equipment_stats': equipment_stats,
+    }
+
+
+# (тип, статус, дней с создания, дней с завершения или None)
+FIXED_DATASET = [
+    ('Кондиционер', 'Новая заявка', 5, None),
+    ('Кондиционер', 'В процессе ремонта', 2, None),
+    ('Кондиционер', 'Выполнено', 10, 4),
+    ('Вентилятор', 'Готово к выдаче', 8, None),
+    ('Вентилятор', 'Новая заявка', 4, None),
+    ('Вентилятор', 'Выполнено', 3, 3),
+    ('Сплит-система', 'В процессе ремонта', 7, None),
+    ('Сплит-система', 'Выполнено', 6, None),
+    ('Сплит-система', 'Новая заявка', 3, None),
+]
+
+
+@pytest.fixture
+def fixed_db(db_path):
+    today = date.today()
+    rows = []
+    for n, (equipment_type, status, age, completed_ago) in enumerate(FIXED_DATASET):
+        row = new_request(n)
+        row.update(equipment_type=equipment_type, status=status, created_at=today - timedelta(days=age))
+        if completed_ago is not None:
+            row['completed_at'] = today - timedelta(days=completed_ago)
+        rows.append(row)
+    database.insert_requests_bulk(rows)
+    return db_path
+
+
+def _as_original_rows():
+    """Заявки в виде, в котором их получал исходный код: dict со строковыми датами"""
+    return [{key: value.isoformat() if isinstance(value, date) else value for key, value in item.items()}
+            for item in database.get_all_requests('summary')]
+
+
+@pytest.mark.parametrize('days_overdue, expected', [
+    (3, {'total': 9, 'completed': 3, 'in_progress': 3, 'overdue': 3, 'avg_completion_days': 4.0,
+         'equipment_stats': {'Кондиционер': {'total': 3, 'problems': 1},
+                             'Вентилятор': {'total': 3, 'problems': 1},
+                             'Сплит-система': {'total': 3, 'problems': 1}}}),
+    (0, {'total': 9, 'completed': 3, 'in_progress': 3, 'overdue': 5, 'avg_completion_days': 4.0,
+         'equipment_stats': {'Кондиционер': {'total': 3, 'problems': 2},
+                             'Вентилятор': {'total': 3, 'problems': 1},
+                             'Сплит-система': {'total': 3, 'problems': 2}}}),
+])
+def test_fixed_dataset_matches_original_python(fixed_db, days_overdue, expected):
+    original = _original_python_summary(_as_original_rows(), days_overdue)
+    assert original == expected
+    _assert_same(database.get_quality_summary(days_overdue), dict(expected))
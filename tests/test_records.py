@@ -0,0 +1,77 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+
+import database
+import records
+from conftest import new_request
+
+
+@pytest.fixture
+def request_id(db_path):
+    request_id = database.create_request(new_request(0))
+    database.assign_technician(request_id, 1)
+    database.add_comment(request_id, 1, 'Заказана плата', True, 'Плата BX-5')
+    database.add_comment(request_id, 1, 'Позвонить заказчику')
+    return request_id
+
+
+def _raw_row(sql, params):
+    """Строка как dict(row) - так страницы получали данные до записей"""
+    with database.get_db_connection(readonly=True) as conn:
+        return dict(conn.execute(sql, params).fetchone())
+
+
+def test_request_reads_like_the_old_dict(request_id):
+    item = database.get_request_by_id(request_id)
+    raw = _raw_row('SELECT r.*, u.full_name as assigned_name FROM requests r '
+                   'LEFT JOIN users u ON r.assigned_to = u.id WHERE r.id = ?', (request_id,))
+    assert isinstance(item, records.Request)
+    assert dict(item) == raw
+    assert item.to_dict() == raw
+    assert item.status == item['status'] == item.get('status') == 'Новая заявка'
+    assert isinstance(item.created_at, date) and item.assigned_name == 'Инженер Петров'
+    assert 'assigned_name' in item and 'password_hash' not in item
+    assert item.get('days_overdue', 'нет') == 'нет'
+    with pytest.raises(KeyError):
+        item['days_overdue']
+    with pytest.raises(AttributeError):
+        item.unknown = 1
+
+
+def test_comment_flags_are_bool(request_id):
+    technical, plain = database.get_comments(request_id)
+    assert technical.is_technical_note is True and plain.is_technical_note is False
+    assert (technical.full_name, technical.role, technical.parts_ordered) == \
+        ('Инженер Петров', 'Специалист', 'Плата BX-5')
+
+
+def test_extra_columns_and_projection(request_id):
+    with database.get_db_connection() as conn:
+        conn.execute('UPDATE requests SET created_at = ? WHERE id = ?',
+                     (date.today() - timedelta(days=10), request_id))
+        conn.commit()
+    [problem] = database.get_problem_requests(days_overdue=3)
+    assert problem['problem_type'] == 'Просроченная' and problem['days_overdue'] == 7
+    assert set(problem.extra) <= set(problem) and len(problem) == len(list(problem))
+
+    [listed] = database.get_all_requests('list')
+    # Не выбранные столбцы равны None, ключи те же, что у полной записи
+    assert listed['problem_description'] is None
+    assert list(listed) == list(database.get_request_by_id(request_id))
+
+
+def test_records_serialize_to_json(request_id):
+    item = database.get_request_by_id(request_id)
+    data = json.loads(json.dumps(item.to_dict(), default=str))
+    assert data['request_number'] == item.request_number
+
+
+def test_record_maker_matches_columns_by_name():
+    make = records.record_maker(records.User, ['full_name', 'id', 'lunch'])
+    user = make(('Инженер Петров', 7, 'суп'))
+    assert (user.id, user.full_name, user.role, user['lunch']) == (7, 'Инженер Петров', None, 'суп')
+    fast = records.record_maker(records.User, ['id', 'username'])
+    assert dict(fast((1, 'tech'))) == {'id': 1, 'username': 'tech', 'role': None, 'full_name': None,
+                                 'phone': None, 'created_at': None}
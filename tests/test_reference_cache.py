@@ -0,0 +1,68 @@
+import pytest
+
+import database
+
+
+def _technician_names():
+    return [item['full_name'] for item in database.get_technicians()]
+
+
+def _stats():
+    stats = database.get_reference_cache_stats()
+    return stats['hits'], stats['misses']
+
+
+def _execute(sql, params=()):
+    with database.get_db_connection() as conn:
+        conn.execute(sql, params)
+        conn.commit()
+
+
+def test_repeated_reads_hit_the_cache(db_path):
+    hits, misses = _stats()
+    assert _technician_names() == ['Инженер Петров']
+    assert database.get_technician_by_id(1)['phone'] == '+79992222222'
+    assert database.get_technician_by_id(99) is None
+    assert _stats() == (hits + 2, misses + 1)
+    # Возвращается копия списка: изменения у вызывающего кода не попадают в кэш
+    database.get_technicians().clear()
+    assert _technician_names() == ['Инженер Петров']
+
+
+def test_user_writes_invalidate_the_cache(db_path):
+    assert _technician_names() == ['Инженер Петров']
+    assert database.create_user_db({'username': 'tech2', 'password': 'pw', 'role': 'Специалист',
+                                    'full_name': 'Инженер Иванов'})
+    assert _technician_names() == ['Инженер Иванов', 'Инженер Петров']
+    new_id = next(u['id'] for u in database.get_all_users() if u['username'] == 'tech2')
+
+    assert database.update_user_db(new_id, {'role': 'Менеджер', 'full_name': 'Менеджер Иванова'})
+    assert _technician_names() == ['Инженер Петров']
+    assert database.get_user_by_id(new_id)['role'] == 'Менеджер'
+
+    assert database.delete_user_db(new_id)
+    assert database.get_user_by_id(new_id) is None
+
+
+def test_writes_outside_database_py_show_after_ttl(db_path, monkeypatch):
+    assert _technician_names() == ['Инженер Петров']
+    _execute("UPDATE users SET full_name = 'Инженер Петров-Водкин' WHERE id = 1")
+    assert _technician_names() == ['Инженер Петров']
+    # Чтение мимо кэша видит изменение сразу
+    assert database.get_user_by_id(1, cached=False)['full_name'] == 'Инженер Петров-Водкин'
+    monkeypatch.setattr(database, 'REFERENCE_CACHE_TTL', 0)
+    assert _technician_names() == ['Инженер Петров-Водкин']
+
+
+@pytest.mark.parametrize('name', ['users', 'technicians'])
+def test_invalidation_during_load_is_not_cached(db_path, name):
+    stale = []
+
+    def loader():
+        stale.append(True)
+        # Сброс кэша, пока значение еще загружается (запись в другом потоке)
+        database.invalidate_reference_cache()
+        return 'stale'
+
+    assert database._cached_reference(name, loader) == 'stale'
+    assert name not in database.get_reference_cache_stats()['entries']
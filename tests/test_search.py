@@ -0,0 +1,37 @@
+import pytest
+
+import database
+from conftest import new_request
+
+
+@pytest.fixture
+def many_requests(db_path):
+    database.insert_requests_bulk([new_request(n) for n in range(130)])
+    return db_path
+
+
+@pytest.mark.parametrize('term', ['Кондиционер', 'Заказчик 1', '-0'])
+def test_search_pages_reach_every_match(many_requests, term):
+    seen = []
+    after = None
+    while True:
+        page = database.search_requests_page(term, after=after, limit=20, projection='list')
+        seen.extend(item['id'] for item in page['items'])
+        after = page['next_cursor']
+        if after is None:
+            break
+    total = database.count_requests(search_term=term)
+    assert total > 20
+    assert len(seen) == len(set(seen)) == total
+
+
+def test_short_term_pages_follow_list_order(many_requests):
+    expected = [item['id'] for item in database.find_requests(search_term='-0', projection='list')]
+    pages = [database.search_requests_ranked('-0', 25, 'list', offset) for offset in range(0, 150, 25)]
+    assert [item['id'] for page in pages for item in page] == expected
+
+
+@pytest.mark.parametrize('term', ['%', '_1'])
+def test_short_term_wildcards_are_literal(many_requests, term):
+    assert database.search_requests_ranked(term) == []
+    assert database.count_requests(search_term=term) == 0
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import database
+import migrations
+from conftest import new_request
+
+
+@pytest.fixture
+def snapshots(db_path, monkeypatch):
+    """Снимки включены, состояние снимка - как при запуске процесса"""
+    monkeypatch.setattr(database, 'ANALYTICS_SNAPSHOT_MAX_AGE', 3600)
+    monkeypatch.setattr(database, '_snapshot_state',
+                        {'generation': 0, 'taken_at': None, 'refreshing': False, 'error': None})
+    for n in range(5):
+        database.create_request(new_request(n))
+    return database._snapshot_path()
+
+
+def _snapshot_requests():
+    with database.analytics_snapshot() as taken_at:
+        assert taken_at is not None
+        with database.get_db_connection(readonly=True) as conn:
+            return conn.execute('SELECT COUNT(*) FROM requests').fetchone()[0]
+
+
+def test_concurrent_first_refresh(snapshots):
+    barrier = threading.Barrier(8)
+    results, errors = [], []
+
+    def read():
+        barrier.wait()
+        try:
+            results.append(_snapshot_requests())
+        except Exception as e:
+            errors.append(e)
+        finally:
+            database.close_connections()
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert results == [5] * 8
+    # Первый снимок снят один раз, временных файлов не осталось
+    assert database._snapshot_state['generation'] == 1
+    directory = os.path.dirname(snapshots)
+    assert [name for name in os.listdir(directory) if name.endswith('.tmp')] == []
+
+
+def test_leftover_snapshot_with_old_schema_is_replaced(snapshots):
+    conn = sqlite3.connect(snapshots)
+    conn.execute('CREATE TABLE schema_version (version INTEGER PRIMARY KEY, applied_at TEXT)')
+    conn.execute("INSERT INTO schema_version VALUES (1, datetime('now'))")
+    conn.execute('CREATE TABLE requests (id INTEGER PRIMARY KEY)')
+    conn.commit()
+    conn.close()
+
+    assert _snapshot_requests() == 5
+    assert database._snapshot_state['generation'] == 1
+    assert database._snapshot_schema_version(snapshots) == migrations.LATEST_VERSION
+
+
+def test_leftover_snapshot_with_current_schema_is_reused(snapshots):
+    database.refresh_analytics_snapshot()
+    database._snapshot_state.update(generation=0, taken_at=None)
+    database.create_request(new_request(5))
+
+    # Свежий снимок прошлого запуска читается без повторного копирования
+    assert _snapshot_requests() == 5
+    assert database._snapshot_state['generation'] == 0
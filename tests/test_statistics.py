@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+import pytest
+
+import database
+from conftest import new_request
+
+
+def _full_scan_statistics():
+    """Исходный расчет get_statistics полным проходом по requests (статус выполнения - 'Выполнено')"""
+    with database.get_db_connection(readonly=True) as conn:
+        total = conn.execute('SELECT COUNT(*) FROM requests').fetchone()[0]
+        completed = conn.execute("SELECT COUNT(*) FROM requests WHERE status = 'Выполнено'").fetchone()[0]
+        avg_days = conn.execute('''
+        SELECT AVG(julianday(completed_at) - julianday(created_at))
+        FROM requests
+        WHERE status = 'Выполнено' AND completed_at IS NOT NULL AND created_at IS NOT NULL
+        ''').fetchone()[0]
+        equipment = conn.execute('SELECT equipment_type, COUNT(*) FROM requests GROUP BY equipment_type')
+        return {
+            'total_requests': total,
+            'completed_requests': completed,
+            'avg_completion_days': round(avg_days, 2) if avg_days else 0,
+            'equipment_stats': dict(equipment.fetchall()),
+        }
+
+
+def _rollup_statistics():
+    stats = database.get_statistics()
+    counts = [item['count'] for item in stats['equipment_stats']]
+    assert counts == sorted(counts, reverse=True)
+    stats['equipment_stats'] = {item['equipment_type']: item['count'] for item in stats['equipment_stats']}
+    return stats
+
+
+@pytest.fixture
+def stats_db(db_path):
+    today = date.today()
+    rows = []
+    for n in range(30):
+        row = new_request(n)
+        row['status'] = database.REQUEST_STATUSES[n % 4]
+        row['created_at'] = today - timedelta(days=n % 7 + 3)
+        if row['status'] == 'Выполнено' and n % 2:
+            row['completed_at'] = row['created_at'] + timedelta(days=n % 3)
+        rows.append(row)
+    database.insert_requests_bulk(rows)
+    return db_path
+
+
+def _execute(sql, params=()):
+    with database.get_db_connection() as conn:
+        conn.execute(sql, params)
+        conn.commit()
+
+
+def test_rollup_follows_every_kind_of_change(stats_db):
+    assert _rollup_statistics() == _full_scan_statistics()
+    ids = [item['id'] for item in database.get_all_requests()]
+
+    steps = [
+        lambda: database.create_request(new_request(40)),
+        lambda: database.update_request_status(ids[0], 'Выполнено', 1),
+        lambda: database.update_request_status(ids[0], 'В процессе ремонта', 1),
+        lambda: database.bulk_update_status(ids[5:15], 'Выполнено', 1),
+        lambda: _execute("UPDATE requests SET equipment_type = 'Холодильник' WHERE id = ?", (ids[2],)),
+        lambda: _execute('UPDATE requests SET created_at = ? WHERE id = ?',
+                         (date.today() - timedelta(days=20), ids[6])),
+        lambda: _execute('DELETE FROM requests WHERE id IN (?, ?)', (ids[7], ids[3])),
+    ]
+    for step in steps:
+        step()
+        assert _rollup_statistics() == _full_scan_statistics()
+    assert database.check_statistics() == []
+
+
+def test_empty_database(db_path):
+    assert database.get_statistics() == {'total_requests': 0, 'completed_requests': 0,
+                                         'avg_completion_days': 0, 'equipment_stats': []}
+
+
+def test_rebuild_repairs_drift(stats_db):
+    _execute("UPDATE request_stats SET total = total + 5 WHERE equipment_type = 'Вентилятор'")
+    drift = database.check_statistics()
+    assert [(item['equipment_type'], item['column']) for item in drift] == [('Вентилятор', 'total')]
+    assert database.rebuild_statistics()
+    assert database.check_statistics() == []
+    assert _rollup_statistics() == _full_scan_statistics()
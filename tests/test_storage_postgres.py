@@ -0,0 +1,211 @@
+"""
+Бэкенд PostgreSQL на реальном сервере: те же ответы, что у SQLite, на одних данных.
+Запускается, если задан SC_POSTGRES_URL (postgresql+psycopg://...) и установлены
+SQLAlchemy и psycopg; таблицы создаются в отдельной схеме и удаляются после тестов.
+"""
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+
+POSTGRES_URL = os.environ.get('SC_POSTGRES_URL')
+if not POSTGRES_URL:
+    pytest.skip('SC_POSTGRES_URL не задан', allow_module_level=True)
+pytest.importorskip('psycopg')
+sqlalchemy = pytest.importorskip('sqlalchemy')
+
+import database  # noqa: E402
+import storage  # noqa: E402
+from conftest import new_request  # noqa: E402
+
+SCHEMA = 'sc_storage_test'
+
+
+@pytest.fixture
+def pg_url():
+    engine = sqlalchemy.create_engine(POSTGRES_URL)
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE'))
+        conn.execute(sqlalchemy.text(f'CREATE SCHEMA {SCHEMA}'))
+    url = sqlalchemy.engine.make_url(POSTGRES_URL).update_query_dict(
+        {'options': f'-csearch_path={SCHEMA}'})
+    yield url.render_as_string(hide_password=False)
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE'))
+    engine.dispose()
+
+
+@pytest.fixture
+def stores(db_path, pg_url):
+    """Одинаковые данные в SQLite и PostgreSQL (перенос copy_sqlite_to_postgres)"""
+    for username, role, full_name in [('tech2', 'Специалист', 'Инженер Иванов'),
+                                      ('manager', 'Менеджер', 'Менеджер Сидорова')]:
+        database.create_user_db({'username': username, 'password': 'secret', 'role': role,
+                                 'full_name': full_name, 'phone': '+79990000001'})
+    today = date.today()
+    rows = []
+    for n in range(60):
+        row = new_request(n)
+        row['status'] = database.REQUEST_STATUSES[n % 4]
+        row['created_at'] = today - timedelta(days=n % 13)
+        if row['status'] != 'Новая заявка':
+            row['assigned_at'] = row['created_at'] + timedelta(days=1)
+        if row['status'] == 'Выполнено' and n % 3:
+            row['completed_at'] = row['created_at'] + timedelta(days=n % 5)
+        rows.append(row)
+    rows[7]['user_name'] = 'Заказчик 50% скидка_'
+    database.insert_requests_bulk(rows)
+    ids = [item['id'] for item in database.find_requests(projection='list')]
+    database.bulk_assign_technician(ids[::2], 1)
+    database.bulk_assign_technician(ids[1::3], 2)
+    for request_id in ids[:10]:
+        database.update_request_status(request_id, 'В процессе ремонта', 3)
+    database.add_comment(ids[3], 1, 'Сложный случай, нужен второй специалист', True, 'Плата BX-5')
+    database.add_comment(ids[4], 3, 'Позвонить заказчику')
+    database.reset_connections()
+
+    storage.copy_sqlite_to_postgres(db_path, pg_url)
+    postgres = storage.PostgresStorage(pg_url)
+    yield storage.SQLiteStorage(), postgres, ids
+    postgres.engine.dispose()
+
+
+def _plain(value):
+    """Записи и вложенные структуры в сравнимом виде (0/1 SQLite и bool PostgreSQL совпадают)"""
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    if hasattr(value, 'items'):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+
+def _ids(items):
+    return [item['id'] for item in items]
+
+
+def test_reads_match_sqlite(stores):
+    sqlite, postgres, ids = stores
+    for name, args, kwargs in [
+        ('get_statistics', (), {}),
+        ('get_quality_summary', (), {'days_overdue': 3}),
+        ('get_quality_summary', (), {'days_overdue': 0}),
+        ('get_problem_requests', (), {}),
+        ('get_problem_requests', (), {'problem_type': 'Длительное ожидание', 'waiting_days': 2}),
+        ('get_requests_needing_help', (), {}),
+        ('find_requests', (), {'status': ['Новая заявка', 'Выполнено'], 'assigned_to': 1}),
+        ('find_requests', (), {'projection': 'list', 'equipment_type': 'Вентилятор'}),
+        ('count_requests', (), {'status': 'В процессе ремонта'}),
+        ('count_requests_by_status', (), {'customer_name': 'Заказчик 1'}),
+        ('get_technician_tasks', (1,), {}),
+        ('count_active_assignments', (2,), {}),
+        ('get_request_by_id', (ids[3],), {}),
+        ('get_comments', (ids[3],), {}),
+        ('get_status_history', (ids[0],), {}),
+        ('get_all_users', (), {}),
+        ('get_technicians', (), {}),
+        ('get_technician_by_id', (2,), {}),
+    ]:
+        assert _plain(getattr(postgres, name)(*args, **kwargs)) == \
+            _plain(getattr(sqlite, name)(*args, **kwargs)), name
+
+
+def test_pages_match_sqlite(stores):
+    sqlite, postgres, _ = stores
+    seen = {}
+    for store in (sqlite, postgres):
+        seen[store.name], after = [], None
+        while True:
+            page = store.get_requests_page(after, 7, 'list', status=['Новая заявка', 'Выполнено'])
+            seen[store.name].extend(_ids(page['items']))
+            after = page['next_cursor']
+            if after is None:
+                break
+    assert seen['postgresql'] == seen['sqlite']
+    assert len(seen['sqlite']) == sqlite.count_requests(status=['Новая заявка', 'Выполнено'])
+
+
+@pytest.mark.parametrize('term', ['Вентилятор', 'Плата', 'второй специалист'])
+def test_search_finds_the_same_requests(stores, term):
+    sqlite, postgres, _ = stores
+    expected = {item['id'] for item in sqlite.find_requests(search_term=term)}
+    assert expected
+    assert set(_ids(postgres.search_requests_ranked(term, 100))) == expected
+
+
+def test_search_pages_with_offset(stores):
+    _, postgres, _ = stores
+    everything = _ids(postgres.search_requests_ranked('Модель', 100, 'list'))
+    assert len(everything) == 60
+    assert _ids(postgres.search_requests_ranked('Модель', 10, 'list', 20)) == everything[20:30]
+    seen, after = [], None
+    while True:
+        page = postgres.search_requests_page('Модель', after, 25, 'list', status='Выполнено')
+        seen.extend(_ids(page['items']))
+        after = page['next_cursor']
+        if after is None:
+            break
+    assert len(seen) == postgres.count_requests(status='Выполнено')
+
+
+@pytest.mark.parametrize('term, expected', [('%', 1), ('_', 1), ('50%', 1), ('0%', 1), ('с_идка', 0)])
+def test_search_wildcards_are_literal(stores, term, expected):
+    _, postgres, _ = stores
+    assert len(postgres.search_requests_ranked(term, 100)) == expected
+    assert postgres.count_requests(search_term=term) == expected
+
+
+def test_writes(stores):
+    _, postgres, ids = stores
+    request_id = postgres.create_request(new_request(99))
+    number = postgres.get_request_by_id(request_id)['request_number']
+    assert number == database._format_request_number(datetime.now().year, 61)
+
+    assert postgres.bulk_update_status(ids[:5] + [request_id], 'Готово к выдаче', 1) == 6
+    assert postgres.bulk_update_status(ids[:5], 'Готово к выдаче', 1) == 0
+    assert postgres.bulk_update_status(ids[:5], 'Нет такого', 1) is None
+    assert postgres.get_status_history(request_id)[0]['old_status'] == 'Новая заявка'
+    assert postgres.bulk_assign_technician([request_id], 2) == 1
+    assert postgres.count_active_assignments(2) == len(postgres.get_technician_tasks(2))
+
+    assert postgres.update_request_status(request_id, 'Выполнено', 1)
+    assert postgres.get_request_by_id(request_id)['completed_at'] == date.today()
+    assert not postgres.update_request_status(10 ** 6, 'Выполнено', 1)
+    assert postgres.add_comment(request_id, 1, 'Готово', True)
+    assert postgres.get_comments(request_id)[-1]['is_technical_note'] is True
+
+    user = {'username': 'operator', 'password': 'pw', 'role': 'Оператор', 'full_name': 'Оператор Л'}
+    assert postgres.create_user_db(user)
+    assert not postgres.create_user_db(user)
+    operator = postgres.verify_login('operator', 'pw')
+    assert operator['role'] == 'Оператор'
+    assert postgres.verify_login('operator', 'wrong') is None
+    assert postgres.update_user_db(operator['id'], {'role': 'Менеджер', 'full_name': 'Оператор Л',
+                                                    'password': 'new'})
+    assert postgres.verify_login('operator', 'new')['role'] == 'Менеджер'
+
+    active = postgres.count_active_assignments(2)
+    assert postgres.delete_user_db(2, reassign_to=1)
+    assert postgres.get_user_by_id(2) is None
+    assert postgres.count_active_assignments(2) == 0
+    assert active > 0
+
+
+def test_missing_sequence_year_continues_numbering(stores):
+    from sqlalchemy import text
+
+    _, postgres, _ = stores
+    with postgres.engine.begin() as conn:
+        conn.execute(text('DELETE FROM request_sequences'))
+    request_id = postgres.create_request(new_request(1))
+    assert postgres.get_request_by_id(request_id)['request_number'].endswith('-0061')
+
+
+def test_analytics_snapshot_reads_live_data(stores):
+    _, postgres, _ = stores
+    with postgres.analytics_snapshot() as data_as_of:
+        assert data_as_of is None
+        assert postgres.get_statistics()['total_requests'] == 60
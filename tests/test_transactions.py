@@ -0,0 +1,36 @@
+import sqlite3
+
+import pytest
+
+import database
+from conftest import new_request
+
+
+def _count_requests():
+    with database.get_db_connection(readonly=True) as conn:
+        return conn.execute('SELECT COUNT(*) FROM requests').fetchone()[0]
+
+
+def test_begin_immediate_refuses_open_transaction(db_path):
+    with database.get_db_connection() as conn:
+        conn.execute("UPDATE users SET phone = '+70000000000' WHERE id = 1")
+        assert conn.in_transaction
+        with pytest.raises(sqlite3.ProgrammingError):
+            database._begin_immediate(conn)
+        # Изменения вызывающего не зафиксированы
+        assert conn.in_transaction
+        conn.rollback()
+
+    assert database.get_user_by_id(1)['phone'] == '+79992222222'
+
+
+def test_nested_write_does_not_commit_outer_transaction(db_path):
+    with database.get_db_connection() as conn:
+        database._insert_request_tx(conn.cursor(), new_request(), 'REQ-2000-0001')
+        assert database.create_request(new_request(1)) is None
+        assert conn.in_transaction
+    # Внешний блок завершился без commit: не сохранилась ни одна заявка
+    assert _count_requests() == 0
+
+    assert database.create_request(new_request(2)) is not None
+    assert _count_requests() == 1
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+import database
+import write_queue
+from conftest import new_request
+
+
+@pytest.fixture
+def queue_db(db_path):
+    yield db_path
+    write_queue.stop_write_queue(timeout=5)
+
+
+def _count_requests():
+    with database.get_db_connection(readonly=True) as conn:
+        return conn.execute('SELECT COUNT(*) FROM requests').fetchone()[0]
+
+
+def test_timeout_cancels_pending_operation(queue_db, monkeypatch):
+    monkeypatch.setattr(write_queue, 'WRITE_RESULT_TIMEOUT', 0.05)
+    writer = write_queue.WriteQueue()
+    future = writer.submit(database._create_request_tx, new_request())
+
+    # Поток-писатель еще не запущен: операция не начата и снимается с очереди
+    assert write_queue._wait(future, 'создании заявки') == (False, None)
+    writer.start()
+    writer.stop(timeout=5)
+
+    assert future.cancelled()
+    assert _count_requests() == 0
+    metrics = writer.get_metrics()
+    assert metrics['operations'] == 0
+    assert metrics['batches'] == 0
+    assert metrics['cancelled'] == 1
+
+
+def test_timeout_waits_for_running_operation(queue_db, monkeypatch):
+    monkeypatch.setattr(write_queue, 'WRITE_RESULT_TIMEOUT', 0.05)
+    started = threading.Event()
+
+    def slow_create(cursor, request_data):
+        started.set()
+        time.sleep(0.3)
+        return database._create_request_tx(cursor, request_data)
+
+    writer = write_queue.WriteQueue()
+    writer.start()
+    try:
+        future = writer.submit(slow_create, new_request())
+        ok, request_id = write_queue._wait(future, 'создании заявки')
+    finally:
+        writer.stop(timeout=5)
+
+    # Операция зафиксирована - ответ совпадает с базой
+    assert started.is_set()
+    assert ok and request_id is not None
+    assert _count_requests() == 1
+    assert writer.get_metrics()['operations'] == 1
+
+
+@pytest.mark.parametrize('policy, expected', [('gapless', '-0001'), ('allow_gaps', '-0002')])
+def test_queued_create_follows_gap_policy(queue_db, monkeypatch, policy, expected):
+    monkeypatch.setattr(database, 'REQUEST_NUMBER_GAP_POLICY', policy)
+    broken = new_request()
+    del broken['user_phone']
+
+    assert write_queue.create_request(broken) is None
+    request_id = write_queue.create_request(new_request())
+
+    assert database.get_request_by_id(request_id)['request_number'].endswith(expected)
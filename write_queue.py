@@ -0,0 +1,324 @@
+"""
+Очередь записи с групповой фиксацией (group commit)
+
+Один поток-писатель принимает операции записи от всех сессий и выполняет их
+короткими транзакциями по нескольку штук: одна фиксация (fsync) на пакет вместо
+одной на операцию, и писатели не сталкиваются с "database is locked".
+Каждая операция выполняется в своей точке сохранения (SAVEPOINT): ошибка
+одной операции откатывает только ее, остальные операции пакета фиксируются.
+Операции - те же функции *_tx из database.py, что и у синхронных функций.
+
+    import write_queue
+    request_id = write_queue.create_request(request_data)
+    write_queue.update_request_status(request_id, 'В процессе ремонта', user_id)
+    future = write_queue.submit(database._add_comment_tx, request_id, user_id, 'Текст')
+
+Настройки окружения:
+    SC_WRITE_QUEUE          - 1: приложение пишет заявки, статусы и комментарии через очередь
+    SC_WRITE_BATCH_SIZE     - максимум операций в транзакции (по умолчанию 64)
+    SC_WRITE_BATCH_WAIT_MS  - сколько ждать добора пакета после первой операции (по умолчанию 2)
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import database
+
+WRITE_QUEUE_ENABLED = os.environ.get('SC_WRITE_QUEUE', '').lower() in ('1', 'true', 'yes', 'on')
+WRITE_BATCH_SIZE = int(os.environ.get('SC_WRITE_BATCH_SIZE', 64))
+WRITE_BATCH_WAIT_MS = float(os.environ.get('SC_WRITE_BATCH_WAIT_MS', 2))
+WRITE_QUEUE_MAX_SIZE = 10000
+# Сколько ждать результата операции в синхронных обертках, секунд
+WRITE_RESULT_TIMEOUT = 30
+
+# Верхние границы интервалов гистограммы размеров пакетов
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, float('inf')]
+
+
+class WriteQueue(threading.Thread):
+    """
+    Поток-писатель: собирает операции в пакеты и фиксирует каждый пакет одной транзакцией
+
+    Args:
+        max_batch: Максимум операций в транзакции
+        max_wait_ms: Сколько ждать добора пакета после первой операции
+        max_size: Максимальная длина очереди (submit блокируется при переполнении)
+    """
+
+    def __init__(self, max_batch=WRITE_BATCH_SIZE, max_wait_ms=WRITE_BATCH_WAIT_MS,
+                 max_size=WRITE_QUEUE_MAX_SIZE):
+        super().__init__(name='write-queue', daemon=True)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue(max_size)
+        self.stop_event = threading.Event()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'operations': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'max_batch': 0,
+            'max_queue_depth': 0,
+            'commit_ms': 0.0,
+            'wait_ms': 0.0,
+            'histogram': [0] * len(BATCH_SIZE_BUCKETS),
+        }
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Постановка операции в очередь
+
+        Args:
+            func: Функция (cursor, *args, **kwargs), выполняемая внутри транзакции
+                  (database._create_request_tx, database._add_comment_tx и т.п.)
+
+        Returns:
+            concurrent.futures.Future: Результат func после фиксации пакета
+        """
+        if self.stop_event.is_set():
+            raise RuntimeError("Очередь записи остановлена")
+        future = Future()
+        self.queue.put((func, args, kwargs, future, time.perf_counter()))
+        depth = self.queue.qsize()
+        if depth > self._metrics['max_queue_depth']:
+            with self._metrics_lock:
+                self._metrics['max_queue_depth'] = max(self._metrics['max_queue_depth'], depth)
+        return future
+
+    def stop(self, timeout=None):
+        """Остановка после выполнения уже поставленных операций"""
+        self.stop_event.set()
+        self.queue.put(None)
+        self.join(timeout)
+
+    def _collect(self):
+        """Пакет операций: первая ждется без ограничения, остальные - до max_wait"""
+        first = self.queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            self._execute(batch)
+        database.close_connections()
+
+    def _execute(self, batch):
+        started = time.perf_counter()
+        results = []
+        failed = 0
+        cancelled = 0
+        try:
+            with database.get_db_connection() as conn:
+                cursor = conn.cursor()
+                database._begin_immediate(conn)
+                for func, args, kwargs, future, _ in batch:
+                    if not future.set_running_or_notify_cancel():
+                        # Отменена по таймауту ожидания до начала выполнения
+                        results.append(None)
+                        cancelled += 1
+                        continue
+                    cursor.execute('SAVEPOINT write_queue_op')
+                    try:
+                        results.append((True, func(cursor, *args, **kwargs)))
+                        cursor.execute('RELEASE write_queue_op')
+                    except Exception as e:
+                        cursor.execute('ROLLBACK TO write_queue_op')
+                        cursor.execute('RELEASE write_queue_op')
+                        results.append((False, e))
+                        failed += 1
+                conn.commit()
+        except Exception as e:
+            # Пакет не зафиксирован: ошибка передается всем его неотмененным операциям
+            failed = 0
+            for item in batch:
+                future = item[3]
+                if future.done():
+                    continue
+                if future.running() or future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+                    failed += 1
+            with self._metrics_lock:
+                self._metrics['failed_batches'] += 1
+                self._metrics['failed'] += failed
+                self._metrics['cancelled'] += len(batch) - failed
+            print(f"Ошибка при фиксации пакета записи: {e}")
+            return
+
+        commit_ms = (time.perf_counter() - started) * 1000
+        for (_, _, _, future, _), result in zip(batch, results):
+            if result is None:
+                continue
+            ok, value = result
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+        # Отмененные операции не выполнялись и в размер пакета не входят
+        executed = len(batch) - cancelled
+        with self._metrics_lock:
+            metrics = self._metrics
+            metrics['cancelled'] += cancelled
+            if not executed:
+                return
+            metrics['operations'] += executed
+            metrics['failed'] += failed
+            metrics['batches'] += 1
+            metrics['max_batch'] = max(metrics['max_batch'], executed)
+            metrics['commit_ms'] += commit_ms
+            metrics['wait_ms'] += sum((started - item[4]) * 1000
+                                      for item, result in zip(batch, results) if result is not None)
+            for i, bound in enumerate(BATCH_SIZE_BUCKETS):
+                if executed <= bound:
+                    metrics['histogram'][i] += 1
+                    break
+
+    def get_metrics(self):
+        """
+        Метрики очереди
+
+        Returns:
+            dict: operations, failed, cancelled, batches, failed_batches, avg_batch, max_batch,
+                  queue_depth, max_queue_depth, avg_commit_ms, avg_wait_ms, histogram
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+            histogram = list(metrics.pop('histogram'))
+        batches = metrics['batches'] or 1
+        operations = metrics['operations'] or 1
+        metrics.update({
+            'avg_batch': metrics['operations'] / batches,
+            'queue_depth': self.queue.qsize(),
+            'avg_commit_ms': metrics.pop('commit_ms') / batches,
+            'avg_wait_ms': metrics.pop('wait_ms') / operations,
+            'histogram': {(f"≤{int(b)}" if b != float('inf') else f">{int(BATCH_SIZE_BUCKETS[-2])}"): n
+                          for b, n in zip(BATCH_SIZE_BUCKETS, histogram)},
+        })
+        return metrics
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    """Очередь записи процесса (запускается при первом обращении)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None or not _queue.is_alive():
+            _queue = WriteQueue()
+            _queue.start()
+        return _queue
+
+
+def stop_write_queue(timeout=None):
+    """Остановка очереди записи процесса после выполнения поставленных операций"""
+    global _queue
+    with _queue_lock:
+        current, _queue = _queue, None
+    if current is not None:
+        current.stop(timeout)
+
+
+def submit(func, *args, **kwargs):
+    """Постановка операции в очередь процесса (см. WriteQueue.submit)"""
+    return get_write_queue().submit(func, *args, **kwargs)
+
+
+def get_metrics():
+    """Метрики очереди процесса (None, если очередь не запускалась)"""
+    current = _queue
+    return current.get_metrics() if current is not None else None
+
+
+def _wait(future, action):
+    """
+    Ожидание результата операции. Операция, не начавшая выполняться за
+    WRITE_RESULT_TIMEOUT, снимается с очереди; уже выполняющаяся дожидается
+    фиксации пакета, чтобы ответ совпадал с тем, что записано в базу.
+
+    Returns:
+        tuple: (успех, результат операции или None)
+    """
+    try:
+        try:
+            return True, future.result(WRITE_RESULT_TIMEOUT)
+        except FutureTimeoutError:
+            if future.cancel():
+                print(f"Ошибка при {action}: операция не начата за {WRITE_RESULT_TIMEOUT} с и отменена")
+                return False, None
+            return True, future.result()
+    except Exception as e:
+        print(f"Ошибка при {action}: {e}")
+        return False, None
+
+
+def create_request(request_data):
+    """
+    Создание заявки через очередь записи (аналог database.create_request).
+    Номер выделяется по REQUEST_NUMBER_GAP_POLICY так же, как в database.create_request.
+
+    Returns:
+        int: ID новой заявки или None при ошибке
+    """
+    if database.REQUEST_NUMBER_GAP_POLICY == 'allow_gaps':
+        # Номер фиксируется отдельной операцией до вставки и не возвращается при ее ошибке
+        ok, request_number = _wait(submit(database._allocate_request_number_tx), 'создании заявки')
+        if not ok:
+            return None
+        return _wait(submit(database._insert_request_tx, request_data, request_number),
+                     'создании заявки')[1]
+    return _wait(submit(database._create_request_tx, request_data), 'создании заявки')[1]
+
+
+def update_request_status(request_id, new_status, user_id):
+    """
+    Смена статуса заявки через очередь записи (аналог database.update_request_status)
+
+    Returns:
+        bool: True при успехе
+    """
+    return _wait(submit(database._update_request_status_tx, request_id, new_status, user_id),
+                 'обновлении статуса')[0]
+
+
+def assign_technician(request_id, technician_id):
+    """
+    Назначение специалиста через очередь записи (аналог database.assign_technician)
+
+    Returns:
+        bool: True при успехе
+    """
+    return _wait(submit(database._assign_technician_tx, request_id, technician_id),
+                 'назначении специалиста')[0]
+
+
+def add_comment(request_id, user_id, comment_text, is_technical=False, parts_ordered=None):
+    """
+    Добавление комментария через очередь записи (аналог database.add_comment)
+
+    Returns:
+        int: ID комментария или None при ошибке
+    """
+    return _wait(submit(database._add_comment_tx, request_id, user_id, comment_text,
+                        is_technical, parts_ordered), 'добавлении комментария')[1]